@@ -0,0 +1,176 @@
+"""
+Journal d'activité en écriture différée (write-behind).
+
+Les lignes `activity_log` sont mises en file en mémoire puis écrites par un
+thread de fond, en lots, dans une seule transaction du writer du pool :
+toutes les `flush_interval` secondes ou dès que `batch_size` lignes attendent.
+
+- File bornée : si elle est pleine, l'appelant attend jusqu'à `put_timeout`
+  secondes (contre-pression), puis écrit lui-même le lot en attente — aucune
+  ligne n'est perdue ;
+- écriture en échec pour une raison passagère (base verrouillée par un autre
+  processus) : le lot est remis en tête et réessayé avec un délai croissant ;
+  seules les erreurs définitives (table absente, contrainte) abandonnent le lot,
+  et sont comptées (`dropped`) ;
+- `close()` (appelé aussi à la sortie du processus) vide la file.
+L'horodatage est pris au moment de l'appel, pas au moment de l'écriture.
+"""
+from __future__ import annotations
+
+import atexit
+import collections
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterable
+
+from guignomap.db_pool import ConnectionPool
+
+_LOG = logging.getLogger("guignomap.activity_log")
+_LOG.addHandler(logging.NullHandler())
+
+Row = tuple[str, str, str, str]  # (team_id, action, details, created_at)
+
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 5.0
+CLOSE_RETRIES = 8
+_RETRYABLE_CODES = {sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED}
+
+
+def _retryable(exc: BaseException) -> bool:
+    """Erreur passagère (verrou tenu par une autre connexion) : le lot sera réessayé."""
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in _RETRYABLE_CODES
+    return "locked" in str(exc) or "busy" in str(exc)
+
+
+def _utc_now() -> str:
+    # Même format que CURRENT_TIMESTAMP de SQLite
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class ActivityLogWriter:
+    def __init__(self, pool: ConnectionPool, flush_interval: float = 2.0, batch_size: int = 200,
+                 max_queue: int = 10000, put_timeout: float = 1.0):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self._queue: queue.Queue[Row] = queue.Queue(maxsize=max_queue)
+        # Lots en échec passager, réécrits avant la file
+        self._retry: collections.deque[Row] = collections.deque()
+        self._retry_delay = 0.0
+        self._flush_lock = threading.Lock()
+        # Les compteurs sont mis à jour par les appelants et par le thread de fond
+        self._stats_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._stats = {"queued": 0, "written": 0, "batches": 0, "errors": 0, "retries": 0,
+                       "dropped": 0, "backpressure": 0}
+        self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _count(self, **deltas: int) -> None:
+        with self._stats_lock:
+            for name, n in deltas.items():
+                self._stats[name] += n
+
+    # --- API -------------------------------------------------------------------------------
+
+    def log(self, team_id: str | None, action: str, details: str) -> None:
+        """Met une ligne en file (retour immédiat, sauf file pleine)."""
+        self.log_many([(team_id, action, details)])
+
+    def log_many(self, entries: Iterable[tuple[str | None, str, str]]) -> None:
+        """Met plusieurs lignes en file avec le même horodatage."""
+        ts = _utc_now()
+        for team_id, action, details in entries:
+            row = (str(team_id) if team_id else "SYSTEM", str(action), str(details), ts)
+            try:
+                self._queue.put(row, timeout=self.put_timeout)
+            except queue.Full:
+                # Contre-pression : l'appelant paie l'écriture du lot en attente
+                self._count(backpressure=1)
+                self.flush()
+                self._queue.put(row)
+            self._count(queued=1)
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """
+        Écrit tout ce qui est en file, par lots de batch_size. Retourne le nombre de lignes écrites.
+        S'arrête au premier échec passager : le lot reste en tête pour le prochain flush.
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch: list[Row] = []
+                while self._retry and len(batch) < self.batch_size:
+                    batch.append(self._retry.popleft())
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return written
+                try:
+                    with self.pool.writer() as w:
+                        w.executemany(
+                            "INSERT INTO activity_log (team_id, action, details, created_at) VALUES (?, ?, ?, ?)",
+                            batch,
+                        )
+                except Exception as e:
+                    if _retryable(e):
+                        self._retry.extendleft(reversed(batch))
+                        self._count(errors=1, retries=1)
+                        self._retry_delay = min(max(self._retry_delay * 2, RETRY_BASE_DELAY), RETRY_MAX_DELAY)
+                        _LOG.info("activity_log flush deferred (%s), retry in %.2fs", e, self._retry_delay)
+                        return written
+                    self._count(errors=1, dropped=len(batch))
+                    _LOG.warning("activity_log flush failed (%d rows dropped)", len(batch), exc_info=True)
+                    continue
+                self._retry_delay = 0.0
+                written += len(batch)
+                self._count(written=len(batch), batches=1)
+
+    def close(self) -> None:
+        """Arrête le thread de fond et vide la file (idempotent)."""
+        if not self._stop.is_set():
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout=5)
+        self.flush()
+        for _ in range(CLOSE_RETRIES):
+            if not self._retry:
+                break
+            time.sleep(self._retry_delay)
+            self.flush()
+        if self._retry:
+            _LOG.error("activity_log closed with %d rows not written", len(self._retry))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            s = dict(self._stats)
+        s["pending"] = self._queue.qsize() + len(self._retry)
+        return s
+
+    # --- Thread de fond ----------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            # En échec passager : prochain essai après le délai croissant
+            self._wake.wait(self._retry_delay or self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                _LOG.debug("activity_log background flush failed", exc_info=True)
@@ -14,6 +14,7 @@ Dépendances (audit): streamlit, streamlit-folium, folium, pandas, plotly, bcryp
 """
 from __future__ import annotations
 
+import math
 import os
 import sqlite3
 from pathlib import Path
@@ -24,9 +25,13 @@ import pandas as pd
 import streamlit as st
 import plotly.express as px
 import folium
-from streamlit_folium import st_folium
+from streamlit_folium import st_folium, generate_leaflet_string
 import base64
-import math
+
+from guignomap import db, geometry, map_layers, migrations, publish, sectors, simplify, spatial
+from guignomap.cache import versioned_cache, bump_data_version, cache_stats
+from guignomap.db_pool import ConnectionPool
+from guignomap.activity_log import ActivityLogWriter
 
 try:
     import bcrypt
@@ -122,19 +127,67 @@ def get_compte_a_rebours() -> str:
 # -----------------------------------------------------------------------------
 
 @st.cache_resource(show_spinner=False)
+def get_pool() -> ConnectionPool:
+    """Pool WAL partagé par toutes les sessions : lecteurs par thread + un writer sérialisé.
+    Initialise au passage les structures dérivées (une seule fois par processus).
+    """
+    pool = ConnectionPool(DB_PATH)
+    try:
+        with pool.writer() as w:
+            migrations.migrate(w)
+            db.check_progress_counters(w, repair=True)
+            geometry.refresh_street_geometry(w)
+    except Exception:
+        pass
+    return pool
+
+
+@st.cache_resource(show_spinner=False)
+def get_activity_log() -> ActivityLogWriter:
+    """Journal d'activité différé : écrit en lots par un thread de fond, vidé à l'arrêt."""
+    return ActivityLogWriter(get_pool())
+
+
+@st.cache_resource(show_spinner=False)
+def get_publisher() -> publish.PublicMapPublisher:
+    """Publication différée de la carte publique (static/public) ; publie une première fois au démarrage."""
+    publisher = publish.PublicMapPublisher(get_pool())
+    publisher.flush()
+    return publisher
+
+
+def notify_public_map() -> None:
+    """À appeler après une écriture qui change la carte (statut, équipe d'une rue)."""
+    try:
+        get_publisher().notify()
+    except Exception:
+        pass
+
+
 def get_connection() -> sqlite3.Connection:
-    """Connexion SQLite mise en cache. Initialise row_factory.
-    Si la DB est vide/partielle, on tente un init minimal.
+    """Connexion de lecture du thread courant (lecture seule, row_factory = Row).
+    Les écritures passent par `get_pool().writer()`.
     """
     try:
-        conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return get_pool().reader()
     except Exception as e:
         st.error(f"❌ Connexion DB impossible: {e}")
         st.stop()
 
 
+def _refresh_geometry(conn: sqlite3.Connection) -> int:
+    """Recalcule les rues dont les adresses ont changé (écriture seulement si nécessaire).
+    À appeler hors des lectures en cache : une géométrie réécrite invalide le cache.
+    """
+    if not geometry.needs_refresh(conn):
+        return 0
+    with get_pool().writer() as w:
+        n = geometry.refresh_street_geometry(w)
+    if n:
+        bump_data_version()
+    return n
+
+
 def verify_password(plain: str, hashed: str | None) -> bool:
     if not plain or not hashed:
         return False
@@ -155,45 +208,28 @@ def verify_password(plain: str, hashed: str | None) -> bool:
 # Requêtes de lecture
 # -------------------------
 
+@versioned_cache
 def db_stats_globales(conn: sqlite3.Connection) -> dict:
     try:
-        c = conn.cursor()
-        total = c.execute("SELECT COUNT(*) FROM streets").fetchone()[0]
-        row = c.execute(
-            "SELECT SUM(CASE WHEN status='terminee' THEN 1 ELSE 0 END),\n                    SUM(CASE WHEN status='en_cours' THEN 1 ELSE 0 END)\n             FROM streets"
-        ).fetchone()
-        terminee = row[0] or 0
-        en_cours = row[1] or 0
-        ass = c.execute("SELECT COUNT(*) FROM streets WHERE team IS NOT NULL AND team != ''").fetchone()[0]
-        return {
-            "total": total,
-            "terminee": terminee,
-            "en_cours": en_cours,
-            "a_faire": max(total - terminee - en_cours, 0),
-            "assignees": ass,
-            "non_assignees": max(total - ass, 0),
-            "pourcentage": (terminee * 100.0 / total) if total else 0.0,
-        }
+        return publish.street_stats(conn)
     except Exception as e:
         st.warning(f"Stats indisponibles: {e}")
         return {"total": 0, "terminee": 0, "en_cours": 0, "a_faire": 0, "assignees": 0, "non_assignees": 0, "pourcentage": 0.0}
 
 
+@versioned_cache
 def db_team_name(conn: sqlite3.Connection, team_id: str) -> str:
     row = conn.execute("SELECT name FROM teams WHERE id = ?", (team_id,)).fetchone()
     return row[0] if row else team_id
 
 
+@versioned_cache
 def db_team_progress(conn: sqlite3.Connection, team_id: str) -> tuple[int, int]:
-    row = conn.execute(
-        "SELECT COUNT(*) as total,\n                SUM(CASE WHEN status='terminee' THEN 1 ELSE 0 END) as done\n         FROM streets WHERE team = ?",
-        (team_id,),
-    ).fetchone()
-    total = row[0] or 0
-    done = row[1] or 0
-    return total, done
+    counts = db.progress_for_team(conn, team_id)
+    return counts["total"], counts["terminee"]
 
 
+@versioned_cache
 def db_last_checkpoint(conn: sqlite3.Connection, team_id: str) -> str | None:
     row = conn.execute(
         """
@@ -208,16 +244,14 @@ def db_last_checkpoint(conn: sqlite3.Connection, team_id: str) -> str | None:
     return row[0] if row else None
 
 
+@versioned_cache
 def db_assigned_streets(conn: sqlite3.Connection, team_id: str) -> pd.DataFrame:
     query = (
         """
-        SELECT s.name as rue, s.status,
-               COUNT(DISTINCT a.id) as nb_adresses
-        FROM streets s
-        LEFT JOIN addresses a ON a.street_name = s.name
-        WHERE s.team = ?
-        GROUP BY s.name, s.status
-        ORDER BY CASE s.status WHEN 'en_cours' THEN 0 WHEN 'a_faire' THEN 1 ELSE 2 END, s.name
+        SELECT name as rue, status, address_count as nb_adresses
+        FROM streets
+        WHERE team = ?
+        ORDER BY CASE status WHEN 'en_cours' THEN 0 WHEN 'a_faire' THEN 1 ELSE 2 END, name
         """
     )
     try:
@@ -227,35 +261,51 @@ def db_assigned_streets(conn: sqlite3.Connection, team_id: str) -> pd.DataFrame:
         return pd.DataFrame(columns=["rue", "status", "nb_adresses"])
 
 
+@versioned_cache
 def db_non_assigned_streets(conn: sqlite3.Connection) -> list[str]:
     return [r[0] for r in conn.execute("SELECT name FROM streets WHERE team IS NULL OR team='' ORDER BY name").fetchall()]
 
 
+@versioned_cache
+def db_street_names(conn: sqlite3.Connection) -> list[str]:
+    return [r[0] for r in conn.execute("SELECT name FROM streets ORDER BY name").fetchall()]
+
+
+@versioned_cache
+def db_team_streets_near(conn: sqlite3.Connection, team_id: str, lat: float, lon: float,
+                         radius_m: float) -> list[tuple[str, str, int, int]]:
+    """Rues non terminées de l'équipe ayant des adresses dans le rayon (index spatial) :
+    [(rue, statut, distance m, nb d'adresses proches)], les plus proches d'abord.
+    """
+    df = db_assigned_streets(conn, team_id)
+    statuses = dict(zip(df["rue"], df["status"]))
+    return [
+        (rue, statuses[rue], round(dist), n)
+        for rue, dist, n in spatial.streets_within_radius(conn, lat, lon, radius_m)
+        if statuses.get(rue) not in (None, "terminee")
+    ]
+
+
 def db_teams(conn: sqlite3.Connection) -> list[tuple[str, str]]:
-    return conn.execute("SELECT id, name FROM teams WHERE id != 'ADMIN' AND active = 1 ORDER BY id").fetchall()
+    # Tuples simples : les sqlite3.Row ne passent pas dans les options d'un widget
+    return [tuple(r) for r in conn.execute("SELECT id, name FROM teams WHERE id != 'ADMIN' AND active = 1 ORDER BY id")]
 
 
 def db_sectors(conn: sqlite3.Connection) -> list[tuple[int, str]]:
-    return conn.execute("SELECT id, name FROM sectors ORDER BY name").fetchall()
+    return [tuple(r) for r in conn.execute("SELECT id, name FROM sectors ORDER BY name")]
 
 
+@versioned_cache
 def db_stats_by_team(conn: sqlite3.Connection) -> pd.DataFrame:
-    query = (
-        """
-        SELECT t.name as equipe,
-               COUNT(s.id) as total,
-               SUM(CASE WHEN s.status='terminee' THEN 1 ELSE 0 END) as terminees,
-               ROUND(SUM(CASE WHEN s.status='terminee' THEN 1.0 ELSE 0 END) * 100.0 / NULLIF(COUNT(s.id),0), 1) as pourcentage
-        FROM teams t
-        LEFT JOIN streets s ON s.team = t.id
-        WHERE t.id != 'ADMIN'
-        GROUP BY t.id
-        HAVING COUNT(s.id) > 0
-        ORDER BY pourcentage DESC
-        """
-    )
     try:
-        return pd.read_sql_query(query, conn)
+        progress = db.progress_by_team(conn)
+        rows = [
+            (name, c["total"], c["terminee"], round(c["terminee"] * 100.0 / c["total"], 1))
+            for team_id, name in conn.execute("SELECT id, name FROM teams WHERE id != 'ADMIN'").fetchall()
+            if (c := progress.get(team_id)) and c["total"] > 0
+        ]
+        df = pd.DataFrame(rows, columns=["equipe", "total", "terminees", "pourcentage"])
+        return df.sort_values("pourcentage", ascending=False, kind="stable").reset_index(drop=True)
     except Exception as e:
         st.warning(f"Stats équipes indisponibles: {e}")
         return pd.DataFrame(columns=["equipe", "total", "terminees", "pourcentage"])
@@ -265,21 +315,33 @@ def db_stats_by_team(conn: sqlite3.Connection) -> pd.DataFrame:
 # Mutations & journalisation
 # -------------------------
 
+# Les mutations gardent `conn` (connexion de lecture de la page) dans leur signature,
+# mais écrivent toutes via le writer unique du pool.
+
 def log_activity(conn: sqlite3.Connection, team_id: str | None, action: str, details: str) -> None:
+    """Mise en file (write-behind) : pas de commit sur le chemin de l'utilisateur."""
     try:
-        conn.execute(
-            "INSERT INTO activity_log (team_id, action, details) VALUES (?, ?, ?)",
-            (team_id or "SYSTEM", action, details),
-        )
-        conn.commit()
+        get_activity_log().log(team_id, action, details)
+    except Exception:
+        pass
+
+
+def log_activities(conn: sqlite3.Connection, entries: list[tuple[str | None, str, str]]) -> None:
+    """Comme log_activity, pour un lot de lignes (même horodatage)."""
+    try:
+        get_activity_log().log_many(entries)
     except Exception:
         pass
 
 
 def set_street_status(conn: sqlite3.Connection, street_name: str, status: str, team_id: str | None = None) -> bool:
     try:
-        conn.execute("UPDATE streets SET status = ? WHERE name = ?", (status, street_name))
-        conn.commit()
+        with get_pool().writer() as w:
+            # État courant + transition (street_status_events), validés ensemble par le writer
+            if not db.set_street_status(w, street_name, status, team_id, commit=False):
+                raise ValueError(f"rue ou statut inconnu : {street_name} / {status}")
+        bump_data_version()
+        notify_public_map()
         log_activity(conn, team_id, "STATUS_UPDATE", f"{street_name} -> {status}")
         return True
     except Exception as e:
@@ -287,13 +349,66 @@ def set_street_status(conn: sqlite3.Connection, street_name: str, status: str, t
         return False
 
 
+def set_streets_status(conn: sqlite3.Connection, street_names: list[str], status: str,
+                       team_id: str | None = None) -> int:
+    """
+    Statut de plusieurs rues : un lot, une transaction, un rafraîchissement.
+    Retourne le nombre de rues changées ; seules celles-ci sont journalisées.
+    """
+    if not street_names:
+        return 0
+    try:
+        with get_pool().writer() as w:
+            changed = db.set_streets_status(w, street_names, status, team_id, commit=False)
+        if not changed:
+            return 0
+        bump_data_version()
+        notify_public_map()
+        log_activities(conn, [(team_id, "STATUS_UPDATE", f"{rue} -> {status}") for rue in changed])
+        return len(changed)
+    except Exception as e:
+        st.error(f"Maj statut impossible: {e}")
+        return 0
+
+
+def assign_streets(conn: sqlite3.Connection, street_names: list[str], team_id: str) -> int:
+    try:
+        with get_pool().writer() as w:
+            changed = db.assign_streets(w, street_names, team_id, only_unassigned=True, commit=False)
+        if not changed:
+            return 0
+        bump_data_version()
+        notify_public_map()
+        log_activities(conn, [(team_id, "STREET_ASSIGN", rue) for rue in changed])
+        return len(changed)
+    except Exception as e:
+        st.error(f"Assignation impossible: {e}")
+        return 0
+
+
+def reassign_sector(conn: sqlite3.Connection, sector_id: int, team_id: str, only_unassigned: bool) -> int:
+    try:
+        with get_pool().writer() as w:
+            names = db.reassign_sector(w, sector_id, team_id, only_unassigned=only_unassigned, commit=False)
+        if not names:
+            return 0
+        bump_data_version()
+        notify_public_map()
+        log_activities(conn, [(team_id, "STREET_ASSIGN", rue) for rue in names])
+        return len(names)
+    except Exception as e:
+        st.error(f"Réassignation du secteur impossible: {e}")
+        return 0
+
+
 def add_note(conn: sqlite3.Connection, street_name: str, team_id: str, address_number: str, comment: str) -> bool:
     try:
-        conn.execute(
-            "INSERT INTO notes (street_name, team_id, address_number, comment) VALUES (?, ?, ?, ?)",
-            (street_name, team_id, address_number.strip(), comment.strip()),
-        )
-        conn.commit()
+        with get_pool().writer() as w:
+            w.execute(
+                "INSERT INTO notes (street_name, team_id, address_number, comment) VALUES (?, ?, ?, ?)",
+                (street_name, team_id, address_number.strip(), comment.strip()),
+            )
+        bump_data_version()
         log_activity(conn, team_id, "NOTE_ADD", f"{street_name} #{address_number}")
         return True
     except Exception as e:
@@ -305,94 +420,146 @@ def add_note(conn: sqlite3.Connection, street_name: str, team_id: str, address_n
 # CARTOGRAPHIE (Folium)
 # -----------------------------------------------------------------------------
 
-STATUS_COLORS = {
-    "terminee": "#22c55e",  # vert
-    "en_cours": "#f59e0b",  # orange
-    "a_faire": "#ef4444",   # rouge
-}
+STATUS_COLORS = map_layers.STATUS_COLORS
+
+# Cartes construites une fois : niveau de simplification choisi pour rester fidèle
+# jusqu'à LOD_ZOOM_MARGIN niveaux de zoom au-delà du zoom initial
+LOD_ZOOM_MARGIN = 1
+
+
+def _lod_tolerance(zoom: int | float) -> float:
+    return simplify.tolerance_for_zoom(zoom + LOD_ZOOM_MARGIN)
+
+
+@versioned_cache
+def _street_lines(conn: sqlite3.Connection, team_id: str | None = None, tolerance_m: float = 0.0) -> list:
+    """Lignes de rues précalculées (table street_geometry) avec statut et équipe.
+    L'appelant rafraîchit d'abord la géométrie (_refresh_geometry), hors cache.
+    """
+    try:
+        return geometry.fetch_street_lines(conn, team_id, tolerance_m=tolerance_m)
+    except Exception as e:
+        st.error(f"Lecture géométrie des rues impossible: {e}")
+        return []
+
+
+@versioned_cache
+def db_street_statuses(conn: sqlite3.Connection, team_id: str | None = None) -> dict:
+    return geometry.fetch_street_statuses(conn, team_id)
 
 
-def _fetch_street_points(conn: sqlite3.Connection, where_clause: str = "", params: tuple = ()) -> pd.DataFrame:
-    """Récupère les points (lat/lon) par rue. where_clause peut filtrer s.team etc.
-    Retourne colonnes: rue, status, team, lat, lon.
+def show_status_map(conn: sqlite3.Connection, key: str, height: int,
+                    team_id: str | None = None, zoom_start: int = 12, weight: int = 4) -> None:
+    """Affiche une carte dont la géométrie est construite une fois par session.
+
+    À chaque rerun, seul le dictionnaire {rue: statut} est relu et envoyé sous forme
+    d'un petit script (feature_group_to_add) : st_folium ne remonte pas la carte.
+    La carte de base est reconstruite si la géométrie ou la liste des rues change.
     """
-    base = f"""
-        SELECT s.name AS rue, s.status, s.team,
-               a.latitude AS lat, a.longitude AS lon
-        FROM streets s
-        JOIN addresses a ON a.street_name = s.name
-        WHERE a.latitude IS NOT NULL AND a.longitude IS NOT NULL {(' AND ' + where_clause) if where_clause else ''}
+    try:
+        _refresh_geometry(conn)
+        statuses = db_street_statuses(conn, team_id)
+        signature = (geometry.geometry_version(conn), hash(frozenset(statuses)))
+    except Exception as e:
+        st.error(f"Lecture carte impossible: {e}")
+        return
+
+    cache_key = f"_status_map_{key}"
+    cached = st.session_state.get(cache_key)
+    if not cached or cached[0] != signature:
+        lines = _street_lines(conn, team_id, tolerance_m=_lod_tolerance(zoom_start))
+        m, layer = map_layers.base_map(map_layers.streets_geojson(lines), zoom_start=zoom_start, weight=weight)
+        # Fige les identifiants Leaflet dès la création : la carte restera identique d'un rerun à l'autre
+        m.get_root().render()
+        generate_leaflet_string(m)
+        cached = (signature, m, layer)
+        st.session_state[cache_key] = cached
+    _, m, layer = cached
+
+    fg = map_layers.status_layer(layer, statuses, weight=weight)
+    try:
+        st_folium(m, key=key, height=height, use_container_width=True,
+                  feature_group_to_add=fg, returned_objects=[])
+    finally:
+        # st_folium attache le groupe à la carte : on le retire pour garder la base inchangée
+        m._children.pop(fg.get_name(), None)
+
+
+# --- Mode fenêtre : seules les rues visibles sont envoyées --------------------------------
+
+VIEWPORT_MIN_ZOOM = 15      # en deçà : agrégats par secteur / zone
+VIEWPORT_SNAP_DEG = 0.005   # fenêtres arrondies : déplacements proches = même requête (cache)
+
+
+def _snap_bounds(bounds: dict, pad: float = 0.25) -> tuple[float, float, float, float] | None:
+    """Bounds Leaflet -> (sud, ouest, nord, est) élargie de `pad` et arrondie à la grille."""
+    try:
+        sw, ne = bounds["_southWest"], bounds["_northEast"]
+        south, west, north, east = float(sw["lat"]), float(sw["lng"]), float(ne["lat"]), float(ne["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    dlat, dlon = (north - south) * pad, (east - west) * pad
+    g = VIEWPORT_SNAP_DEG
+    return (math.floor((south - dlat) / g) * g, math.floor((west - dlon) / g) * g,
+            math.ceil((north + dlat) / g) * g, math.ceil((east + dlon) / g) * g)
+
+
+@versioned_cache
+def db_street_lines_in_bbox(conn: sqlite3.Connection, bbox: tuple, team_id: str | None = None,
+                            tolerance_m: float = 0.0) -> list:
+    return geometry.fetch_street_lines_in_bbox(conn, *bbox, team_id=team_id, tolerance_m=tolerance_m)
+
+
+@versioned_cache
+def db_street_clusters(conn: sqlite3.Connection, team_id: str | None = None) -> list:
+    return geometry.street_clusters(conn, team_id)
+
+
+def show_viewport_map(conn: sqlite3.Connection, key: str, height: int, team_id: str | None = None,
+                      zoom_start: int = 12, weight: int = 4, min_zoom: int = VIEWPORT_MIN_ZOOM) -> None:
+    """Carte chargée selon la fenêtre affichée.
+
+    La carte de base est vide ; selon le zoom et les bounds renvoyés par st_folium
+    (lus dans st.session_state[key] avant l'appel), on envoie soit les rues qui
+    touchent la fenêtre, soit les agrégats par secteur / zone.
     """
     try:
-        df = pd.read_sql_query(base, conn, params=params)
-        return df
+        _refresh_geometry(conn)
     except Exception as e:
-        st.error(f"Lecture points carte impossible: {e}")
-        return pd.DataFrame(columns=["rue", "status", "team", "lat", "lon"]) 
-
-
-def map_global(conn: sqlite3.Connection) -> folium.Map:
-    m = folium.Map(location=[45.7475, -73.6005], zoom_start=12, tiles="OpenStreetMap")
-    df = _fetch_street_points(conn)
-    if df.empty:
-        return m
-
-    # Groupement par rue + tri
-    for (rue, status, team), g in df.groupby(["rue", "status", "team"], sort=False):
-        g = g.dropna(subset=["lat", "lon"]).copy()
-        if g.empty:
-            continue
-        # Tri approximatif: angle autour du centroïde
-        cx, cy = g["lat"].mean(), g["lon"].mean()
-        g["_ang"] = g.apply(lambda r: math.atan2(r["lat"] - cx, r["lon"] - cy), axis=1)
-        g = g.sort_values("_ang")
-        pts = g[["lat", "lon"]].values.tolist()
-        if len(pts) < 2:
-            folium.CircleMarker(
-                location=pts[0],
-                radius=4,
-                color=STATUS_COLORS.get(status, "#6b7280"),
-                fill=True,
-                fill_opacity=0.7,
-                popup=f"<b>{rue}</b><br>Statut: {status}<br>Équipe: {team or '—'}",
-            ).add_to(m)
-            continue
-
-        is_unassigned = (team is None) or (str(team).strip() == "")
-        style_kwargs = {
-            "color": STATUS_COLORS.get(status, "#6b7280"),
-            "weight": 4 if not is_unassigned else 3,
-            "opacity": 0.9 if not is_unassigned else 0.6,
-        }
-        if is_unassigned:
-            style_kwargs["dash_array"] = "5, 10"
-        folium.PolyLine(pts, **style_kwargs, tooltip=rue).add_to(m)
-
-    return m
-
-
-def map_team(conn: sqlite3.Connection, team_id: str) -> folium.Map:
-    m = folium.Map(location=[45.7475, -73.6005], zoom_start=13, tiles="OpenStreetMap")
-    df = _fetch_street_points(conn, where_clause="s.team = ?", params=(team_id,))
-    if df.empty:
-        return m
-
-    for (rue, status), g in df.groupby(["rue", "status"], sort=False):
-        g = g.dropna(subset=["lat", "lon"]).copy()
-        if g.empty:
-            continue
-        cx, cy = g["lat"].mean(), g["lon"].mean()
-        g["_ang"] = g.apply(lambda r: math.atan2(r["lat"] - cx, r["lon"] - cy), axis=1)
-        g = g.sort_values("_ang")
-        pts = g[["lat", "lon"]].values.tolist()
-        if len(pts) < 2:
-            folium.CircleMarker(location=pts[0], radius=6,
-                                color=STATUS_COLORS.get(status, "#6b7280"), fill=True, fill_opacity=0.9,
-                                popup=f"<b>{rue}</b>").add_to(m)
-            continue
-        folium.PolyLine(pts, color=STATUS_COLORS.get(status, "#6b7280"), weight=6, opacity=0.9,
-                        tooltip=rue).add_to(m)
-    return m
+        st.error(f"Lecture carte impossible: {e}")
+        return
+
+    view = st.session_state.get(key) or {}
+    zoom = view.get("zoom") or zoom_start
+    bbox = _snap_bounds(view.get("bounds") or {})
+
+    base_key = f"_viewport_map_{key}"
+    m = st.session_state.get(base_key)
+    if m is None:
+        m = map_layers.empty_map(zoom_start)
+        m.get_root().render()
+        generate_leaflet_string(m)
+        st.session_state[base_key] = m
+
+    try:
+        if zoom >= min_zoom and bbox is not None:
+            # Renvoyé à chaque changement de vue : niveau du zoom courant
+            lines = db_street_lines_in_bbox(conn, bbox, team_id, simplify.tolerance_for_zoom(zoom))
+            fg = map_layers.lines_layer(lines, weight=weight)
+            caption = f"{len(lines)} rues dans cette zone."
+        else:
+            fg = map_layers.cluster_layer(db_street_clusters(conn, team_id))
+            caption = "Vue par secteur — zoomez pour afficher les rues."
+    except Exception as e:
+        st.error(f"Lecture carte impossible: {e}")
+        return
+
+    try:
+        st_folium(m, key=key, height=height, use_container_width=True,
+                  feature_group_to_add=fg, returned_objects=["bounds", "zoom"])
+    finally:
+        m._children.pop(fg.get_name(), None)
+    st.caption(caption)
 
 # -----------------------------------------------------------------------------
 # HEADER / FOOTER (branding)
@@ -444,13 +611,20 @@ def render_footer() -> None:
 # -----------------------------------------------------------------------------
 
 def page_accueil() -> None:
-    conn = get_connection()
     render_header("Tableau de bord public (aperçu global)")
 
     # Compte à rebours
     st.info(f"⏰ Prochain rendez-vous : {get_compte_a_rebours()}")
 
-    stats = db_stats_globales(conn)
+    # Carte et compteurs publiés (static/public) : aucune requête SQL par visiteur
+    summary = None
+    if st.get_option("server.enableStaticServing"):
+        try:
+            get_publisher()
+            summary = publish.read_summary()
+        except Exception:
+            summary = None
+    stats = summary["stats"] if summary else db_stats_globales(get_connection())
     st.markdown('<div class="card metrics-card">', unsafe_allow_html=True)
     c1, c2, c3, c4, c5 = st.columns(5)
     c1.metric("Total rues", stats["total"])
@@ -461,9 +635,14 @@ def page_accueil() -> None:
     st.markdown('</div>', unsafe_allow_html=True)
 
     st.subheader("🗺️ Carte d'ensemble des rues (code couleur par statut / pointillé = non assignée)")
-    with st.spinner("Génération de la carte…"):
-        m = map_global(conn)
-        st_folium(m, height=680, use_container_width=True)
+    if summary:
+        url = publish.public_map_url(summary, st.get_option("server.baseUrlPath") or "")
+        st_folium(map_layers.public_map(url), key="map_accueil_static", height=680,
+                  use_container_width=True, returned_objects=[])
+        st.caption(f"Mise à jour : {summary['generated_at']} UTC")
+    else:
+        with st.spinner("Génération de la carte…"):
+            show_viewport_map(get_connection(), key="map_accueil", height=680)
     render_footer()
 
 
@@ -546,13 +725,26 @@ def page_benevole() -> None:
             st.write(" ".join(badges))
     st.markdown('</div>', unsafe_allow_html=True)
 
-    tab_list, tab_map = st.tabs(["📋 Mes rues", "🗺️ Ma carte"])
+    tab_list, tab_near, tab_map = st.tabs(["📋 Mes rues", "📍 Près de moi", "🗺️ Ma carte"])
 
     with tab_list:
         df = db_assigned_streets(conn, team_id)
         if df.empty:
             st.warning("Aucune rue assignée pour votre équipe.")
         else:
+            with st.form("bulk_status_benevole"):
+                bulk = st.multiselect("Plusieurs rues à la fois", options=df["rue"].tolist(),
+                                      placeholder="Choisir des rues…")
+                b1, b2 = st.columns(2)
+                bulk_encours = b1.form_submit_button("🔄 En cours", use_container_width=True)
+                bulk_terminee = b2.form_submit_button("✅ Terminées", use_container_width=True)
+            if bulk and (bulk_encours or bulk_terminee):
+                status = "terminee" if bulk_terminee else "en_cours"
+                if set_streets_status(conn, bulk, status, team_id):
+                    if bulk_terminee:
+                        st.balloons()
+                    st.rerun()
+
             for _, row in df.iterrows():
                 rue = row["rue"]
                 status = row["status"]
@@ -590,10 +782,39 @@ def page_benevole() -> None:
                 st.markdown('</div>', unsafe_allow_html=True)
                 st.divider()
 
+    with tab_near:
+        st.caption("Rues de votre équipe encore à faire autour de l'adresse où vous êtes.")
+        with st.form("near_me"):
+            cA, cB, cC = st.columns([1, 3, 1])
+            with cA:
+                here_num = st.text_input("N° civique", placeholder="123", key="near_num")
+            with cB:
+                here_street = st.selectbox("Rue", options=db_street_names(conn), index=None,
+                                           placeholder="Rue où vous êtes", key="near_street")
+            with cC:
+                radius = st.selectbox("Rayon", options=[250, 500, 1000, 2000], index=1,
+                                      format_func=lambda m: f"{m} m", key="near_radius")
+            search = st.form_submit_button("Chercher", use_container_width=True)
+        if search and here_street:
+            try:
+                pos = spatial.address_location(conn, here_street, here_num)
+                if pos is None:
+                    st.warning("Cette adresse n'est pas géocodée.")
+                else:
+                    near = db_team_streets_near(conn, team_id, pos[0], pos[1], float(radius))
+                    if near:
+                        st.dataframe(
+                            pd.DataFrame(near, columns=["Rue", "Statut", "Distance (m)", "Adresses proches"]),
+                            use_container_width=True, hide_index=True,
+                        )
+                    else:
+                        st.info("Aucune rue à faire dans ce rayon.")
+            except Exception as e:
+                st.error(f"Recherche impossible: {e}")
+
     with tab_map:
         with st.spinner("Carte de votre équipe…"):
-            m = map_team(conn, team_id)
-            st_folium(m, height=640, use_container_width=True)
+            show_status_map(conn, key=f"map_team_{team_id}", height=640, team_id=team_id, zoom_start=13, weight=6)
     render_footer()
 
 
@@ -665,8 +886,26 @@ def page_gestionnaire() -> None:
             - 🔴 **Rouge pointillé** : Rue non assignée
             """)
         with st.spinner("Génération de la carte…"):
-            m = map_global(conn)
-            st_folium(m, height=720, use_container_width=True)
+            show_viewport_map(conn, key="map_gestionnaire", height=720)
+
+        with st.expander("⚙️ Cache des lectures & pool SQLite", expanded=False):
+            cs = cache_stats()
+            k1, k2, k3, k4 = st.columns(4)
+            k1.metric("Version données", cs["version"])
+            k2.metric("Hits", cs["hits"])
+            k3.metric("Misses", cs["misses"])
+            k4.metric("Taux de hit", f"{cs['hit_rate'] * 100:.0f}%")
+            if cs["functions"]:
+                st.dataframe(pd.DataFrame.from_dict(cs["functions"], orient="index"), use_container_width=True)
+            ps = get_pool().stats()
+            p1, p2, p3, p4 = st.columns(4)
+            p1.metric("Journal", str(ps["journal_mode"]).upper())
+            p2.metric("Lecteurs ouverts", ps["readers_opened"])
+            p3.metric("Écritures", ps["writes"])
+            p4.metric("Attente écriture max", f"{ps['write_wait_ms_max']:.0f} ms")
+            ls = get_activity_log().stats()
+            st.caption(f"Journal différé : {ls['written']} lignes écrites en {ls['batches']} lots, "
+                       f"{ls['pending']} en attente, {ls['backpressure']} attentes de contre-pression.")
     # --- Gestion & Assignation ---
     with tabs[1]:
         pass
@@ -690,9 +929,10 @@ def page_gestionnaire() -> None:
                                 st.error("Module bcrypt non disponible.")
                             else:
                                 hashed = bcrypt.hashpw(team_pwd.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-                                conn.execute("INSERT INTO teams (id, name, password_hash, active) VALUES (?, ?, ?, 1)",
-                                             (team_id.strip(), team_name.strip(), hashed))
-                                conn.commit()
+                                with get_pool().writer() as w:
+                                    w.execute("INSERT INTO teams (id, name, password_hash, active) VALUES (?, ?, ?, 1)",
+                                              (team_id.strip(), team_name.strip(), hashed))
+                                bump_data_version()
                                 st.success(f"Équipe {team_name} créée")
                         except sqlite3.IntegrityError:
                             st.error("Ce code d'équipe existe déjà")
@@ -711,8 +951,9 @@ def page_gestionnaire() -> None:
                         st.warning("Nom de secteur requis")
                     else:
                         try:
-                            conn.execute("INSERT INTO sectors (name) VALUES (?)", (sector_name.strip(),))
-                            conn.commit()
+                            with get_pool().writer() as w:
+                                w.execute("INSERT INTO sectors (name) VALUES (?)", (sector_name.strip(),))
+                            bump_data_version()
                             st.success(f"Secteur {sector_name} créé")
                         except sqlite3.IntegrityError:
                             st.error("Ce secteur existe déjà")
@@ -720,11 +961,47 @@ def page_gestionnaire() -> None:
                             st.error(f"Création secteur impossible: {e}")
                 st.markdown('</div>', unsafe_allow_html=True)
 
+        st.markdown("---")
+        st.markdown("### 🧭 Découpage automatique en secteurs")
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        with st.form("generate_sectors_form"):
+            c1, c2 = st.columns(2)
+            with c1:
+                nb_sectors = st.number_input("Nombre de secteurs", min_value=1, max_value=100, value=8, step=1)
+            with c2:
+                overwrite = st.checkbox("Redécouper aussi les rues qui ont déjà un secteur", value=False)
+            st.caption("Secteurs compacts d'après les adresses géocodées, équilibrés en nombre d'adresses. "
+                       "Sans redécoupage, les rues sans secteur rejoignent le secteur existant le plus proche.")
+            go_sectors = st.form_submit_button("Générer les secteurs")
+        if go_sectors:
+            try:
+                with get_pool().writer() as w:
+                    result = sectors.generate_sectors(w, int(nb_sectors), overwrite=overwrite, commit=False)
+                bump_data_version()
+                log_activity(conn, None, "SECTORS_GENERATED",
+                             f"{len(result['sectors'])} secteurs, {result['assigned']} rues")
+                if result["sectors"]:
+                    st.success(f"{result['assigned']} rues réparties en {len(result['sectors'])} secteurs")
+                    st.dataframe(
+                        pd.DataFrame(result["sectors"])[["name", "streets", "addresses"]]
+                        .rename(columns={"name": "Secteur", "streets": "Rues", "addresses": "Adresses"}),
+                        use_container_width=True, hide_index=True,
+                    )
+                else:
+                    st.info("Aucune rue géocodée à répartir.")
+                if result["removed"]:
+                    st.info(f"Secteurs vides supprimés : {', '.join(result['removed'])}")
+                if result["unplaced"]:
+                    st.warning(f"{len(result['unplaced'])} rues sans adresse géocodée laissées sans secteur.")
+            except Exception as e:
+                st.error(f"Découpage impossible: {e}")
+        st.markdown('</div>', unsafe_allow_html=True)
+
         st.markdown("---")
         st.markdown("### 🎯 Assigner des rues à une équipe")
 
         teams = db_teams(conn)
-        sectors = db_sectors(conn)
+        sector_rows = db_sectors(conn)
         rues_non_assignees = db_non_assigned_streets(conn)
 
         if not teams:
@@ -740,7 +1017,7 @@ def page_gestionnaire() -> None:
                     with c2:
                         sector_sel = st.selectbox(
                             "Filtrer par secteur (optionnel)",
-                            options=[(None, "Tous")] + sectors,
+                            options=[(None, "Tous")] + sector_rows,
                             format_func=lambda x: x[1] if x and x[0] is not None else "Tous",
                         )
 
@@ -759,15 +1036,32 @@ def page_gestionnaire() -> None:
                     selected = st.multiselect("Rues à assigner", options=options)
                     go = st.form_submit_button("Assigner")
 
-                if go:
-                    try:
-                        for rue in selected:
-                            conn.execute("UPDATE streets SET team = ?, status = CASE WHEN status='a_faire' THEN 'a_faire' ELSE status END WHERE name = ?", (team_sel[0], rue))
-                        conn.commit()
-                        st.success(f"{len(selected)} rues assignées à {team_sel[1]}")
+                if go and selected:
+                    n = assign_streets(conn, selected, team_sel[0])
+                    if n:
+                        st.success(f"{n} rues assignées à {team_sel[1]}")
                         st.rerun()
-                    except Exception as e:
-                        st.error(f"Assignation impossible: {e}")
+                st.markdown('</div>', unsafe_allow_html=True)
+
+        if teams and sector_rows:
+                st.markdown("### 🗂️ Réassigner un secteur entier")
+                st.markdown('<div class="card">', unsafe_allow_html=True)
+                with st.form("reassign_sector_form"):
+                    c1, c2 = st.columns(2)
+                    with c1:
+                        sector_pick = st.selectbox("Secteur", options=sector_rows, format_func=lambda x: x[1])
+                    with c2:
+                        team_pick = st.selectbox("Équipe", options=teams, format_func=lambda t: f"{t[0]} – {t[1]}",
+                                                 key="reassign_sector_team")
+                    only_free = st.checkbox("Seulement les rues non assignées", value=True)
+                    go_sector = st.form_submit_button("Réassigner le secteur")
+                if go_sector:
+                    n = reassign_sector(conn, int(sector_pick[0]), team_pick[0], only_free)
+                    if n:
+                        st.success(f"{n} rues du secteur {sector_pick[1]} assignées à {team_pick[1]}")
+                        st.rerun()
+                    else:
+                        st.info("Aucune rue à réassigner dans ce secteur.")
                 st.markdown('</div>', unsafe_allow_html=True)
     # --- Rapports & Exports ---
     with tabs[2]:
@@ -804,12 +1098,10 @@ def page_gestionnaire() -> None:
                                    CASE s.status WHEN 'terminee' THEN 'Terminée'
                                                  WHEN 'en_cours' THEN 'En cours'
                                                  ELSE 'À faire' END AS Statut,
-                                   COUNT(DISTINCT a.id) AS Nb_adresses
+                                   s.address_count AS Nb_adresses
                             FROM streets s
                             LEFT JOIN sectors c ON c.id = s.sector_id
                             LEFT JOIN teams t   ON t.id = s.team
-                            LEFT JOIN addresses a ON a.street_name = s.name
-                            GROUP BY s.id
                             ORDER BY c.name, s.name
                             """,
                             conn,
@@ -0,0 +1,197 @@
+"""
+Import en bloc des adresses civiques (nocivique*.csv / .xlsx).
+
+Pipeline :
+1. `read_civic_file` : lecture des seules colonnes utiles, en texte, par blocs ;
+2. `normalize_civic_frame` : détection des colonnes une seule fois puis
+   nettoyage vectorisé (pandas/NumPy) -> street_name, house_number,
+   postal_code, latitude, longitude ;
+3. `bulk_load` : une seule transaction, index secondaires de `addresses`
+   supprimés pendant le chargement puis recréés, `executemany` pour les rues
+   et les adresses. Retourne un rapport avec le débit (lignes/s). Les
+   triggers de statistiques par rue (db.STREET_STATS_*) sont suspendus pendant
+   le chargement, puis les statistiques sont recalculées en une requête.
+"""
+from __future__ import annotations
+
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from guignomap import db
+
+IMPORT_DIR = Path("import")
+
+STREET_COLUMNS = ("nomrue", "Nomrue", "rue", "street_name")
+NUMBER_COLUMNS = ("NoCiv", "numero", "house_number")
+POSTAL_COLUMNS = ("code_postal_trouve", "code_postal", "postal_code", "addr:postcode")
+LAT_COLUMNS = ("latitude", "lat")
+LON_COLUMNS = ("longitude", "lon", "lng")
+
+CHUNK_ROWS = 50_000
+
+
+def find_civic_file(stem: str = "nocivique", base_dir: Path = IMPORT_DIR) -> Path | None:
+    """Premier fichier trouvé parmi import/<stem>.csv, .xlsx puis import/archive/<stem>.xlsx."""
+    for candidate in (base_dir / f"{stem}.csv", base_dir / f"{stem}.xlsx", base_dir / "archive" / f"{stem}.xlsx"):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def _pick(columns, candidates) -> str | None:
+    lower = {c.lower(): c for c in columns}
+    for cand in candidates:
+        if cand in columns:
+            return cand
+        if cand.lower() in lower:
+            return lower[cand.lower()]
+    return None
+
+
+def read_civic_file(path: str | Path) -> pd.DataFrame:
+    """Lit un fichier civique en ne gardant que les colonnes reconnues (tout en texte)."""
+    path = Path(path)
+    wanted = STREET_COLUMNS + NUMBER_COLUMNS + POSTAL_COLUMNS + LAT_COLUMNS + LON_COLUMNS
+    if path.suffix.lower() == ".csv":
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = [c for c in header if c in wanted or c.lower() in {w.lower() for w in wanted}]
+        chunks = pd.read_csv(path, usecols=usecols, dtype=str, chunksize=CHUNK_ROWS, keep_default_na=True)
+        return pd.concat(chunks, ignore_index=True)
+    df = pd.read_excel(path, dtype=str)
+    return df[[c for c in df.columns if c in wanted or str(c).lower() in {w.lower() for w in wanted}]]
+
+
+def normalize_civic_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Colonnes de sortie : street_name, house_number, postal_code, latitude, longitude.
+    Lignes sans rue ou sans numéro retirées ; « NON TROUVÉ » / « ERREUR » -> code postal nul.
+    """
+    street_col = _pick(df.columns, STREET_COLUMNS)
+    number_col = _pick(df.columns, NUMBER_COLUMNS)
+    if street_col is None or number_col is None:
+        raise ValueError(f"Colonnes rue/numéro introuvables dans {list(df.columns)}")
+    postal_col = _pick(df.columns, POSTAL_COLUMNS)
+    lat_col = _pick(df.columns, LAT_COLUMNS)
+    lon_col = _pick(df.columns, LON_COLUMNS)
+
+    out = pd.DataFrame({
+        "street_name": df[street_col].astype("string").str.strip(),
+        # Les numéros lus comme flottants ("2690.0") sont ramenés à l'entier
+        "house_number": df[number_col].astype("string").str.strip().str.replace(r"\.0$", "", regex=True),
+    })
+    if postal_col is not None:
+        cp = df[postal_col].astype("string").str.strip().str.upper()
+        out["postal_code"] = cp.where(~cp.isin(["", "NON TROUVÉ", "ERREUR", "NAN"]))
+    else:
+        out["postal_code"] = pd.Series(pd.NA, index=df.index, dtype="string")
+    for name, col in (("latitude", lat_col), ("longitude", lon_col)):
+        out[name] = pd.to_numeric(df[col], errors="coerce") if col is not None else np.nan
+
+    out = out[out["street_name"].fillna("").ne("") & out["house_number"].fillna("").ne("")]
+    return out.reset_index(drop=True)
+
+
+def postal_column(conn: sqlite3.Connection) -> str | None:
+    """Nom de la colonne code postal de `addresses` selon le schéma en place."""
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(addresses)").fetchall()}
+    for name in ("postal_code", "code_postal"):
+        if name in cols:
+            return name
+    return None
+
+
+def _secondary_indexes(conn: sqlite3.Connection, table: str) -> list[tuple[str, str]]:
+    return conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,),
+    ).fetchall()
+
+
+def _none_if_na(values: np.ndarray) -> list:
+    return [None if (v is None or v is pd.NA or (isinstance(v, float) and np.isnan(v))) else v for v in values]
+
+
+def bulk_load(conn: sqlite3.Connection, df: pd.DataFrame, replace: bool = True,
+              osm_type: str | None = "official") -> dict:
+    """
+    Charge un DataFrame normalisé dans streets + addresses, en une transaction.
+    replace=True vide d'abord notes, addresses et streets (comportement historique).
+    Retourne {'streets', 'addresses', 'seconds', 'rows_per_s'}.
+    """
+    t0 = time.perf_counter()
+    addr_cols = {r[1] for r in conn.execute("PRAGMA table_info(addresses)").fetchall()}
+    cp_col = postal_column(conn)
+
+    data = {
+        "street_name": df["street_name"].to_numpy(dtype=object),
+        "house_number": df["house_number"].to_numpy(dtype=object),
+    }
+    if cp_col:
+        data[cp_col] = _none_if_na(df["postal_code"].to_numpy(dtype=object))
+    data["latitude"] = _none_if_na(df["latitude"].to_numpy(dtype=object))
+    data["longitude"] = _none_if_na(df["longitude"].to_numpy(dtype=object))
+    if osm_type is not None and "osm_type" in addr_cols:
+        data["osm_type"] = [osm_type] * len(df)
+    cols = list(data)
+    rows = list(zip(*data.values()))
+    streets = [(s,) for s in pd.unique(df["street_name"])]
+
+    indexes = _secondary_indexes(conn, "addresses")
+    street_cols = {r[1] for r in conn.execute("PRAGMA table_info(streets)").fetchall()}
+    has_stats = "address_count" in street_cols
+    if conn.in_transaction:
+        conn.commit()
+    try:
+        conn.execute("BEGIN")
+        if has_stats:
+            db.drop_street_stats_triggers(conn)
+        if replace:
+            for table in ("notes", "addresses", "streets"):
+                try:
+                    conn.execute(f"DELETE FROM {table}")
+                except sqlite3.OperationalError:
+                    pass
+        for name, _sql in indexes:
+            conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+        conn.executemany("INSERT OR IGNORE INTO streets (name, status) VALUES (?, 'a_faire')", streets)
+        ins_cols, ins_rows = cols, rows
+        if "street_id" in addr_cols:
+            # Clé entière posée directement : le trigger de résolution par nom ne s'exécute pas
+            ids = dict(conn.execute("SELECT name, id FROM streets").fetchall())
+            ins_cols = cols + ["street_id"]
+            ins_rows = [(*r, ids.get(r[0])) for r in rows]
+        conn.executemany(
+            f"INSERT INTO addresses ({', '.join(ins_cols)}) VALUES ({', '.join('?' for _ in ins_cols)})",
+            ins_rows,
+        )
+        for _name, sql in indexes:
+            conn.execute(sql)
+        if has_stats:
+            db.create_street_stats_triggers(conn)
+            db.refresh_street_address_stats(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    seconds = time.perf_counter() - t0
+    return {
+        "streets": len(streets),
+        "addresses": len(rows),
+        "seconds": seconds,
+        "rows_per_s": (len(rows) / seconds) if seconds else float("inf"),
+    }
+
+
+def import_civic_file(conn: sqlite3.Connection, path: str | Path, replace: bool = True) -> dict:
+    """Lecture + normalisation + chargement. Ajoute 'read_seconds' au rapport."""
+    t0 = time.perf_counter()
+    df = normalize_civic_frame(read_civic_file(path))
+    read_seconds = time.perf_counter() - t0
+    report = bulk_load(conn, df, replace=replace)
+    report["read_seconds"] = read_seconds
+    return report
@@ -0,0 +1,103 @@
+"""
+Cache en mémoire des lectures, invalidé par un compteur de version des données.
+
+Chaque écriture applicative (statut, note, équipe, secteur, assignation)
+appelle `bump_data_version()`. Les fonctions décorées par `versioned_cache`
+servent leur résultat tant que la version n'a pas changé ; le premier appel
+après une écriture recalcule. Le cache est partagé par toutes les sessions
+Streamlit du processus (thread-safe) et compte ses hits/misses.
+"""
+from __future__ import annotations
+
+import functools
+import threading
+from typing import Any, Callable
+
+import pandas as pd
+
+_lock = threading.Lock()
+_version = 0
+_entries: dict[tuple, tuple[int, Any]] = {}
+_stats: dict[str, dict[str, int]] = {}
+
+MAX_ENTRIES = 1024
+
+
+def data_version() -> int:
+    """Version courante des données (croissante)."""
+    return _version
+
+
+def bump_data_version() -> int:
+    """Signale une écriture : toutes les entrées existantes deviennent périmées."""
+    global _version
+    with _lock:
+        _version += 1
+        _entries.clear()
+        return _version
+
+
+def clear_cache() -> None:
+    """Vide le cache et remet les compteurs à zéro (tests, maintenance)."""
+    with _lock:
+        _entries.clear()
+        _stats.clear()
+
+
+def cache_stats() -> dict:
+    """{'version', 'size', 'hits', 'misses', 'hit_rate', 'functions': {nom: {'hits', 'misses'}}}"""
+    with _lock:
+        hits = sum(s["hits"] for s in _stats.values())
+        misses = sum(s["misses"] for s in _stats.values())
+        return {
+            "version": _version,
+            "size": len(_entries),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / (hits + misses)) if (hits + misses) else 0.0,
+            "functions": {k: dict(v) for k, v in _stats.items()},
+        }
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _copy(value: Any) -> Any:
+    # Les DataFrames sont souvent modifiés par l'appelant : on rend une copie
+    return value.copy() if isinstance(value, pd.DataFrame) else value
+
+
+def versioned_cache(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Décorateur pour les lectures de la forme fn(conn, *args, **kwargs).
+    La connexion (premier argument) ne fait pas partie de la clé.
+    """
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def _wrapped(conn, *args, **kwargs):
+        key = (name, _freeze(args), _freeze(kwargs))
+        with _lock:
+            stats = _stats.setdefault(name, {"hits": 0, "misses": 0})
+            entry = _entries.get(key)
+            if entry is not None and entry[0] == _version:
+                stats["hits"] += 1
+                return _copy(entry[1])
+            stats["misses"] += 1
+            version = _version
+        result = fn(conn, *args, **kwargs)
+        with _lock:
+            # Une écriture a pu survenir pendant le calcul : on ne stocke que si la version est inchangée
+            if version == _version:
+                if len(_entries) >= MAX_ENTRIES:
+                    _entries.pop(next(iter(_entries)))
+                _entries[key] = (version, result)
+        return _copy(result)
+
+    _wrapped.uncached = fn  # type: ignore[attr-defined]
+    return _wrapped
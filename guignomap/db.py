@@ -157,39 +157,11 @@ def extended_stats(conn):
 # --- Adapters utilisés par app.py (append-only, safe) -------------------------
 def update_street_status(conn, street_name: str, status: str, team_id: str | None = None) -> bool:
     """
-    Met à jour le statut d'une rue dans la table streets OU street_status si streets manquante.
+    Met à jour le statut d'une rue (streets + historique, voir set_street_status).
     Idempotent. Retourne True si succès.
     """
     try:
-        # chemin principal : table streets si présente
-        try:
-            conn.execute("UPDATE streets SET status = ? WHERE name = ?", (status, street_name))
-            conn.commit()
-            return True
-        except Exception:
-            pass
-        # fallback : table street_status (créée par init_street_status_schema)
-        if 'init_street_status_schema' in globals():
-            init_street_status_schema(conn)
-        if status == "terminee":
-            if 'mark_street_complete' in globals():
-                mark_street_complete(conn, street_name, team_id or "")
-        elif status == "en_cours":
-            if 'mark_street_in_progress' in globals():
-                mark_street_in_progress(conn, street_name, team_id or "", "")
-        else:
-            # 'a_faire' : on force l'upsert avec statut 'a_faire'
-            cur = conn.cursor()
-            cur.execute("""
-                INSERT INTO street_status (street_name, team_id, status)
-                VALUES (?, ?, 'a_faire')
-                ON CONFLICT(street_name) DO UPDATE SET
-                    team_id=COALESCE(excluded.team_id, street_status.team_id),
-                    status='a_faire',
-                    updated_at=CURRENT_TIMESTAMP;
-            """, (street_name, team_id or ""))
-            conn.commit()
-        return True
+        return set_street_status(conn, street_name, status, team_id)
     except Exception:
         return False
 
@@ -197,29 +169,17 @@ def add_street_note(conn, street_name: str, team_id: str, note: str) -> bool:
     """
     Ajoute une note horodatée :
       1) insère une ligne dans `notes` (address_number = NULL),
-      2) appelle save_checkpoint(...) pour alimenter street_status.notes/last_checkpoint.
+      2) appelle save_checkpoint(...) pour alimenter street_checkpoints/last_checkpoint.
     Retourne True si succès, False sinon.
     """
     try:
-        # S’assurer que la table `notes` existe (idempotent)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS notes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                street_name TEXT NOT NULL,
-                team_id TEXT NOT NULL,
-                address_number TEXT,
-                comment TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-
         # 1) trace structurée dans `notes`
         conn.execute(
             "INSERT INTO notes (street_name, team_id, address_number, comment) VALUES (?, ?, NULL, ?)",
             (street_name, team_id, note)
         )
 
-        # 2) checkpoint texte (historique cumulatif)
+        # 2) checkpoint (journal street_checkpoints)
         try:
             save_checkpoint(conn, street_name, team_id, note)
         except Exception:
@@ -245,7 +205,7 @@ def get_street_notes_for_team(conn, street_name: str, team_id: str):
                    comment,
                    created_at
             FROM notes
-            WHERE street_name = ? AND team_id = ?
+            WHERE street_id = (SELECT id FROM streets WHERE name = ?) AND team_id = ?
             ORDER BY created_at DESC
         """
         import pandas as pd
@@ -261,10 +221,12 @@ def get_visited_addresses_for_street(conn, street_name: str, team_id: str | None
     """
     try:
         if team_id:
-            q = "SELECT address_number FROM notes WHERE street_name = ? AND team_id = ? AND comment = 'Visitée'"
+            q = ("SELECT address_number FROM notes WHERE street_id = (SELECT id FROM streets WHERE name = ?) "
+                 "AND team_id = ? AND comment = 'Visitée'")
             rows = conn.execute(q, (street_name, team_id)).fetchall()
         else:
-            q = "SELECT address_number FROM notes WHERE street_name = ? AND comment = 'Visitée'"
+            q = ("SELECT address_number FROM notes WHERE street_id = (SELECT id FROM streets WHERE name = ?) "
+                 "AND comment = 'Visitée'")
             rows = conn.execute(q, (street_name,)).fetchall()
         return [r[0] for r in rows if r and r[0]]
     except Exception:
@@ -276,9 +238,6 @@ def init_db(conn):
     Initialise le schéma complet de la base (toutes tables nécessaires à l’application).
     Idempotent, safe à rappeler plusieurs fois.
     """
-    # Table street_status (API bénévole)
-    init_street_status_schema(conn)
-
     # ensure one statement per execute
     conn.execute("""
         CREATE TABLE IF NOT EXISTS sectors (
@@ -319,15 +278,16 @@ def init_db(conn):
         )
     """)
 
-    # Index principaux
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_streets_team ON streets(team);")
+    # Index principaux (les index composites des requêtes fréquentes : init_query_indexes)
     conn.execute("CREATE INDEX IF NOT EXISTS idx_streets_status ON streets(status);")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_notes_street ON notes(street_name);")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_activity_created ON activity_log(created_at DESC);")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_addresses_street ON addresses(street_name);")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_addresses_number ON addresses(house_number);")
-
     conn.commit()
+
+    # Structures dérivées (suivi des rues, clés entières, index composites, compteurs,
+    # statistiques par rue, géométrie, index spatial) : migrations versionnées
+    from guignomap import migrations
+    migrations.migrate(conn)
 # === end init_db ==============================================================
 # === Fonctions manquantes pour compatibilité app.py ===========================
 from datetime import datetime
@@ -347,7 +307,7 @@ def get_conn(db_path: str | Path = DB_PATH_DEFAULT) -> sqlite3.Connection:
 # === end helper ===============================================================
 def get_addresses_for_street(conn, street_name):
     """Récupère toutes les adresses d'une rue."""
-    query = "SELECT house_number FROM addresses WHERE street_name = ?"
+    query = "SELECT house_number FROM addresses WHERE street_id = (SELECT id FROM streets WHERE name = ?)"
     df = pd.read_sql_query(query, conn, params=(street_name,))
     return df
     # except Exception as e:
@@ -370,7 +330,8 @@ def mark_address_visited(conn, street_name, house_number, team_id, note="Visité
     try:
         # Cherche si une note "Visitée" existe déjà pour éviter les doublons
         cursor = conn.execute(
-            "SELECT id FROM notes WHERE street_name = ? AND address_number = ? AND team_id = ? AND comment = 'Visitée'",
+            "SELECT id FROM notes WHERE street_id = (SELECT id FROM streets WHERE name = ?) "
+            "AND address_number = ? AND team_id = ? AND comment = 'Visitée'",
             (street_name, house_number, team_id)
         )
         if cursor.fetchone() is None:
@@ -595,13 +556,26 @@ def mark_address_visited(conn, street_name, house_number, team_id, note="Visité
         # Cette fonction est probablement obsolète mais conservée pour référence
         return 0# === street_status API (append-only, safe) =====================================
 from datetime import datetime
+import re
 import sqlite3
+# Les checkpoints sont ajoutés à street_checkpoints (une ligne chacun) ; street_status
+# ne garde que le dernier (last_checkpoint). L'ancien champ cumulatif notes est
+# migré vers le journal puis vidé.
+CHECKPOINT_NOTES_TAIL = 10
+_CHECKPOINT_LINE = re.compile(r"^\[([^\]]+)\] ([^:]*): ?(.*)$")
+
+
 def init_street_status_schema(conn: sqlite3.Connection) -> None:
     """
-    Crée la table de suivi si absente + index sur team_id.
+    Crée la table de suivi et le journal des checkpoints si absents + index.
     Idempotent, safe à appeler plusieurs fois.
     """
     cur = conn.cursor()
+    if _is_view(conn, "street_status"):
+        # Déjà fusionnée dans streets (init_unified_status) : seul le journal reste ici
+        _init_checkpoint_journal(cur)
+        conn.commit()
+        return
     cur.execute("""
         CREATE TABLE IF NOT EXISTS street_status (
             id INTEGER PRIMARY KEY,
@@ -615,77 +589,153 @@ def init_street_status_schema(conn: sqlite3.Connection) -> None:
         );
     """)
     cur.execute("CREATE INDEX IF NOT EXISTS idx_street_status_team ON street_status(team_id);")
+    _init_checkpoint_journal(cur)
+    # Index partiel des seules lignes encore à migrer : le contrôle ci-dessous ne lit rien ensuite
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_street_status_legacy_notes "
+                "ON street_status(street_name) WHERE notes IS NOT NULL AND notes <> '';")
+    _migrate_checkpoint_notes(conn)
     conn.commit()
-def mark_street_complete(conn: sqlite3.Connection, street_name: str, team_id: str) -> None:
+
+
+def _init_checkpoint_journal(cur: sqlite3.Cursor) -> None:
+    # Journal relié à la rue par street_id (suit les renommages, voir init_street_keys) ;
+    # street_name reste pour les lignes orphelines et l'affichage
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS street_checkpoints (
+            id INTEGER PRIMARY KEY,
+            street_id INTEGER REFERENCES streets(id),
+            street_name TEXT NOT NULL,
+            team_id TEXT,
+            note TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+    """)
+    cols = {r[1] for r in cur.execute("PRAGMA table_info(street_checkpoints)").fetchall()}
+    if "street_id" not in cols:
+        cur.execute("ALTER TABLE street_checkpoints ADD COLUMN street_id INTEGER REFERENCES streets(id)")
+    cur.execute("DROP INDEX IF EXISTS idx_street_checkpoints_street;")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_street_checkpoints_street_id "
+                "ON street_checkpoints(street_id, created_at);")
+
+
+def _parse_checkpoint_notes(notes: str, team_id: str | None, fallback_ts: str | None) -> list[tuple]:
+    """Ancien champ notes ('[ts] équipe: note' par ligne) -> [(team_id, note, created_at)]."""
+    entries: list[list] = []
+    for line in notes.split("\n"):
+        m = _CHECKPOINT_LINE.match(line)
+        if m:
+            entries.append([m.group(2), m.group(3), m.group(1)])
+        elif entries:
+            # Note sur plusieurs lignes : suite de l'entrée précédente
+            entries[-1][1] += "\n" + line
+        elif line.strip():
+            entries.append([team_id, line, fallback_ts or ""])
+    return [tuple(e) for e in entries]
+
+
+def _migrate_checkpoint_notes(conn: sqlite3.Connection) -> int:
+    """Déplace les champs notes restants vers street_checkpoints. Retourne le nombre d'entrées."""
+    rows = conn.execute(
+        "SELECT street_name, team_id, notes, updated_at FROM street_status WHERE notes IS NOT NULL AND notes <> ''"
+    ).fetchall()
+    n = 0
+    for street_name, team_id, notes, updated_at in rows:
+        entries = _parse_checkpoint_notes(notes, team_id, updated_at)
+        conn.executemany(
+            "INSERT INTO street_checkpoints (street_id, street_name, team_id, note, created_at) "
+            "VALUES ((SELECT id FROM streets WHERE name = ?1), ?1, ?2, ?3, ?4)",
+            [(street_name, *e) for e in entries],
+        )
+        conn.execute("UPDATE street_status SET notes = NULL WHERE street_name = ?", (street_name,))
+        n += len(entries)
+    return n
+def mark_street_complete(conn: sqlite3.Connection, street_name: str, team_id: str) -> bool:
     """
-    Marque une rue comme terminée, enregistrement/upsert par street_name.
+    Marque une rue comme terminée. Voir set_street_status. False si la rue est inconnue.
     """
-    init_street_status_schema(conn)
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO street_status (street_name, team_id, status, completed_at)
-        VALUES (?, ?, 'terminee', CURRENT_TIMESTAMP)
-        ON CONFLICT(street_name) DO UPDATE SET
-            team_id=excluded.team_id,
-            status='terminee',
-            completed_at=CURRENT_TIMESTAMP,
-            updated_at=CURRENT_TIMESTAMP;
-    """, (street_name, team_id))
-    conn.commit()
-def mark_street_in_progress(conn: sqlite3.Connection, street_name: str, team_id: str, checkpoint_note: str = "") -> None:
+    return set_street_status(conn, street_name, "terminee", team_id)
+def mark_street_in_progress(conn: sqlite3.Connection, street_name: str, team_id: str, checkpoint_note: str = "") -> bool:
     """
     Marque une rue comme en cours. Si checkpoint_note est fourni, met à jour last_checkpoint.
+    False si la rue est inconnue.
     """
-    init_street_status_schema(conn)
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO street_status (street_name, team_id, status, last_checkpoint)
-        VALUES (?, ?, 'en_cours', ?)
-        ON CONFLICT(street_name) DO UPDATE SET
-            team_id=excluded.team_id,
-            status='en_cours',
-            last_checkpoint=CASE
-                WHEN ? IS NOT NULL AND ? <> '' THEN ?
-                ELSE street_status.last_checkpoint
-            END,
-            updated_at=CURRENT_TIMESTAMP;
-    """, (street_name, team_id, checkpoint_note, checkpoint_note, checkpoint_note, checkpoint_note))
-    conn.commit()
-def save_checkpoint(conn: sqlite3.Connection, street_name: str, team_id: str, note: str) -> None:
+    return set_street_status(conn, street_name, "en_cours", team_id, checkpoint=checkpoint_note or None)
+def save_checkpoint(conn: sqlite3.Connection, street_name: str, team_id: str, note: str) -> bool:
     """
-    Ajoute une note horodatée au champ notes, et met à jour last_checkpoint.
-    Conserve le status courant s'il existe, sinon le force à 'en_cours'.
+    Ajoute une note horodatée au journal street_checkpoints, et met à jour last_checkpoint.
+    Une rue « à faire » passe 'en_cours' ; sinon son statut est conservé. Une rue inconnue
+    n'est pas créée : rien n'est écrit et False est retourné.
+    Coût constant : l'historique de la rue n'est ni relu ni réécrit.
     """
-    init_street_status_schema(conn)
-    cur = conn.cursor()
-    cur.execute("SELECT notes FROM street_status WHERE street_name = ?;", (street_name,))
-    row = cur.fetchone()
-    old_notes = row[0] if row and row[0] else None
     ts = datetime.now().isoformat(timespec="seconds")
-    entry = f"[{ts}] {team_id}: {note}".strip()
-    combined = (old_notes + "\n" + entry) if old_notes else entry
-    cur.execute("""
-        INSERT INTO street_status (street_name, team_id, status, last_checkpoint, notes)
-        VALUES (?, ?, COALESCE((SELECT status FROM street_status WHERE street_name=?), 'en_cours'), ?, ?)
-        ON CONFLICT(street_name) DO UPDATE SET
-            team_id=excluded.team_id,
-            notes=?,
-            last_checkpoint=?,
-            updated_at=CURRENT_TIMESTAMP;
-    """, (street_name, team_id, street_name, note, combined, combined, note))
+    cur = conn.execute("""
+        INSERT INTO street_checkpoints (street_id, street_name, team_id, note, created_at)
+        SELECT id, name, ?, ?, ? FROM streets WHERE name = ?;
+    """, (team_id, note, ts, street_name))
+    if cur.rowcount == 0:
+        return False
+    if not set_street_status(conn, street_name, "en_cours", team_id, checkpoint=note,
+                             commit=False, only_from="a_faire"):
+        conn.execute("UPDATE streets SET last_checkpoint = ? WHERE name = ?", (note, street_name))
     conn.commit()
-def get_team_streets_status(conn: sqlite3.Connection, team_id: str) -> list[dict]:
+    return True
+
+
+def get_street_checkpoints(conn: sqlite3.Connection, street_name: str, limit: int = 20,
+                           before: tuple[str, int] | None = None) -> list[dict]:
+    """
+    Checkpoints d'une rue, du plus récent au plus ancien, par pages de `limit`.
+    Page suivante : before=(created_at, id) de la dernière ligne reçue.
+    """
+    return _street_checkpoints_page(conn, street_name, limit, before)
+
+
+def _street_checkpoints_page(conn: sqlite3.Connection, street_name: str, limit: int,
+                             before: tuple[str, int] | None = None) -> list[dict]:
+    if before is None:
+        rows = conn.execute("""
+            SELECT id, street_name, team_id, note, created_at FROM street_checkpoints
+            WHERE street_id = (SELECT id FROM streets WHERE name = ?)
+            ORDER BY created_at DESC, id DESC LIMIT ?
+        """, (street_name, int(limit))).fetchall()
+    else:
+        rows = conn.execute("""
+            SELECT id, street_name, team_id, note, created_at FROM street_checkpoints
+            WHERE street_id = (SELECT id FROM streets WHERE name = ?) AND (created_at, id) < (?, ?)
+            ORDER BY created_at DESC, id DESC LIMIT ?
+        """, (street_name, before[0], int(before[1]), int(limit))).fetchall()
+    return [
+        {"id": r[0], "street_name": r[1], "team_id": r[2], "note": r[3], "created_at": r[4]}
+        for r in rows
+    ]
+
+
+def count_street_checkpoints(conn: sqlite3.Connection, street_name: str) -> int:
+    return conn.execute(
+        "SELECT COUNT(*) FROM street_checkpoints WHERE street_id = (SELECT id FROM streets WHERE name = ?)",
+        (street_name,)
+    ).fetchone()[0]
+
+
+def _format_checkpoints(entries: list[dict]) -> str | None:
+    """Entrées (plus récentes d'abord) -> texte de l'ancien champ notes (plus anciennes d'abord)."""
+    if not entries:
+        return None
+    return "\n".join(f"[{e['created_at']}] {e['team_id']}: {e['note']}".strip() for e in reversed(entries))
+def get_team_streets_status(conn: sqlite3.Connection, team_id: str,
+                            notes_limit: int = CHECKPOINT_NOTES_TAIL) -> list[dict]:
     """
     Retourne la vue d'équipe : [{street_name, team_id, status, last_checkpoint, notes, completed_at, updated_at}]
-    Triée par nom de rue pour stabilité.
+    Rues assignées à l'équipe, triées par nom. État lu dans streets seulement ; `notes`
+    ne reprend que les `notes_limit` derniers checkpoints (historique complet :
+    get_street_checkpoints).
     """
-    init_street_status_schema(conn)
     cur = conn.cursor()
     rows = cur.execute("""
-        SELECT street_name, team_id, status, last_checkpoint, notes, completed_at, updated_at
-        FROM street_status
-        WHERE team_id = ?
-        ORDER BY street_name ASC;
+        SELECT name, team, status, last_checkpoint, completed_at, status_updated_at
+        FROM streets
+        WHERE team = ?
+        ORDER BY name ASC;
     """, (team_id,)).fetchall()
     result = []
     for r in rows:
@@ -694,9 +744,661 @@ def get_team_streets_status(conn: sqlite3.Connection, team_id: str) -> list[dict
             "team_id": r[1],
             "status": r[2],
             "last_checkpoint": r[3],
-            "notes": r[4],
-            "completed_at": r[5],
-            "updated_at": r[6],
+            "notes": _format_checkpoints(_street_checkpoints_page(conn, r[0], notes_limit)),
+            "completed_at": r[4],
+            "updated_at": r[5],
         })
     return result
 # === end street_status API =====================================================
+# === progress_counters API (append-only, safe) =================================
+# Compteurs de rues par statut, tenus à jour par des triggers sur `streets` :
+# scope 'global' (key ''), 'team' (key = équipe, '' = non assignée) et 'sector'
+# (key = sector_id, ou nom du secteur pour le schéma d'import_data.py, '' = aucun).
+# Les lectures sont des recherches par clé primaire au lieu de COUNT/SUM sur streets.
+PROGRESS_STATUSES = ("a_faire", "en_cours", "terminee")
+
+
+def _progress_sector_column(conn: sqlite3.Connection) -> str | None:
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(streets)").fetchall()}
+    return next((c for c in ("sector_id", "sector") if c in cols), None)
+
+
+def _progress_keys(conn: sqlite3.Connection, alias: str) -> tuple[str, str, str]:
+    """Expressions SQL (statut, équipe, secteur) pour une ligne de streets."""
+    sector = _progress_sector_column(conn)
+    sector_expr = f"COALESCE(CAST({alias}.{sector} AS TEXT), '')" if sector else "''"
+    return f"COALESCE({alias}.status, 'a_faire')", f"COALESCE({alias}.team, '')", sector_expr
+
+
+def _has_trigger(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def init_progress_counters(conn: sqlite3.Connection) -> None:
+    """
+    Crée la table progress_counters et ses triggers sur streets (idempotent).
+    Remplit les compteurs s'ils sont vides alors que des rues existent, ou s'ils
+    ont été tenus sans triggers (streets recréée hors migrations).
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS progress_counters (
+            scope TEXT NOT NULL,          -- 'global' | 'team' | 'sector'
+            key TEXT NOT NULL,
+            status TEXT NOT NULL,
+            n INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, key, status)
+        ) WITHOUT ROWID
+    """)
+    sector = _progress_sector_column(conn)
+    new_s, new_t, new_k = _progress_keys(conn, "NEW")
+    old_s, old_t, old_k = _progress_keys(conn, "OLD")
+    increment = f"""
+        INSERT INTO progress_counters (scope, key, status, n)
+        VALUES ('global', '', {new_s}, 1), ('team', {new_t}, {new_s}, 1), ('sector', {new_k}, {new_s}, 1)
+        ON CONFLICT(scope, key, status) DO UPDATE SET n = n + 1;
+    """
+    decrement = f"""
+        UPDATE progress_counters SET n = n - 1
+        WHERE (scope, key, status) IN (VALUES ('global', '', {old_s}), ('team', {old_t}, {old_s}),
+                                              ('sector', {old_k}, {old_s}));
+    """
+    watched = "status, team" + (f", {sector}" if sector else "")
+    untracked = not _has_trigger(conn, "trg_progress_streets_insert")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_progress_streets_insert AFTER INSERT ON streets BEGIN {increment} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_progress_streets_delete AFTER DELETE ON streets BEGIN {decrement} END")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_progress_streets_update AFTER UPDATE OF {watched} ON streets
+        WHEN {old_s} IS NOT {new_s} OR {old_t} IS NOT {new_t} OR {old_k} IS NOT {new_k}
+        BEGIN {decrement} {increment} END
+    """)
+    if untracked or (conn.execute("SELECT 1 FROM progress_counters LIMIT 1").fetchone() is None
+                     and conn.execute("SELECT 1 FROM streets LIMIT 1").fetchone() is not None):
+        rebuild_progress_counters(conn)
+    conn.commit()
+
+
+def _progress_expected(conn: sqlite3.Connection) -> dict[tuple[str, str, str], int]:
+    s, t, k = _progress_keys(conn, "streets")
+    rows = conn.execute(f"""
+        SELECT 'global', '', {s}, COUNT(*) FROM streets GROUP BY 3
+        UNION ALL SELECT 'team', {t}, {s}, COUNT(*) FROM streets GROUP BY 2, 3
+        UNION ALL SELECT 'sector', {k}, {s}, COUNT(*) FROM streets GROUP BY 2, 3
+    """).fetchall()
+    return {(r[0], r[1], r[2]): r[3] for r in rows}
+
+
+def rebuild_progress_counters(conn: sqlite3.Connection) -> int:
+    """Recalcule tous les compteurs depuis streets. Retourne le nombre de compteurs."""
+    expected = _progress_expected(conn)
+    conn.execute("DELETE FROM progress_counters")
+    conn.executemany(
+        "INSERT INTO progress_counters (scope, key, status, n) VALUES (?, ?, ?, ?)",
+        [(*key, n) for key, n in expected.items()],
+    )
+    conn.commit()
+    return len(expected)
+
+
+def check_progress_counters(conn: sqlite3.Connection, repair: bool = True) -> list[tuple]:
+    """
+    Compare les compteurs à un recomptage complet : [(scope, key, status, stocké, réel)].
+    Avec repair=True, reconstruit les compteurs si un écart est trouvé.
+    """
+    expected = _progress_expected(conn)
+    stored = {(r[0], r[1], r[2]): r[3] for r in conn.execute(
+        "SELECT scope, key, status, n FROM progress_counters WHERE n != 0").fetchall()}
+    diffs = sorted(
+        (*key, stored.get(key, 0), expected.get(key, 0))
+        for key in set(expected) | set(stored)
+        if stored.get(key, 0) != expected.get(key, 0)
+    )
+    if diffs and repair:
+        rebuild_progress_counters(conn)
+    return diffs
+
+
+def _progress_counts(rows) -> dict:
+    counts = dict.fromkeys(PROGRESS_STATUSES, 0)
+    for status, n in rows:
+        counts[status] = counts.get(status, 0) + n
+    counts["total"] = sum(counts.values())
+    return counts
+
+
+def progress_global(conn: sqlite3.Connection) -> dict:
+    """{'a_faire', 'en_cours', 'terminee', 'total'} pour toutes les rues."""
+    return _progress_counts(conn.execute(
+        "SELECT status, n FROM progress_counters WHERE scope = 'global' AND key = ''").fetchall())
+
+
+def progress_for_team(conn: sqlite3.Connection, team_id: str | None) -> dict:
+    """Mêmes clés que progress_global pour une équipe (None ou '' = rues non assignées)."""
+    return _progress_counts(conn.execute(
+        "SELECT status, n FROM progress_counters WHERE scope = 'team' AND key = ?", (team_id or "",)).fetchall())
+
+
+def _progress_by(conn: sqlite3.Connection, scope: str) -> dict[str, dict]:
+    grouped: dict[str, list] = {}
+    for key, status, n in conn.execute(
+            "SELECT key, status, n FROM progress_counters WHERE scope = ? AND n != 0", (scope,)).fetchall():
+        grouped.setdefault(key, []).append((status, n))
+    return {key: _progress_counts(rows) for key, rows in grouped.items()}
+
+
+def progress_by_team(conn: sqlite3.Connection) -> dict[str, dict]:
+    """{équipe: compteurs} pour les équipes ayant des rues (hors non assignées)."""
+    by_team = _progress_by(conn, "team")
+    by_team.pop("", None)
+    return by_team
+
+
+def progress_by_sector(conn: sqlite3.Connection) -> dict[str, dict]:
+    """{clé de secteur: compteurs} ('' = rues sans secteur)."""
+    return _progress_by(conn, "sector")
+# === end progress_counters API =================================================
+# === query indexes (append-only, safe) =========================================
+# Index composites / couvrants des requêtes fréquentes d'app.py et db.py ; chaque
+# index remplace l'index mono-colonne qui en est le préfixe (supprimé s'il existe).
+# tests/test_query_plans.py vérifie les plans (EXPLAIN QUERY PLAN) de ces requêtes.
+QUERY_INDEXES = {
+    # rues d'une équipe par statut (db_assigned_streets, progression, listes)
+    "idx_streets_team_status": ("streets", "team, status, name"),
+    # rues non assignées d'un secteur (assignation par secteur)
+    "idx_streets_sector_team": ("streets", "{sector}, team"),
+    # adresses d'une rue (jointure streets -> addresses, numéros d'une rue)
+    "idx_addresses_street_number": ("addresses", "street_name, house_number"),
+    # jointures sur la clé entière (voir init_street_keys)
+    "idx_addresses_street_id": ("addresses", "street_id"),
+    # adresses visitées d'une rue (par équipe) : street_id, team_id, comment, couvrant address_number
+    "idx_notes_street_id_team": ("notes", "street_id, team_id, comment, address_number"),
+    # dernières notes d'une équipe (db_last_checkpoint, get_team_notes)
+    "idx_notes_team_created": ("notes", "team_id, created_at DESC, street_name"),
+}
+SUPERSEDED_INDEXES = ("idx_streets_team", "idx_notes_street", "idx_addresses_street", "idx_notes_street_team")
+
+
+def init_query_indexes(conn: sqlite3.Connection) -> list[str]:
+    """
+    Crée les index de QUERY_INDEXES absents et supprime ceux qu'ils remplacent
+    (idempotent). Retourne les index créés.
+    """
+    existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()}
+    created = []
+    for name, (table, columns) in QUERY_INDEXES.items():
+        cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+        if not cols:
+            continue
+        if "{sector}" in columns:
+            sector = next((c for c in ("sector_id", "sector") if c in cols), None)
+            if sector is None:
+                continue
+            columns = columns.format(sector=sector)
+        if any(c.split()[0] not in cols for c in columns.split(",")):
+            continue
+        if name not in existing:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})")
+            created.append(name)
+    for name in SUPERSEDED_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+    return created
+# === end query indexes =========================================================
+# === street address stats (append-only, safe) ==================================
+# Nombre d'adresses, boîte englobante et centroïde de chaque rue, stockés sur
+# `streets`. Des triggers sur `addresses` recalculent la rue touchée (agrégat
+# indexé sur ses seules adresses) ; les chargements en bloc suspendent ces
+# triggers puis appellent refresh_street_address_stats une fois.
+STREET_STATS_COLUMNS = (
+    ("address_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("min_lat", "REAL"),
+    ("max_lat", "REAL"),
+    ("min_lon", "REAL"),
+    ("max_lon", "REAL"),
+    ("center_lat", "REAL"),
+    ("center_lon", "REAL"),
+)
+STREET_STATS_TRIGGER_PREFIX = "trg_street_stats_"
+_STREET_STATS_AGG = ("COUNT(*), MIN(latitude), MAX(latitude), MIN(longitude), MAX(longitude), "
+                     "AVG(latitude), AVG(longitude)")
+
+
+def _street_stats_set() -> str:
+    return "(" + ", ".join(c for c, _ in STREET_STATS_COLUMNS) + ")"
+
+
+def _street_stats_update(ref: str, extra: str = "") -> str:
+    return (f"UPDATE streets SET {_street_stats_set()} = "
+            f"(SELECT {_STREET_STATS_AGG} FROM addresses WHERE street_name = {ref}) "
+            f"WHERE name = {ref}{extra};")
+
+
+def create_street_stats_triggers(conn: sqlite3.Connection) -> None:
+    p = STREET_STATS_TRIGGER_PREFIX
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {p}insert AFTER INSERT ON addresses "
+                 f"BEGIN {_street_stats_update('NEW.street_name')} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {p}delete AFTER DELETE ON addresses "
+                 f"BEGIN {_street_stats_update('OLD.street_name')} END")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {p}update AFTER UPDATE OF street_name, latitude, longitude ON addresses
+        BEGIN
+            {_street_stats_update('OLD.street_name')}
+            {_street_stats_update('NEW.street_name', ' AND NEW.street_name IS NOT OLD.street_name')}
+        END
+    """)
+
+
+def drop_street_stats_triggers(conn: sqlite3.Connection) -> None:
+    for suffix in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {STREET_STATS_TRIGGER_PREFIX}{suffix}")
+
+
+def init_street_address_stats(conn: sqlite3.Connection) -> None:
+    """
+    Ajoute les colonnes à `streets` et crée les triggers (idempotent).
+    Les colonnes nouvellement ajoutées sont remplies par un recalcul complet.
+    """
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(streets)").fetchall()}
+    if not cols or not conn.execute("PRAGMA table_info(addresses)").fetchall():
+        return
+    added = False
+    for name, decl in STREET_STATS_COLUMNS:
+        if name not in cols:
+            conn.execute(f"ALTER TABLE streets ADD COLUMN {name} {decl}")
+            added = True
+    create_street_stats_triggers(conn)
+    if added:
+        refresh_street_address_stats(conn)
+    conn.commit()
+
+
+def refresh_street_address_stats(conn: sqlite3.Connection, street_names=None) -> int:
+    """
+    Recalcule les statistiques d'adresses (toutes les rues, ou street_names).
+    Ne fait pas de commit. Retourne le nombre de rues mises à jour.
+    """
+    if street_names is not None:
+        names = [(n,) for n in dict.fromkeys(street_names)]
+        conn.executemany(_street_stats_update("?1"), names)
+        return len(names)
+    empty = ", ".join(["0"] + ["NULL"] * (len(STREET_STATS_COLUMNS) - 1))
+    conn.execute(f"UPDATE streets SET {_street_stats_set()} = ({empty})")
+    cur = conn.execute(f"""
+        UPDATE streets SET {_street_stats_set()} = (a.n, a.min_lat, a.max_lat, a.min_lon, a.max_lon, a.c_lat, a.c_lon)
+        FROM (
+            SELECT street_name, COUNT(*) AS n, MIN(latitude) AS min_lat, MAX(latitude) AS max_lat,
+                   MIN(longitude) AS min_lon, MAX(longitude) AS max_lon,
+                   AVG(latitude) AS c_lat, AVG(longitude) AS c_lon
+            FROM addresses GROUP BY street_name
+        ) AS a
+        WHERE streets.name = a.street_name
+    """)
+    return cur.rowcount
+
+
+def street_address_stats(conn: sqlite3.Connection, street_name: str) -> dict | None:
+    """{'address_count', 'min_lat', ..., 'center_lon'} d'une rue, ou None si inconnue."""
+    row = conn.execute(
+        f"SELECT {', '.join(c for c, _ in STREET_STATS_COLUMNS)} FROM streets WHERE name = ?", (street_name,)
+    ).fetchone()
+    return dict(zip((c for c, _ in STREET_STATS_COLUMNS), row)) if row else None
+# === end street address stats ==================================================
+# === integer street keys (append-only, safe) ===================================
+# addresses.street_id et notes.street_id -> streets.id. Le nom (street_name) reste
+# une étiquette dénormalisée, tenue à jour par triggers : les jointures et index
+# passent par l'entier, et renommer une rue ne détache plus ses adresses ni ses notes.
+STREET_KEY_TABLES = ("addresses", "notes", "street_checkpoints", "street_status_events")
+# Tables sans index par nom : index partiel des seules lignes orphelines (rattachement)
+_STREET_KEY_ORPHAN_INDEXES = {
+    "notes": "idx_notes_orphan_name",
+    "street_checkpoints": "idx_street_checkpoints_orphan_name",
+    "street_status_events": "idx_status_events_orphan_name",
+}
+STREET_KEY_TRIGGER_PREFIX = "trg_street_keys_"
+
+
+def init_street_keys(conn: sqlite3.Connection) -> int:
+    """
+    Ajoute street_id à addresses / notes / street_checkpoints / street_status_events, le remplit depuis le nom (exact, puis
+    sans espaces superflus) et crée les triggers de synchronisation (idempotent). Si streets a
+    été recréée sans ses triggers, les clés qui ne désignent plus la rue du même nom sont recalculées.
+    Retourne le nombre de lignes reliées par ce remplissage.
+    """
+    if not conn.execute("PRAGMA table_info(streets)").fetchall():
+        return 0
+    p = STREET_KEY_TRIGGER_PREFIX
+    # Sans ses triggers, streets a été recréée (import) : les ids ont pu être réattribués
+    recreated = not _has_trigger(conn, f"{p}streets_insert")
+    linked = 0
+    for table in STREET_KEY_TABLES:
+        cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+        if not cols:
+            continue
+        if "street_id" not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN street_id INTEGER REFERENCES streets(id)")
+        elif recreated:
+            conn.execute(f"""
+                UPDATE {table} SET street_id = NULL
+                WHERE street_id IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM streets s WHERE s.id = {table}.street_id AND s.name = {table}.street_name
+                )
+            """)
+        for name_expr in (f"{table}.street_name", f"TRIM({table}.street_name)"):
+            linked += conn.execute(f"""
+                UPDATE {table} SET street_id = s.id FROM streets s
+                WHERE {table}.street_id IS NULL AND s.name = {name_expr}
+            """).rowcount
+        # Ligne insérée avec le seul nom : on retrouve la rue
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {p}{table}_insert AFTER INSERT ON {table}
+            WHEN NEW.street_id IS NULL
+            BEGIN
+                UPDATE {table} SET street_id = (SELECT id FROM streets WHERE name = NEW.street_name)
+                WHERE rowid = NEW.rowid;
+            END
+        """)
+        # Ligne déplacée vers une autre rue par son nom
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {p}{table}_move AFTER UPDATE OF street_name ON {table}
+            WHEN NEW.street_name IS NOT OLD.street_name
+            BEGIN
+                UPDATE {table} SET street_id = (SELECT id FROM streets WHERE name = NEW.street_name)
+                WHERE rowid = NEW.rowid
+                  AND street_id IS NOT (SELECT id FROM streets WHERE name = NEW.street_name);
+            END
+        """)
+    tables = [t for t in STREET_KEY_TABLES if conn.execute(f"PRAGMA table_info({t})").fetchall()]
+    for table in tables:
+        if table in _STREET_KEY_ORPHAN_INDEXES:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {_STREET_KEY_ORPHAN_INDEXES[table]} "
+                         f"ON {table}(street_name) WHERE street_id IS NULL")
+    link = " ".join(f"UPDATE {t} SET street_id = NEW.id WHERE street_id IS NULL AND street_name = NEW.name;"
+                    for t in tables)
+    rename = " ".join(f"UPDATE {t} SET street_name = NEW.name WHERE street_id = NEW.id;" for t in tables)
+    unlink = " ".join(f"UPDATE {t} SET street_id = NULL WHERE street_id = OLD.id;" for t in tables)
+    if tables:
+        # Recréés à chaque appel : leur corps dépend des tables présentes
+        for suffix in ("insert", "rename", "delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {p}streets_{suffix}")
+        conn.execute(f"CREATE TRIGGER {p}streets_insert AFTER INSERT ON streets BEGIN {link} END")
+        conn.execute(f"""
+            CREATE TRIGGER {p}streets_rename AFTER UPDATE OF name ON streets
+            WHEN NEW.name IS NOT OLD.name
+            BEGIN {rename} END
+        """)
+        conn.execute(f"CREATE TRIGGER {p}streets_delete AFTER DELETE ON streets BEGIN {unlink} END")
+    conn.commit()
+    return linked
+
+
+def init_checkpoint_street_keys(conn: sqlite3.Connection) -> int:
+    """Relie le journal street_checkpoints aux rues par street_id (bases antérieures)."""
+    if conn.execute("PRAGMA table_info(street_checkpoints)").fetchall():
+        _init_checkpoint_journal(conn.cursor())
+    return init_street_keys(conn)
+
+
+def street_id_for(conn: sqlite3.Connection, street_name: str) -> int | None:
+    row = conn.execute("SELECT id FROM streets WHERE name = ?", (street_name,)).fetchone()
+    return row[0] if row else None
+
+
+def rename_street(conn: sqlite3.Connection, old_name: str, new_name: str) -> bool:
+    """
+    Renomme une rue ; adresses, notes et checkpoints suivent (street_id). False si la rue
+    n'existe pas ou si le nouveau nom est déjà pris.
+    """
+    try:
+        cur = conn.execute("UPDATE streets SET name = ? WHERE name = ?", (new_name, old_name))
+        conn.commit()
+        return cur.rowcount == 1
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        return False
+# === end integer street keys ===================================================
+# === unified street status (append-only, safe) =================================
+# Un seul état courant : streets.status (+ status_updated_at, completed_at,
+# last_checkpoint), et l'historique des transitions dans street_status_events.
+# set_street_status est l'unique chemin d'écriture : transition inscrite et état
+# mis à jour dans la même transaction. L'ancienne table street_status est fusionnée
+# dans streets puis remplacée par une vue de compatibilité.
+STREET_STATE_COLUMNS = (
+    ("status_updated_at", "TIMESTAMP"),
+    ("completed_at", "TIMESTAMP"),
+    ("last_checkpoint", "TEXT"),
+)
+
+_STREET_STATUS_VIEW = """
+    CREATE VIEW IF NOT EXISTS street_status AS
+    SELECT id, name AS street_name, team AS team_id, status, last_checkpoint,
+           NULL AS notes, completed_at, status_updated_at AS updated_at
+    FROM streets
+"""
+
+
+def _is_view(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def init_unified_status(conn: sqlite3.Connection) -> int:
+    """
+    Ajoute les colonnes d'état à streets, crée street_status_events et fusionne
+    l'ancienne table street_status (idempotent). Les lignes de rues absentes de streets
+    ne sont pas reprises. Retourne le nombre de rues reprises.
+    """
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(streets)").fetchall()}
+    if not cols:
+        return 0
+    for name, decl in STREET_STATE_COLUMNS:
+        if name not in cols:
+            conn.execute(f"ALTER TABLE streets ADD COLUMN {name} {decl}")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS street_status_events (
+            id INTEGER PRIMARY KEY,
+            street_id INTEGER REFERENCES streets(id),
+            street_name TEXT NOT NULL,
+            old_status TEXT,
+            new_status TEXT NOT NULL,
+            team_id TEXT,
+            note TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_status_events_street ON street_status_events(street_id, id)")
+
+    merged = 0
+    legacy = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'street_status'").fetchone()
+    if legacy:
+        rows = conn.execute(
+            "SELECT street_name, team_id, status, last_checkpoint, completed_at, updated_at FROM street_status"
+        ).fetchall()
+        known = {r[0] for r in conn.execute("SELECT name FROM streets").fetchall()}
+        for name, team_id, status, checkpoint, completed_at, updated_at in rows:
+            if name not in known:
+                # Rue absente de streets : pas de rue fantôme dans les compteurs ni sur la carte
+                continue
+            # streets fait foi, sauf pour une rue restée « à faire » que street_status disait avancée
+            if status in ("en_cours", "terminee"):
+                set_street_status(conn, name, status, team_id, note="reprise street_status", commit=False,
+                                  only_from="a_faire")
+            conn.execute("""
+                UPDATE streets SET last_checkpoint = COALESCE(last_checkpoint, ?),
+                                   completed_at = CASE WHEN status = 'terminee' THEN COALESCE(?, completed_at)
+                                                       ELSE completed_at END,
+                                   status_updated_at = COALESCE(?, status_updated_at)
+                WHERE name = ?
+            """, (checkpoint, completed_at, updated_at, name))
+            merged += 1
+        conn.execute("DROP TABLE street_status")
+    conn.execute(_STREET_STATUS_VIEW)
+    conn.commit()
+    return merged
+
+
+def _status_statements(only_from: str | None = None) -> tuple[str, str]:
+    """(INSERT de l'événement, UPDATE de streets) d'une transition, paramètres nommés."""
+    guard = "" if only_from is None else " AND status = :only_from"
+    event = f"""
+        INSERT INTO street_status_events (street_id, street_name, old_status, new_status, team_id, note)
+        SELECT id, name, status, :status, :team, :note FROM streets
+        WHERE name = :name AND status IS NOT :status{guard}
+    """
+    update = f"""
+        UPDATE streets SET
+            status_updated_at = CASE WHEN status IS NOT :status THEN CURRENT_TIMESTAMP ELSE status_updated_at END,
+            completed_at = CASE WHEN status IS :status THEN completed_at
+                                WHEN :status = 'terminee' THEN CURRENT_TIMESTAMP ELSE NULL END,
+            last_checkpoint = COALESCE(:checkpoint, last_checkpoint),
+            status = :status
+        WHERE name = :name{guard}
+    """
+    return event, update
+
+
+def set_street_status(conn: sqlite3.Connection, street_name: str, status: str, team_id: str | None = None,
+                      checkpoint: str | None = None, note: str | None = None,
+                      commit: bool = True, only_from: str | None = None) -> bool:
+    """
+    Change le statut d'une rue : transition ajoutée à street_status_events et état
+    courant de streets mis à jour, dans la même transaction. Sans changement de
+    statut, seul last_checkpoint (si fourni) est mis à jour, sans événement.
+    Une rue inconnue n'est jamais créée (elle fausserait compteurs et carte) ; only_from
+    limite le changement aux rues dans ce statut. Retourne False si le statut est
+    invalide ou la rue absente.
+    """
+    if status not in PROGRESS_STATUSES:
+        return False
+    try:
+        event_sql, update_sql = _status_statements(only_from)
+        params = {"name": street_name, "status": status, "team": team_id, "note": note,
+                  "checkpoint": checkpoint, "only_from": only_from}
+        # Événement d'abord : il lit l'ancien statut dans la même transaction
+        conn.execute(event_sql, params)
+        cur = conn.execute(update_sql, params)
+        if commit:
+            conn.commit()
+        return cur.rowcount == 1
+    except sqlite3.Error:
+        if commit:
+            conn.rollback()
+        return False
+
+
+def get_street_state(conn: sqlite3.Connection, street_name: str) -> dict | None:
+    """État courant d'une rue (une ligne de streets), ou None."""
+    row = conn.execute("""
+        SELECT name, team, status, status_updated_at, completed_at, last_checkpoint
+        FROM streets WHERE name = ?
+    """, (street_name,)).fetchone()
+    if row is None:
+        return None
+    return dict(zip(("street_name", "team_id", "status", "updated_at", "completed_at", "last_checkpoint"), row))
+
+
+def street_status_history(conn: sqlite3.Connection, street_name: str, limit: int = 50) -> list[dict]:
+    """Transitions d'une rue, de la plus récente à la plus ancienne."""
+    rows = conn.execute("""
+        SELECT e.id, e.old_status, e.new_status, e.team_id, e.note, e.created_at
+        FROM street_status_events e
+        WHERE e.street_id = (SELECT id FROM streets WHERE name = ?)
+        ORDER BY e.id DESC LIMIT ?
+    """, (street_name, int(limit))).fetchall()
+    keys = ("id", "old_status", "new_status", "team_id", "note", "created_at")
+    return [dict(zip(keys, r)) for r in rows]
+# === end unified street status =================================================
+# === bulk street operations (append-only, safe) ================================
+# Assignation et changement de statut de plusieurs rues en une seule transaction :
+# une requête préparée exécutée par executemany, un seul commit, au lieu d'un
+# UPDATE + commit par rue. Les rues qui changent réellement sont lues d'abord (par
+# paquets) : seules elles sont modifiées et retournées, pour le journal d'activité.
+# commit=False laisse la transaction à l'appelant (writer du pool) ; une erreur est
+# alors propagée pour qu'il annule le lot entier.
+def _distinct_names(street_names) -> list[str]:
+    return [n for n in dict.fromkeys(street_names) if n]
+
+
+def _changing_names(conn: sqlite3.Connection, names: list[str], condition: str, params: tuple) -> list[str]:
+    """Rues de names (dans leur ordre) qui vérifient condition, lues avant le lot d'UPDATE."""
+    found = set()
+    # SQLite limite le nombre de paramètres par requête
+    for i in range(0, len(names), 500):
+        chunk = names[i:i + 500]
+        found.update(r[0] for r in conn.execute(
+            f"SELECT name FROM streets WHERE name IN ({','.join('?' * len(chunk))}) AND {condition}",
+            (*chunk, *params),
+        ).fetchall())
+    return [n for n in names if n in found]
+
+
+def assign_streets(conn: sqlite3.Connection, street_names, team_id: str | None,
+                   only_unassigned: bool = False, commit: bool = True) -> list[str]:
+    """
+    Assigne des rues à une équipe (team_id vide ou None = désassigner).
+    only_unassigned=True ne touche pas aux rues déjà prises par une équipe.
+    Retourne les noms des rues dont l'équipe a changé.
+    """
+    names = _distinct_names(street_names)
+    if not names:
+        return []
+    condition = "team IS NOT NULLIF(?, '')" + (" AND (team IS NULL OR team = '')" if only_unassigned else "")
+    try:
+        changed = _changing_names(conn, names, condition, (team_id,))
+        conn.executemany(
+            f"UPDATE streets SET team = NULLIF(?, '') WHERE name = ? AND {condition}",
+            [(team_id, n, team_id) for n in changed],
+        )
+        if commit:
+            conn.commit()
+        return changed
+    except sqlite3.Error:
+        if not commit:
+            raise
+        conn.rollback()
+        return []
+
+
+def set_streets_status(conn: sqlite3.Connection, street_names, status: str, team_id: str | None = None,
+                       note: str | None = None, commit: bool = True) -> list[str]:
+    """
+    Même effet que set_street_status pour chaque rue (une transition par rue dont
+    le statut change), en un seul lot. Retourne les noms des rues dont le statut a
+    changé ; [] si le statut est invalide.
+    """
+    names = _distinct_names(street_names)
+    if status not in PROGRESS_STATUSES or not names:
+        return []
+    event_sql, update_sql = _status_statements()
+    try:
+        changed = _changing_names(conn, names, "status IS NOT ?", (status,))
+        params = [{"name": n, "status": status, "team": team_id, "note": note, "checkpoint": None}
+                  for n in changed]
+        conn.executemany(event_sql, params)
+        conn.executemany(update_sql, params)
+        if commit:
+            conn.commit()
+        return changed
+    except sqlite3.Error:
+        if not commit:
+            raise
+        conn.rollback()
+        return []
+
+
+def reassign_sector(conn: sqlite3.Connection, sector, team_id: str | None,
+                    only_unassigned: bool = False, commit: bool = True) -> list[str]:
+    """
+    Assigne toutes les rues d'un secteur (sector_id, ou nom du secteur pour le
+    schéma d'import_data.py) à une équipe. Retourne les noms des rues assignées.
+    """
+    column = _progress_sector_column(conn)
+    if column is None:
+        return []
+    guard = " AND (team IS NULL OR team = '')" if only_unassigned else ""
+    names = [r[0] for r in conn.execute(
+        f"SELECT name FROM streets WHERE {column} = ?{guard} ORDER BY name", (sector,)
+    ).fetchall()]
+    return assign_streets(conn, names, team_id, only_unassigned=only_unassigned, commit=commit)
+# === end bulk street operations ================================================
@@ -0,0 +1,183 @@
+"""
+Pool de connexions SQLite pour GuignoMap (mode WAL).
+
+- Lecteurs : une connexion par thread (lecture seule, `query_only`), rendue au
+  pool quand le thread se termine puis réutilisée par le thread suivant ;
+- Écrivain : une seule connexion, sérialisée par un verrou, via
+  `with pool.writer() as conn:` (commit en sortie, rollback sur exception).
+
+En WAL, les lectures ne sont plus bloquées par les écritures et les écritures
+concurrentes attendent le verrou Python au lieu d'échouer en
+« database is locked ».
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+_LOG = logging.getLogger("guignomap.db_pool")
+_LOG.addHandler(logging.NullHandler())
+
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_CACHE_SIZE_KIB = 20000
+
+
+class _ReaderLease:
+    """Connexion prêtée à un thread ; revient au pool à la fin du thread."""
+
+    def __init__(self, pool: "ConnectionPool", conn: sqlite3.Connection):
+        self.conn = conn
+        weakref.finalize(self, pool._release_reader, conn)
+
+
+class ConnectionPool:
+    def __init__(self, db_path: str | Path, busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS,
+                 cache_size_kib: int = DEFAULT_CACHE_SIZE_KIB, max_idle_readers: int = 16):
+        self.db_path = str(db_path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        self.max_idle_readers = max_idle_readers
+        self._local = threading.local()
+        self._idle: list[sqlite3.Connection] = []
+        self._idle_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._writer: sqlite3.Connection | None = None
+        self._closed = False
+        self._journal_mode: str | None = None
+        self._metrics = {
+            "readers_opened": 0,
+            "reader_checkouts": 0,
+            "reader_reuses": 0,
+            "writes": 0,
+            "write_errors": 0,
+            "write_wait_ms_total": 0.0,
+            "write_wait_ms_max": 0.0,
+            "write_hold_ms_total": 0.0,
+        }
+
+    # --- Connexions --------------------------------------------------------------------
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=self.busy_timeout_ms / 1000)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        if readonly:
+            conn.execute("PRAGMA query_only = 1")
+        else:
+            self._journal_mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+            conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        """Connexion de lecture propre au thread courant."""
+        if self._closed:
+            raise RuntimeError("ConnectionPool fermé")
+        lease = getattr(self._local, "lease", None)
+        if lease is not None:
+            return lease.conn
+        with self._idle_lock:
+            conn = self._idle.pop() if self._idle else None
+            self._metrics["reader_checkouts"] += 1
+            if conn is not None:
+                self._metrics["reader_reuses"] += 1
+        if conn is None:
+            # Le writer doit exister d'abord : c'est lui qui active le WAL
+            self._get_writer()
+            conn = self._connect(readonly=True)
+            with self._idle_lock:
+                self._metrics["readers_opened"] += 1
+        self._local.lease = _ReaderLease(self, conn)
+        return conn
+
+    def _release_reader(self, conn: sqlite3.Connection) -> None:
+        with self._idle_lock:
+            if not self._closed and len(self._idle) < self.max_idle_readers:
+                self._idle.append(conn)
+                return
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _get_writer(self) -> sqlite3.Connection:
+        if self._writer is None:
+            with self._write_lock:
+                if self._writer is None:
+                    self._writer = self._connect(readonly=False)
+        return self._writer
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Accès exclusif à la connexion d'écriture ; commit en sortie, rollback sur erreur.
+        Un appel imbriqué dans le même thread rejoint la transaction englobante.
+        """
+        if self._closed:
+            raise RuntimeError("ConnectionPool fermé")
+        conn = self._get_writer()
+        t0 = time.perf_counter()
+        with self._write_lock:
+            t1 = time.perf_counter()
+            self._write_depth += 1
+            outer = self._write_depth == 1
+            try:
+                yield conn
+                if outer:
+                    conn.commit()
+            except BaseException:
+                if outer:
+                    conn.rollback()
+                    self._metrics["write_errors"] += 1
+                raise
+            finally:
+                self._write_depth -= 1
+                if outer:
+                    wait_ms = (t1 - t0) * 1000
+                    self._metrics["writes"] += 1
+                    self._metrics["write_wait_ms_total"] += wait_ms
+                    self._metrics["write_wait_ms_max"] = max(self._metrics["write_wait_ms_max"], wait_ms)
+                    self._metrics["write_hold_ms_total"] += (time.perf_counter() - t1) * 1000
+
+    # --- Métriques / cycle de vie --------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._idle_lock:
+            m = dict(self._metrics)
+            m["readers_idle"] = len(self._idle)
+        m["write_wait_ms_avg"] = (m["write_wait_ms_total"] / m["writes"]) if m["writes"] else 0.0
+        m["journal_mode"] = self._journal_mode
+        return m
+
+    def close(self) -> None:
+        self._closed = True
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str | Path) -> ConnectionPool:
+    """Pool partagé (un par fichier de base) pour tout le processus."""
+    key = str(Path(db_path).resolve())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = _pools[key] = ConnectionPool(db_path)
+        return pool
@@ -0,0 +1,261 @@
+"""
+Cache persistant des résultats de géocodage (table `geocode_cache`).
+
+Clé normalisée : numéro + clé canonique de la rue (`cache_key`, ex.
+"974|AVENUE SAINT DENIS" pour "974 AV ST-DENIS" comme pour "Avenue Saint-Denis",
+voir guignomap.street_names) et code postal (`postal_key`, ex. "J7K2L8", vide si
+inconnu). Une recherche avec code postal accepte aussi une entrée enregistrée sans
+code postal, et inversement.
+
+- Les résultats négatifs ('not_found') sont gardés aussi, avec un TTL plus court ;
+- `purge_expired` / `evict` : expiration par âge et plafond de taille (LRU) ;
+- `export_csv` / `import_csv` : le cache survit à une reconstruction de la base ;
+- `seed_from_addresses` : amorce le cache avec les coordonnées déjà en base.
+"""
+from __future__ import annotations
+
+import csv
+import re
+import sqlite3
+from pathlib import Path
+
+from guignomap import street_names
+
+DEFAULT_TTL_DAYS = 365
+NOT_FOUND_TTL_DAYS = 30
+
+EXPORT_COLUMNS = ("street_key", "postal_key", "status", "latitude", "longitude", "postal_code",
+                  "provider", "confidence", "created_at")
+
+
+# --- Normalisation --------------------------------------------------------------------------
+
+def cache_key(house_number, street_name) -> str:
+    """'2690', 'Rue  Cantin ' -> '2690|RUE CANTIN' (clé de rue canonique : abréviations, particules)."""
+    number = street_names.fold(house_number).replace(" ", "")
+    return f"{number}|{street_names.street_key(street_name)}"
+
+
+def _canonical(key: str) -> str:
+    """Clé enregistrée par une version antérieure (rue seulement repliée) -> clé canonique."""
+    number, _sep, street = key.partition("|")
+    return f"{number}|{street_names.street_key(street)}"
+
+
+def postal_key(postal_code) -> str:
+    if postal_code is None:
+        return ""
+    return re.sub(r"[^A-Z0-9]", "", str(postal_code).upper())
+
+
+# --- Schéma ---------------------------------------------------------------------------------
+
+def init_geocode_cache_schema(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            street_key TEXT NOT NULL,
+            postal_key TEXT NOT NULL DEFAULT '',
+            status TEXT NOT NULL,              -- 'ok' | 'not_found'
+            latitude REAL,
+            longitude REAL,
+            postal_code TEXT,
+            provider TEXT,
+            confidence REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            hits INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (street_key, postal_key)
+        ) WITHOUT ROWID
+    """)
+    rekey(conn)
+    conn.commit()
+
+
+def rekey(conn: sqlite3.Connection) -> int:
+    """
+    Réécrit les clés d'anciennes entrées (rue repliée sans abréviations ni particules)
+    en clés canoniques ; deux anciennes clés devenues identiques n'en font plus qu'une.
+    Retourne le nombre de rues renommées (0 quand le cache est déjà canonique).
+    """
+    streets = [r[0] for r in conn.execute(
+        "SELECT DISTINCT substr(street_key, instr(street_key, '|') + 1) FROM geocode_cache"
+    ).fetchall()]
+    renamed = [(street_names.street_key(s), s) for s in streets if street_names.street_key(s) != s]
+    conn.executemany(
+        """
+        UPDATE OR REPLACE geocode_cache
+        SET street_key = substr(street_key, 1, instr(street_key, '|')) || ?
+        WHERE substr(street_key, instr(street_key, '|') + 1) = ?
+        """,
+        renamed,
+    )
+    return len(renamed)
+
+
+# --- Lecture / écriture ---------------------------------------------------------------------
+
+def lookup(conn: sqlite3.Connection, house_number, street_name, postal_code=None,
+           ttl_days: int = DEFAULT_TTL_DAYS, not_found_ttl_days: int = NOT_FOUND_TTL_DAYS,
+           touch: bool = True) -> tuple | None:
+    """
+    Entrée valide pour cette adresse : (status, lat, lon, code postal, fournisseur, confiance), ou None.
+    Préférence à l'entrée du même code postal, puis à celle sans code postal.
+    """
+    skey, pkey = cache_key(house_number, street_name), postal_key(postal_code)
+    row = conn.execute(
+        """
+        SELECT postal_key, status, latitude, longitude, postal_code, provider, confidence
+        FROM geocode_cache
+        WHERE street_key = ?
+          AND (postal_key = ? OR postal_key = '' OR ? = '')
+          AND created_at >= datetime('now', '-' || CASE status WHEN 'ok' THEN ? ELSE ? END || ' days')
+        ORDER BY postal_key = ? DESC, created_at DESC
+        LIMIT 1
+        """,
+        (skey, pkey, pkey, int(ttl_days), int(not_found_ttl_days), pkey),
+    ).fetchone()
+    if row is None:
+        return None
+    if touch:
+        conn.execute(
+            "UPDATE geocode_cache SET hits = hits + 1, last_used_at = CURRENT_TIMESTAMP "
+            "WHERE street_key = ? AND postal_key = ?",
+            (skey, row[0]),
+        )
+    return tuple(row[1:])
+
+
+def store_many(conn: sqlite3.Connection, entries) -> int:
+    """
+    entries : itérable de (house_number, street_name, postal_code, status, lat, lon,
+    code postal trouvé, fournisseur, confiance). Remplace l'entrée de même clé.
+    Ne fait pas de commit (s'insère dans la transaction de l'appelant).
+    """
+    rows = [
+        (cache_key(n, s), postal_key(cp), status, lat, lon, found_cp, provider, confidence)
+        for n, s, cp, status, lat, lon, found_cp, provider, confidence in entries
+    ]
+    conn.executemany(
+        """
+        INSERT INTO geocode_cache (street_key, postal_key, status, latitude, longitude,
+                                   postal_code, provider, confidence)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(street_key, postal_key) DO UPDATE SET
+            status = excluded.status,
+            latitude = excluded.latitude,
+            longitude = excluded.longitude,
+            postal_code = excluded.postal_code,
+            provider = excluded.provider,
+            confidence = excluded.confidence,
+            created_at = CURRENT_TIMESTAMP
+        """,
+        rows,
+    )
+    return len(rows)
+
+
+# --- Entretien ------------------------------------------------------------------------------
+
+def purge_expired(conn: sqlite3.Connection, ttl_days: int = DEFAULT_TTL_DAYS,
+                  not_found_ttl_days: int = NOT_FOUND_TTL_DAYS) -> int:
+    cur = conn.execute(
+        """
+        DELETE FROM geocode_cache
+        WHERE created_at < datetime('now', '-' || CASE status WHEN 'ok' THEN ? ELSE ? END || ' days')
+        """,
+        (int(ttl_days), int(not_found_ttl_days)),
+    )
+    conn.commit()
+    return cur.rowcount
+
+
+def evict(conn: sqlite3.Connection, max_entries: int) -> int:
+    """Garde au plus max_entries entrées, en retirant les moins récemment utilisées."""
+    cur = conn.execute(
+        """
+        DELETE FROM geocode_cache WHERE (street_key, postal_key) IN (
+            SELECT street_key, postal_key FROM geocode_cache
+            ORDER BY last_used_at DESC, created_at DESC
+            LIMIT -1 OFFSET ?
+        )
+        """,
+        (int(max_entries),),
+    )
+    conn.commit()
+    return cur.rowcount
+
+
+def cache_summary(conn: sqlite3.Connection) -> dict:
+    row = conn.execute(
+        "SELECT COUNT(*), SUM(status = 'ok'), SUM(status = 'not_found'), COALESCE(SUM(hits), 0) FROM geocode_cache"
+    ).fetchone()
+    return {"entries": row[0], "ok": row[1] or 0, "not_found": row[2] or 0, "hits": row[3]}
+
+
+def seed_from_addresses(conn: sqlite3.Connection, provider: str = "db") -> int:
+    """Ajoute au cache les adresses déjà géocodées en base (sans écraser les entrées existantes)."""
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(addresses)").fetchall()}
+    cp_col = next((c for c in ("code_postal", "postal_code") if c in cols), None)
+    cp_expr = cp_col if cp_col else "NULL"
+    rows = conn.execute(
+        f"SELECT house_number, street_name, {cp_expr}, latitude, longitude FROM addresses "
+        "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    ).fetchall()
+    before = conn.total_changes
+    conn.executemany(
+        """
+        INSERT OR IGNORE INTO geocode_cache (street_key, postal_key, status, latitude, longitude,
+                                             postal_code, provider)
+        VALUES (?, ?, 'ok', ?, ?, ?, ?)
+        """,
+        [(cache_key(n, s), postal_key(cp), lat, lon, cp or None, provider) for n, s, cp, lat, lon in rows],
+    )
+    conn.commit()
+    return conn.total_changes - before
+
+
+# --- Import / export ------------------------------------------------------------------------
+
+def export_csv(conn: sqlite3.Connection, path: str | Path) -> int:
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in conn.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM geocode_cache ORDER BY street_key"):
+            writer.writerow(["" if v is None else v for v in row])
+            n += 1
+    return n
+
+
+def import_csv(conn: sqlite3.Connection, path: str | Path) -> int:
+    """
+    Charge un export (clés d'anciens exports rendues canoniques) ; en cas de conflit,
+    l'entrée la plus récente l'emporte.
+    """
+    def _val(v):
+        return None if v == "" else v
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = [tuple(_val(r.get(c, "")) for c in EXPORT_COLUMNS) for r in csv.DictReader(f)]
+    if any(r[0] is None for r in rows):
+        raise ValueError("Export de cache invalide : street_key manquant")
+    rows = [(_canonical(r[0]), *r[1:]) for r in rows]
+    # postal_key vide et created_at absent : valeurs par défaut du schéma
+    conn.executemany(
+        f"""
+        INSERT INTO geocode_cache ({', '.join(EXPORT_COLUMNS)})
+        VALUES (?, COALESCE(?, ''), ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        ON CONFLICT(street_key, postal_key) DO UPDATE SET
+            status = excluded.status,
+            latitude = excluded.latitude,
+            longitude = excluded.longitude,
+            postal_code = excluded.postal_code,
+            provider = excluded.provider,
+            confidence = excluded.confidence,
+            created_at = excluded.created_at
+        WHERE excluded.created_at > geocode_cache.created_at
+        """,
+        rows,
+    )
+    conn.commit()
+    return len(rows)
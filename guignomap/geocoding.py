@@ -0,0 +1,413 @@
+"""
+Moteur de géocodage de GuignoMap : concurrent, limité en débit, reprenable.
+
+- Fournisseurs interchangeables (`GeocodingProvider`) : Nominatim (geopy),
+  Google (API Geocoding via requests) et `OfflineProvider` (table locale, pour
+  les tests et les démos sans réseau) ;
+- Un seau à jetons (`TokenBucket`) par fournisseur : les requêtes sont
+  planifiées pour remplir exactement le débit permis, sans `sleep(1)` fixe ;
+- Un pool de tâches asyncio (les appels bloquants passent par
+  `asyncio.to_thread`) : une requête lente ou qui expire n'arrête pas les autres ;
+- Écritures par lots (`executemany`, un commit par lot) ;
+- Table `geocode_progress` : chaque adresse traitée y est notée, une reprise
+  après interruption continue là où le traitement s'est arrêté ;
+- Cache persistant (`guignomap.geocode_cache`) consulté avant tout appel au
+  fournisseur : une adresse déjà connue ne coûte aucune requête.
+"""
+from __future__ import annotations
+
+import abc
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable
+
+from guignomap import geocode_cache
+from guignomap.bulk_import import postal_column
+
+_LOG = logging.getLogger("guignomap.geocoding")
+_LOG.addHandler(logging.NullHandler())
+
+DEFAULT_CITY = "Mascouche, QC, Canada"
+
+# Résultat d'un géocodage : (latitude, longitude, code postal ou None[, confiance 0..1])
+GeoResult = tuple
+
+
+class GeocodingError(Exception):
+    """Erreur de fournisseur ; `retryable` indique si un nouvel essai a un sens."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+# --- Limiteur de débit ----------------------------------------------------------------------
+
+class TokenBucket:
+    """
+    Seau à jetons : `rate` jetons par seconde, au plus `capacity` en réserve.
+    `reserve()` réserve un jeton et retourne le délai d'attente avant de l'utiliser,
+    ce qui permet à plusieurs tâches de se partager le débit sans s'attendre mutuellement.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate doit être > 0")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1.0
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# --- Fournisseurs ---------------------------------------------------------------------------
+
+class GeocodingProvider(abc.ABC):
+    """Interface : `geocode(query)` -> (lat, lon, code postal[, confiance]) ou None si introuvable."""
+
+    name = "provider"
+    rate = 1.0        # requêtes par seconde permises
+    burst = 1.0       # jetons disponibles d'un coup
+
+    @abc.abstractmethod
+    def geocode(self, query: str) -> GeoResult | None:
+        """Résultat pour une requête « numéro rue, ville », None si introuvable."""
+
+
+class NominatimProvider(GeocodingProvider):
+    """OpenStreetMap Nominatim via geopy (politique d'usage : 1 requête/s)."""
+
+    name = "nominatim"
+
+    def __init__(self, user_agent: str = "guignomap_mascouche_app", timeout: float = 10.0, rate: float = 1.0):
+        from geopy.geocoders import Nominatim
+
+        self.rate = rate
+        self._geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def geocode(self, query: str) -> GeoResult | None:
+        from geopy.exc import GeocoderQuotaExceeded, GeocoderServiceError
+
+        try:
+            location = self._geolocator.geocode(query, addressdetails=True)
+        except GeocoderQuotaExceeded as e:
+            raise GeocodingError(str(e), retryable=True) from e
+        except GeocoderServiceError as e:  # inclut GeocoderTimedOut / GeocoderUnavailable
+            raise GeocodingError(str(e), retryable=True) from e
+        if location is None:
+            return None
+        postcode = (location.raw.get("address") or {}).get("postcode") or None
+        importance = location.raw.get("importance")
+        return (float(location.latitude), float(location.longitude), postcode,
+                float(importance) if importance is not None else None)
+
+
+class GoogleProvider(GeocodingProvider):
+    """API Google Geocoding (clé lue dans GOOGLE_MAPS_API_KEY si non fournie)."""
+
+    name = "google"
+    URL = "https://maps.googleapis.com/maps/api/geocode/json"
+    CONFIDENCE = {"ROOFTOP": 1.0, "RANGE_INTERPOLATED": 0.8, "GEOMETRIC_CENTER": 0.6, "APPROXIMATE": 0.4}
+
+    def __init__(self, api_key: str | None = None, timeout: float = 10.0, rate: float = 40.0):
+        self.api_key = api_key or os.environ.get("GOOGLE_MAPS_API_KEY")
+        if not self.api_key:
+            raise ValueError("Clé API Google manquante (GOOGLE_MAPS_API_KEY)")
+        self.timeout = timeout
+        self.rate = rate
+        self.burst = max(1.0, rate / 4)
+        import requests
+
+        self._session = requests.Session()
+
+    def geocode(self, query: str) -> GeoResult | None:
+        import requests
+
+        try:
+            resp = self._session.get(self.URL, params={"address": query, "key": self.api_key}, timeout=self.timeout)
+            resp.raise_for_status()
+            data = resp.json()
+        except requests.RequestException as e:
+            raise GeocodingError(str(e), retryable=True) from e
+        status = data.get("status")
+        if status == "ZERO_RESULTS":
+            return None
+        if status != "OK":
+            retryable = status in ("OVER_QUERY_LIMIT", "UNKNOWN_ERROR")
+            raise GeocodingError(f"Google: {status} {data.get('error_message', '')}".strip(), retryable=retryable)
+        best = data["results"][0]
+        loc = best["geometry"]["location"]
+        postcode = next(
+            (c["long_name"] for c in best.get("address_components", []) if "postal_code" in c.get("types", [])),
+            None,
+        )
+        confidence = self.CONFIDENCE.get(best["geometry"].get("location_type"))
+        return float(loc["lat"]), float(loc["lng"]), postcode, confidence
+
+
+class OfflineProvider(GeocodingProvider):
+    """
+    Fournisseur local : `lookup` est un dict {requête: résultat} ou une fonction.
+    `latency` simule le temps de réponse ; `failures` = nombre d'échecs simulés par requête.
+    """
+
+    name = "offline"
+
+    def __init__(self, lookup: dict | Callable[[str], GeoResult | None], rate: float = 1000.0,
+                 latency: float = 0.0, failures: int = 0):
+        self._lookup = lookup
+        self.rate = rate
+        self.burst = max(1.0, rate)
+        self.latency = latency
+        self.failures = failures
+        self._attempts: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def geocode(self, query: str) -> GeoResult | None:
+        with self._lock:
+            self.calls += 1
+            n = self._attempts[query] = self._attempts.get(query, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        if n <= self.failures:
+            raise GeocodingError("échec simulé", retryable=True)
+        if callable(self._lookup):
+            return self._lookup(query)
+        return self._lookup.get(query)
+
+
+def provider_from_name(name: str, **kwargs) -> GeocodingProvider:
+    """'nominatim' | 'google' | 'offline' -> instance du fournisseur."""
+    providers = {"nominatim": NominatimProvider, "google": GoogleProvider, "offline": OfflineProvider}
+    try:
+        return providers[name.lower()](**kwargs)
+    except KeyError:
+        raise ValueError(f"Fournisseur inconnu : {name!r} (attendu : {', '.join(providers)})") from None
+
+
+def address_query(house_number: str, street_name: str, city: str = DEFAULT_CITY) -> str:
+    return f"{str(house_number).strip()} {str(street_name).strip()}, {city}"
+
+
+# --- Checkpoint -----------------------------------------------------------------------------
+
+def init_geocode_progress_schema(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS geocode_progress (
+            address_id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL,          -- 'ok' | 'not_found' | 'error'
+            attempts INTEGER NOT NULL DEFAULT 0,
+            provider TEXT,
+            error TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+
+def pending_addresses(conn: sqlite3.Connection, max_attempts: int = 3,
+                      limit: int | None = None) -> list[tuple[int, str, str, str | None]]:
+    """
+    Adresses restant à géocoder : sans GPS (ou sans code postal), et pas déjà
+    terminées ('ok' / 'not_found') ni en erreur au-delà de max_attempts.
+    Retourne (id, numéro, rue, code postal connu).
+    """
+    cp_col = postal_column(conn)
+    missing = "a.latitude IS NULL OR a.longitude IS NULL"
+    if cp_col:
+        missing += f" OR a.{cp_col} IS NULL OR a.{cp_col} = ''"
+    sql = f"""
+        SELECT a.id, a.house_number, a.street_name, {f"a.{cp_col}" if cp_col else "NULL"}
+        FROM addresses a
+        LEFT JOIN geocode_progress p ON p.address_id = a.id
+        WHERE ({missing})
+          AND (p.address_id IS NULL OR (p.status = 'error' AND p.attempts < ?))
+        ORDER BY a.id
+    """
+    params: list = [max_attempts]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return [tuple(r) for r in conn.execute(sql, params).fetchall()]
+
+
+def progress_summary(conn: sqlite3.Connection) -> dict:
+    rows = conn.execute("SELECT status, COUNT(*) FROM geocode_progress GROUP BY status").fetchall()
+    return {status: n for status, n in rows}
+
+
+def reset_progress(conn: sqlite3.Connection, statuses: Iterable[str] = ("error",)) -> int:
+    """Oublie les adresses de ces statuts pour qu'elles soient retentées."""
+    statuses = list(statuses)
+    cur = conn.execute(
+        f"DELETE FROM geocode_progress WHERE status IN ({','.join('?' for _ in statuses)})", statuses
+    )
+    conn.commit()
+    return cur.rowcount
+
+
+# --- Moteur ---------------------------------------------------------------------------------
+
+class GeocodingEngine:
+    """
+    Géocode les adresses en attente avec `workers` tâches concurrentes, au débit
+    du fournisseur. Les résultats sont écrits par lots de `batch_size`.
+    Avec use_cache=True, `geocode_cache` est consulté d'abord et alimenté ensuite.
+    La connexion n'est utilisée que depuis le thread qui appelle `run()`.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, provider: GeocodingProvider, workers: int = 4,
+                 batch_size: int = 50, max_attempts: int = 3, backoff: float = 1.0,
+                 city: str = DEFAULT_CITY, bucket: TokenBucket | None = None,
+                 on_progress: Callable[[dict], None] | None = None, use_cache: bool = True):
+        self.conn = conn
+        self.provider = provider
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff = backoff
+        self.city = city
+        self.bucket = bucket or TokenBucket(provider.rate, capacity=getattr(provider, "burst", 1.0))
+        self.on_progress = on_progress
+        self.use_cache = use_cache
+        self.touched_streets: set[str] = set()
+        self.stats = {"processed": 0, "found": 0, "not_found": 0, "errors": 0,
+                      "retries": 0, "batches": 0, "cache_hits": 0, "seconds": 0.0}
+        self._pending: list[tuple] = []
+        init_geocode_progress_schema(conn)
+        geocode_cache.init_geocode_cache_schema(conn)
+        self._cp_col = postal_column(conn)
+
+    # --- Écritures ---------------------------------------------------------------------------
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        # batch : (id, numéro, rue, code postal connu, statut, essais, résultat, erreur, source)
+        found = [(res[0], res[1], res[2], addr_id)
+                 for addr_id, _n, _s, _cp, status, _a, res, _e, _src in batch if status == "ok"]
+        with self.conn:
+            if found:
+                if self._cp_col:
+                    self.conn.executemany(
+                        f"UPDATE addresses SET latitude = ?, longitude = ?, "
+                        f"{self._cp_col} = COALESCE(NULLIF({self._cp_col}, ''), ?) WHERE id = ?",
+                        found,
+                    )
+                else:
+                    self.conn.executemany(
+                        "UPDATE addresses SET latitude = ?, longitude = ? WHERE id = ?",
+                        [(lat, lon, addr_id) for lat, lon, _cp, addr_id in found],
+                    )
+            self.conn.executemany(
+                """INSERT INTO geocode_progress (address_id, status, attempts, provider, error, updated_at)
+                   VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                   ON CONFLICT(address_id) DO UPDATE SET
+                       status = excluded.status,
+                       attempts = geocode_progress.attempts + excluded.attempts,
+                       provider = excluded.provider,
+                       error = excluded.error,
+                       updated_at = excluded.updated_at""",
+                [(b[0], b[4], b[5], b[8], b[7]) for b in batch],
+            )
+            if self.use_cache:
+                geocode_cache.store_many(self.conn, [
+                    (number, street, cp, status, res[0] if res else None, res[1] if res else None,
+                     res[2] if res else None, src, res[3] if res and len(res) > 3 else None)
+                    for _id, number, street, cp, status, _a, res, _e, src in batch
+                    if src == self.provider.name and status in ("ok", "not_found")
+                ])
+        self.touched_streets.update(b[2] for b in batch if b[4] == "ok")
+        self.stats["batches"] += 1
+        if self.on_progress:
+            self.on_progress(dict(self.stats))
+
+    def _record(self, item: tuple, status: str, attempts: int, result: GeoResult | None,
+                error: str | None, source: str) -> None:
+        self._pending.append((*item, status, attempts, result, error, source))
+        self.stats["processed"] += 1
+        self.stats[{"ok": "found", "not_found": "not_found", "error": "errors"}[status]] += 1
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    # --- Tâches ------------------------------------------------------------------------------
+
+    async def _geocode_one(self, query: str) -> tuple[str, int, GeoResult | None, str | None]:
+        attempts = 0
+        while True:
+            attempts += 1
+            await self.bucket.acquire()
+            try:
+                result = await asyncio.to_thread(self.provider.geocode, query)
+                return ("ok" if result else "not_found"), attempts, result, None
+            except GeocodingError as e:
+                if not e.retryable or attempts >= self.max_attempts:
+                    return "error", attempts, None, str(e)[:500]
+                self.stats["retries"] += 1
+                _LOG.info("retry %d for %r: %s", attempts, query, e)
+                await asyncio.sleep(self.backoff * (2 ** (attempts - 1)))
+            except Exception as e:  # erreur inattendue du fournisseur : non retentée
+                _LOG.warning("geocode failed for %r", query, exc_info=True)
+                return "error", attempts, None, str(e)[:500]
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                _id, number, street, cp = item
+                hit = geocode_cache.lookup(self.conn, number, street, cp) if self.use_cache else None
+                if hit is not None:
+                    status, lat, lon, found_cp, _provider, _confidence = hit
+                    self.stats["cache_hits"] += 1
+                    self._record(item, status, 0, (lat, lon, found_cp) if status == "ok" else None, None, "cache")
+                    continue
+                status, attempts, result, error = await self._geocode_one(address_query(number, street, self.city))
+                self._record(item, status, attempts, result, error, self.provider.name)
+            finally:
+                queue.task_done()
+
+    async def run_async(self, limit: int | None = None) -> dict:
+        t0 = time.perf_counter()
+        todo = pending_addresses(self.conn, self.max_attempts, limit)
+        self.stats["pending"] = len(todo)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 4)
+        tasks = [asyncio.create_task(self._worker(queue)) for _ in range(self.workers)]
+        try:
+            for item in todo:
+                await queue.put(item)
+            for _ in tasks:
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+            # Interruption ou fin normale : ce qui est fait est écrit
+            self._flush()
+            self.stats["seconds"] = time.perf_counter() - t0
+        return dict(self.stats)
+
+    def run(self, limit: int | None = None) -> dict:
+        """Point d'entrée synchrone. Retourne les statistiques de la passe."""
+        return asyncio.run(self.run_async(limit))
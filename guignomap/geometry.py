@@ -0,0 +1,324 @@
+"""
+Géométrie des rues précalculée pour la cartographie.
+
+La table `street_geometry` conserve, pour chaque rue, la liste ordonnée des
+coordonnées de ses adresses (JSON [[lat, lon], ...]) et sa boîte englobante.
+Elle est construite une fois (import / géocodage) puis reconstruite
+seulement pour les rues marquées « sales » par les triggers sur `addresses`.
+Les cartes n'ont plus qu'à associer une couleur de statut à chaque ligne.
+
+`street_geometry_lod` conserve les versions simplifiées (Douglas–Peucker, voir
+simplify) qui retirent au moins un sommet ; à la lecture, une rue sans niveau
+simplifié retombe sur sa géométrie complète.
+
+`street_geometry_version` (une seule ligne) est incrémentée à chaque écriture de
+la géométrie : les cartes mises en cache s'y comparent (geometry_version).
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import Iterable
+
+import pandas as pd
+
+from guignomap import simplify, street_order
+
+# --- Schéma --------------------------------------------------------------------------
+
+def init_street_geometry_schema(conn: sqlite3.Connection) -> None:
+    """
+    Crée la table street_geometry, la file street_geometry_dirty, le compteur
+    street_geometry_version et les triggers qui inscrivent dans la file les rues
+    dont les adresses changent. Idempotent. Si addresses a
+    été recréée sans ces triggers, la géométrie existante est vidée : le prochain
+    refresh_street_geometry la reconstruit entièrement.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS street_geometry (
+            street_name TEXT PRIMARY KEY,
+            coords TEXT NOT NULL,
+            n_points INTEGER NOT NULL,
+            min_lat REAL, min_lon REAL, max_lat REAL, max_lon REAL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS street_geometry_lod (
+            street_name TEXT NOT NULL,
+            tolerance_m REAL NOT NULL,
+            coords TEXT NOT NULL,
+            n_points INTEGER NOT NULL,
+            PRIMARY KEY (street_name, tolerance_m)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS street_geometry_dirty (
+            street_name TEXT PRIMARY KEY
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS street_geometry_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO street_geometry_version (id, version) VALUES (1, 0)")
+    untracked = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_addresses_geom_insert'"
+    ).fetchone() is None
+    if untracked:
+        for table in ("street_geometry", "street_geometry_lod", "street_geometry_dirty"):
+            conn.execute(f"DELETE FROM {table}")
+        _bump_version(conn)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_addresses_geom_insert
+        AFTER INSERT ON addresses
+        WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+        BEGIN
+            INSERT OR IGNORE INTO street_geometry_dirty (street_name) VALUES (NEW.street_name);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_addresses_geom_update
+        AFTER UPDATE OF latitude, longitude, street_name ON addresses
+        BEGIN
+            INSERT OR IGNORE INTO street_geometry_dirty (street_name) VALUES (NEW.street_name);
+            INSERT OR IGNORE INTO street_geometry_dirty (street_name) VALUES (OLD.street_name);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_addresses_geom_delete
+        AFTER DELETE ON addresses
+        BEGIN
+            INSERT OR IGNORE INTO street_geometry_dirty (street_name) VALUES (OLD.street_name);
+        END
+    """)
+    conn.commit()
+
+
+# --- Construction ----------------------------------------------------------------------
+
+def _bump_version(conn: sqlite3.Connection) -> None:
+    conn.execute("UPDATE street_geometry_version SET version = version + 1 WHERE id = 1")
+
+
+def _load_points(conn: sqlite3.Connection, street_names: list[str] | None) -> pd.DataFrame:
+    base = """
+        SELECT street_name AS rue, latitude AS lat, longitude AS lon
+        FROM addresses
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """
+    if street_names is None:
+        return pd.read_sql_query(base, conn)
+    frames = []
+    # SQLite limite le nombre de paramètres par requête
+    for i in range(0, len(street_names), 500):
+        chunk = street_names[i:i + 500]
+        q = base + f" AND street_name IN ({','.join('?' for _ in chunk)})"
+        frames.append(pd.read_sql_query(q, conn, params=tuple(chunk)))
+    if not frames:
+        return pd.DataFrame(columns=["rue", "lat", "lon"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def rebuild_street_geometry(conn: sqlite3.Connection, street_names: Iterable[str] | None = None,
+                            mode: str = street_order.DEFAULT_MODE) -> int:
+    """
+    Recalcule la géométrie de toutes les rues (street_names=None) ou des rues données.
+    Les rues sans point géocodé sont retirées de la table. Retourne le nombre de rues écrites.
+    `mode` : ordonnancement des points ("angle" ou "chain", voir street_order).
+    """
+    names = None if street_names is None else sorted(set(street_names))
+    if names is not None and not names:
+        return 0
+    df = _load_points(conn, names)
+
+    rows, lod_rows = [], []
+    for rue, pts in street_order.ordered_lines(df, mode).items():
+        mins, maxs = pts.min(axis=0), pts.max(axis=0)
+        rows.append((
+            rue, json.dumps(pts.tolist(), separators=(",", ":")), len(pts),
+            float(mins[0]), float(mins[1]), float(maxs[0]), float(maxs[1]),
+        ))
+        for tol, simple in simplify.simplify_levels(pts).items():
+            if len(simple) < len(pts):
+                lod_rows.append((rue, tol, json.dumps(simple.tolist(), separators=(",", ":")), len(simple)))
+
+    with conn:
+        if names is None:
+            conn.execute("DELETE FROM street_geometry")
+            conn.execute("DELETE FROM street_geometry_lod")
+        else:
+            conn.executemany("DELETE FROM street_geometry WHERE street_name = ?", [(n,) for n in names])
+            conn.executemany("DELETE FROM street_geometry_lod WHERE street_name = ?", [(n,) for n in names])
+        conn.executemany(
+            """
+            INSERT INTO street_geometry (street_name, coords, n_points, min_lat, min_lon, max_lat, max_lon)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        conn.executemany(
+            "INSERT INTO street_geometry_lod (street_name, tolerance_m, coords, n_points) VALUES (?, ?, ?, ?)",
+            lod_rows,
+        )
+        if names is None:
+            conn.execute("DELETE FROM street_geometry_dirty")
+        else:
+            conn.executemany("DELETE FROM street_geometry_dirty WHERE street_name = ?", [(n,) for n in names])
+        _bump_version(conn)
+    return len(rows)
+
+
+def needs_refresh(conn: sqlite3.Connection) -> bool:
+    """Vrai si refresh_street_geometry aurait quelque chose à faire (lecture seule)."""
+    if conn.execute("SELECT 1 FROM street_geometry_dirty LIMIT 1").fetchone():
+        return True
+    if conn.execute("SELECT 1 FROM street_geometry LIMIT 1").fetchone():
+        return _lod_missing(conn)
+    return conn.execute(
+        "SELECT 1 FROM addresses WHERE latitude IS NOT NULL AND longitude IS NOT NULL LIMIT 1"
+    ).fetchone() is not None
+
+
+def _lod_missing(conn: sqlite3.Connection) -> bool:
+    """Géométrie construite avant l'ajout des niveaux simplifiés : aucun niveau alors qu'il en faudrait."""
+    if conn.execute("SELECT 1 FROM street_geometry_lod LIMIT 1").fetchone():
+        return False
+    return conn.execute("SELECT 1 FROM street_geometry WHERE n_points >= 3 LIMIT 1").fetchone() is not None
+
+
+def refresh_street_geometry(conn: sqlite3.Connection) -> int:
+    """
+    Reconstruit seulement ce qui est nécessaire :
+    - table vide alors que des adresses sont géocodées -> reconstruction complète,
+    - niveaux simplifiés absents (table antérieure) -> reconstruction complète,
+    - sinon les rues inscrites dans street_geometry_dirty.
+    Retourne le nombre de rues recalculées (0 dans le cas courant).
+    """
+    has_geom = conn.execute("SELECT 1 FROM street_geometry LIMIT 1").fetchone()
+    if not has_geom:
+        has_points = conn.execute(
+            "SELECT 1 FROM addresses WHERE latitude IS NOT NULL AND longitude IS NOT NULL LIMIT 1"
+        ).fetchone()
+        return rebuild_street_geometry(conn) if has_points else 0
+    if _lod_missing(conn):
+        return rebuild_street_geometry(conn)
+    dirty = [r[0] for r in conn.execute("SELECT street_name FROM street_geometry_dirty").fetchall()]
+    return rebuild_street_geometry(conn, dirty) if dirty else 0
+
+
+# --- Lecture -----------------------------------------------------------------------------
+
+def _coords_sql(tolerance_m: float) -> tuple[str, str, tuple]:
+    """(expression coords, jointure, paramètres) pour lire le niveau simplifié demandé."""
+    if not tolerance_m:
+        return "g.coords", "", ()
+    return ("COALESCE(l.coords, g.coords)",
+            "LEFT JOIN street_geometry_lod l ON l.street_name = g.street_name AND l.tolerance_m = ?",
+            (float(tolerance_m),))
+
+
+def fetch_street_lines(conn: sqlite3.Connection, team_id: str | None = None,
+                       tolerance_m: float = 0.0) -> list[tuple[str, str, str | None, list]]:
+    """
+    Retourne [(rue, status, team, [[lat, lon], ...]), ...] prêts à dessiner.
+    Si team_id est fourni, seules les rues de l'équipe sont retournées.
+    tolerance_m : niveau simplifié (une des simplify.LOD_TOLERANCES_M ; 0 = complet).
+    """
+    coords, join, params = _coords_sql(tolerance_m)
+    q = f"""
+        SELECT s.name, s.status, s.team, {coords}
+        FROM streets s
+        JOIN street_geometry g ON g.street_name = s.name
+        {join}
+    """
+    if team_id is not None:
+        q += " WHERE s.team = ?"
+        params += (team_id,)
+    return [(r[0], r[1], r[2], json.loads(r[3])) for r in conn.execute(q, params).fetchall()]
+
+
+def fetch_street_statuses(conn: sqlite3.Connection, team_id: str | None = None) -> dict[str, tuple[str, str | None]]:
+    """{rue: (status, team)} — lecture légère, sans coordonnées, pour recolorer une carte."""
+    q = "SELECT name, status, team FROM streets"
+    params: tuple = ()
+    if team_id is not None:
+        q += " WHERE team = ?"
+        params = (team_id,)
+    return {r[0]: (r[1], r[2]) for r in conn.execute(q, params).fetchall()}
+
+
+def geometry_version(conn: sqlite3.Connection) -> int:
+    """
+    Compteur de street_geometry_version : augmente à chaque reconstruction, même
+    plusieurs fois dans la même seconde (updated_at n'a qu'une résolution d'une seconde).
+    """
+    row = conn.execute("SELECT version FROM street_geometry_version WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+
+def fetch_street_lines_in_bbox(conn: sqlite3.Connection, south: float, west: float, north: float, east: float,
+                               team_id: str | None = None,
+                               tolerance_m: float = 0.0) -> list[tuple[str, str, str | None, list]]:
+    """Comme fetch_street_lines, limité aux rues dont la boîte englobante touche la fenêtre."""
+    coords, join, join_params = _coords_sql(tolerance_m)
+    q = f"""
+        SELECT s.name, s.status, s.team, {coords}
+        FROM street_geometry g
+        JOIN streets s ON s.name = g.street_name
+        {join}
+        WHERE g.max_lat >= ? AND g.min_lat <= ? AND g.max_lon >= ? AND g.min_lon <= ?
+    """
+    params: list = [*join_params, south, north, west, east]
+    if team_id is not None:
+        q += " AND s.team = ?"
+        params.append(team_id)
+    return [(r[0], r[1], r[2], json.loads(r[3])) for r in conn.execute(q, params).fetchall()]
+
+
+def street_clusters(conn: sqlite3.Connection, team_id: str | None = None,
+                    cell_deg: float = 0.025) -> list[dict]:
+    """
+    Agrégats pour les vues éloignées : une entrée par secteur (rues avec secteur)
+    ou par cellule de grille de cell_deg degrés (rues sans secteur), positionnée
+    au centre moyen des rues. Clés : label, lat, lon, streets, a_faire, en_cours, terminee.
+    """
+    # Secteur : table sectors (schéma de init_db) ou colonne texte streets.sector (import_data.py)
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(streets)").fetchall()}
+    if "sector_id" in cols:
+        sector_expr, join = "c.name", "LEFT JOIN sectors c ON c.id = s.sector_id"
+    elif "sector" in cols:
+        sector_expr, join = "s.sector", ""
+    else:
+        sector_expr, join = "NULL", ""
+    q = f"""
+        SELECT {sector_expr} AS sector, s.status,
+               (g.min_lat + g.max_lat) / 2 AS lat, (g.min_lon + g.max_lon) / 2 AS lon
+        FROM street_geometry g
+        JOIN streets s ON s.name = g.street_name
+        {join}
+    """
+    params: tuple = ()
+    if team_id is not None:
+        q += " WHERE s.team = ?"
+        params = (team_id,)
+    df = pd.read_sql_query(q, conn, params=params)
+    if df.empty:
+        return []
+    sector = df["sector"].fillna("").astype(str).str.strip()
+    # Libellé de cellule : son centre, arrondi (ex. « Zone 45.745, -73.605 »)
+    cell_lat = ((df["lat"] // cell_deg) + 0.5) * cell_deg
+    cell_lon = ((df["lon"] // cell_deg) + 0.5) * cell_deg
+    cell = cell_lat.map("{:.3f}".format) + ", " + cell_lon.map("{:.3f}".format)
+    df["label"] = sector.where(sector != "", "Zone " + cell)
+    df["status"] = df["status"].fillna("a_faire")
+    agg = df.groupby("label", sort=True).agg(lat=("lat", "mean"), lon=("lon", "mean"), streets=("status", "size"))
+    counts = pd.crosstab(df["label"], df["status"]).reindex(columns=["a_faire", "en_cours", "terminee"], fill_value=0)
+    out = agg.join(counts).reset_index()
+    return [
+        {"label": r.label, "lat": float(r.lat), "lon": float(r.lon), "streets": int(r.streets),
+         "a_faire": int(r.a_faire), "en_cours": int(r.en_cours), "terminee": int(r.terminee)}
+        for r in out.itertuples(index=False)
+    ]
@@ -1,49 +1,44 @@
 import pandas as pd
 from pathlib import Path
-import time
-from geopy.geocoders import Nominatim
-def enrich_addresses_with_geocoding(conn):
-    """Parcourt les adresses de la DB pour les enrichir avec code postal et GPS via Nominatim."""
+
+from guignomap import geometry, bulk_import, geocoding, osm
+
+def enrich_addresses_with_geocoding(conn, provider=None, workers=4, batch_size=50, limit=None, offline_first=True):
+    """
+    Enrichit les adresses de la DB (GPS + code postal) via guignomap.geocoding :
+    requêtes concurrentes au débit du fournisseur (Nominatim par défaut), écritures
+    par lots, reprise automatique grâce à la table geocode_progress. Les adresses
+    déjà présentes dans geocode_cache ne coûtent aucun appel au fournisseur.
+    offline_first : résout d'abord localement (guignomap.osm), le fournisseur ne reçoit que le reste.
+    """
     print("\nDébut de l'enrichissement par géocodage (peut prendre plusieurs heures)...")
-    
-    geolocator = Nominatim(user_agent="guignomap_mascouche_app")
-    
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, house_number, street_name FROM addresses WHERE code_postal IS NULL")
-    addresses_to_process = cursor.fetchall()
-    
-    total_addresses = len(addresses_to_process)
-    print(f"{total_addresses} adresses à traiter.")
-    
-    for index, addr in enumerate(addresses_to_process):
-        address_id, house_number, street_name = addr
-        full_address = f"{house_number} {street_name}, Mascouche, QC, Canada"
-        
-        print(f"Traitement {index + 1}/{total_addresses} : {full_address}")
-        
-        try:
-            location = geolocator.geocode(full_address, addressdetails=True)
-            
-            if location:
-                lat = location.latitude
-                lon = location.longitude
-                postcode = location.raw.get('address', {}).get('postcode', '')
-                
-                cursor.execute(
-                    "UPDATE addresses SET latitude = ?, longitude = ?, code_postal = ? WHERE id = ?",
-                    (lat, lon, postcode, address_id)
-                )
-                conn.commit()
-                print(f"  -> Trouvé ! CP: {postcode}")
-            else:
-                print("  -> Adresse non trouvée.")
+    offline_streets = set()
+    if offline_first:
+        offline = osm.resolve_pending(conn)
+        offline_streets = offline["touched_streets"]
+        print(f"Résolution locale : {offline['resolved']}/{offline['pending']} adresses "
+              f"({offline['methods']}), {offline['remaining']} laissées au fournisseur "
+              f"(dont {offline['deferred']} points approximatifs).")
+    if provider is None:
+        provider = geocoding.NominatimProvider()
 
-        except Exception as e:
-            print(f"  -> Erreur lors du géocodage : {e}")
+    def _progress(stats):
+        print(f"  {stats['processed']}/{stats['pending']} traitées "
+              f"({stats['found']} trouvées, {stats['not_found']} introuvables, {stats['errors']} erreurs)")
 
-        # Règle d'or de Nominatim : 1 requête par seconde !
-        time.sleep(1)
+    engine = geocoding.GeocodingEngine(conn, provider, workers=workers, batch_size=batch_size,
+                                       on_progress=_progress)
+    try:
+        stats = engine.run(limit=limit)
+    except KeyboardInterrupt:
+        print("Interrompu : la progression est enregistrée, relancer pour reprendre.")
+        stats = engine.stats
+    print(f"{stats['processed']} adresses traitées en {stats['seconds']:.0f} s "
+          f"({stats['cache_hits']} depuis le cache, {stats['retries']} nouvelles tentatives).")
 
+    # Géométrie des rues : seulement celles dont des points ont changé
+    geometry.init_street_geometry_schema(conn)
+    geometry.rebuild_street_geometry(conn, engine.touched_streets | offline_streets)
     print("✅ Enrichissement par géocodage terminé.")
 import sys
 
@@ -100,60 +95,34 @@ import pandas as pd
 from pathlib import Path
 
 def import_to_database(conn):
-    """Importe le contenu de nocivique.xlsx dans la DB (v2, sans secteur prédéfini)."""
+    """Importe le fichier officiel nocivique (csv ou xlsx) dans la DB (v2, sans secteur prédéfini).
+    Chargement en bloc (guignomap.bulk_import) : une transaction, index recréés après le chargement.
+    """
     print("Début de l'importation des données officielles (stratégie sans secteur)...")
-    file_path = Path("import/nocivique.xlsx")
+    file_path = bulk_import.find_civic_file("nocivique")
     
-    if not file_path.exists():
-        print(f"ERREUR: Fichier {file_path} introuvable. Import annulé.")
+    if file_path is None:
+        print("ERREUR: Fichier import/nocivique.csv|xlsx introuvable. Import annulé.")
         return 0, 0
-    
-    df = pd.read_excel(file_path)
 
-    # Noms des colonnes réelles du fichier Excel
-    COL_RUE = 'nomrue'
-    COL_NUMERO = 'NoCiv'
-    
-    if not all(col in df.columns for col in [COL_RUE, COL_NUMERO]):
-        print(f"ERREUR: Les colonnes requises ('{COL_RUE}', '{COL_NUMERO}') sont introuvables. Import annulé.")
+    try:
+        df = bulk_import.normalize_civic_frame(bulk_import.read_civic_file(file_path))
+    except ValueError as e:
+        print(f"ERREUR: {e}. Import annulé.")
         return 0, 0
+    print(f"{file_path} lu : {len(df)} adresses, {df['street_name'].nunique()} rues uniques.")
 
-    print("Nettoyage des anciennes données (notes, addresses, streets)...")
-    conn.execute("DELETE FROM notes")
-    conn.execute("DELETE FROM addresses")
-    conn.execute("DELETE FROM streets")
-    conn.commit()
-
-    # 1. Importer les rues uniques sans secteur
-    rues_uniques = df[COL_RUE].dropna().unique()
-    print(f"Détection de {len(rues_uniques)} rues uniques.")
-    
-    rues_importees = 0
-    for rue in rues_uniques:
-        # Le secteur est laissé NULL (None) pour être défini plus tard par le gestionnaire.
-        conn.execute(
-            "INSERT OR IGNORE INTO streets (name, sector_id, status) VALUES (?, NULL, 'a_faire')",
-            (rue,)
-        )
-        rues_importees += 1
-    conn.commit()
-    print(f"{rues_importees} rues insérées sans secteur.")
-
-    # 2. Importer toutes les adresses civiques
-    adresses_importees = 0
-    for _, row in df.iterrows():
-        # S'assurer que le numéro civique n'est pas vide/NaN
-        if pd.notna(row[COL_NUMERO]):
-            conn.execute(
-                "INSERT INTO addresses (street_name, house_number, osm_type) VALUES (?, ?, 'official')",
-                (row[COL_RUE], str(row[COL_NUMERO]))
-            )
-            adresses_importees += 1
-    conn.commit()
-    print(f"{adresses_importees} adresses insérées.")
+    # Le secteur est laissé NULL pour être défini plus tard par le gestionnaire.
+    print("Remplacement des anciennes données (notes, addresses, streets)...")
+    report = bulk_import.bulk_load(conn, df, replace=True)
+    rues_importees, adresses_importees = report["streets"], report["addresses"]
+    print(f"{rues_importees} rues et {adresses_importees} adresses insérées en "
+          f"{report['seconds']:.2f} s ({report['rows_per_s']:.0f} lignes/s).")
     
     total_db = conn.execute("SELECT COUNT(*) FROM addresses").fetchone()[0]
     print(f"Vérification: {total_db} adresses sont maintenant dans la base de données.")
+    geometry.init_street_geometry_schema(conn)
+    geometry.rebuild_street_geometry(conn)
     print("✅ Importation terminée avec succès.")
     enrich_addresses_with_geocoding(conn)
     return rues_importees, adresses_importees
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Calques Folium des rues : géométrie séparée des statuts.
+
+- `base_map` construit une carte dont le calque GeoJSON porte uniquement la
+  géométrie (nom de rue + coordonnées), à mettre en cache par session ;
+- `status_layer` produit un petit FeatureGroup contenant un script qui colore
+  ce calque à partir d'un dictionnaire compact {rue: code statut}.
+
+Avec `st_folium(..., feature_group_to_add=...)`, tant que la carte de base est
+identique le composant n'est pas remonté : seul le script de statut est
+réévalué côté navigateur à chaque rerun.
+
+Mode « fenêtre » (pages publiques) : `empty_map` ne contient aucune donnée ;
+`lines_layer` (rues visibles, déjà colorées) ou `cluster_layer` (agrégats par
+secteur/zone aux zooms éloignés) sont envoyés comme FeatureGroup.
+
+Page publique statique : `public_map` ne contient qu'une URL ; le navigateur
+télécharge le GeoJSON publié (voir publish) et le colore lui-même.
+"""
+from __future__ import annotations
+
+import json
+
+import folium
+from jinja2 import Template
+
+DEFAULT_CENTER = [45.7475, -73.6005]
+
+STATUS_COLORS = {
+    "terminee": "#22c55e",  # vert
+    "en_cours": "#f59e0b",  # orange
+    "a_faire": "#ef4444",   # rouge
+}
+UNKNOWN_COLOR = "#6b7280"
+
+# Code compact envoyé au navigateur : index du statut, +3 si la rue n'est pas assignée
+STATUS_CODES = {"a_faire": 0, "en_cours": 1, "terminee": 2}
+_PALETTE = [STATUS_COLORS["a_faire"], STATUS_COLORS["en_cours"], STATUS_COLORS["terminee"]]
+
+
+COORD_DECIMALS = 5  # ~1 m : au-delà, des octets sans effet visible
+
+
+def streets_geojson(lines, decimals: int = COORD_DECIMALS) -> dict:
+    """FeatureCollection (LineString ou Point) à partir de [(rue, status, team, [[lat, lon], ...]), ...]."""
+    features = []
+    for rue, _status, _team, pts in lines:
+        if not pts:
+            continue
+        if len(pts) < 2:
+            geom = {"type": "Point", "coordinates": [round(pts[0][1], decimals), round(pts[0][0], decimals)]}
+        else:
+            geom = {"type": "LineString",
+                    "coordinates": [[round(lo, decimals), round(la, decimals)] for la, lo in pts]}
+        features.append({"type": "Feature", "properties": {"rue": rue}, "geometry": geom})
+    return {"type": "FeatureCollection", "features": features}
+
+
+def status_code(status: str | None, team: str | None) -> int:
+    code = STATUS_CODES.get(status or "a_faire", 0)
+    unassigned = team is None or str(team).strip() == ""
+    return code + 3 if unassigned else code
+
+
+def base_map(geojson: dict, zoom_start: int = 12, weight: int = 4) -> tuple[folium.Map, folium.GeoJson]:
+    """Carte + calque GeoJSON gris (géométrie seule). Retourne (carte, calque)."""
+    m = folium.Map(location=DEFAULT_CENTER, zoom_start=zoom_start, tiles="OpenStreetMap")
+    layer = folium.GeoJson(
+        geojson,
+        name="rues",
+        style_function=lambda _f: {"color": UNKNOWN_COLOR, "weight": weight, "opacity": 0.6},
+        marker=folium.CircleMarker(radius=4, fill=True, fill_opacity=0.7),
+        tooltip=folium.GeoJsonTooltip(fields=["rue"], labels=False),
+        embed=True,
+    )
+    layer.add_to(m)
+    return m, layer
+
+
+class StatusStyle(folium.MacroElement):
+    """Script qui applique la couleur de statut à chaque rue du calque de base."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var codes = {{ this.codes_json }};
+            var palette = {{ this.palette_json }};
+            var weight = {{ this.weight }};
+            {{ this.layer.get_name() }}.eachLayer(function(l) {
+                var c = codes[l.feature.properties.rue];
+                if (c === undefined) { l.setStyle({opacity: 0, fillOpacity: 0}); return; }
+                var unassigned = c >= 3;
+                l.setStyle({
+                    color: palette[c % 3], fillColor: palette[c % 3],
+                    weight: unassigned ? weight - 1 : weight,
+                    opacity: unassigned ? 0.6 : 0.9, fillOpacity: 0.7,
+                    dashArray: unassigned ? "5, 10" : null
+                });
+            });
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, layer: folium.GeoJson, codes: dict[str, int], weight: int = 4):
+        super().__init__()
+        self._name = "StatusStyle"
+        self.layer = layer
+        self.codes_json = json.dumps(codes, ensure_ascii=False, separators=(",", ":"))
+        self.palette_json = json.dumps(_PALETTE)
+        self.weight = weight
+
+
+def status_layer(layer: folium.GeoJson, statuses: dict[str, tuple[str, str | None]],
+                 weight: int = 4) -> folium.FeatureGroup:
+    """FeatureGroup léger qui colore `layer` selon {rue: (status, team)}."""
+    codes = {rue: status_code(status, team) for rue, (status, team) in statuses.items()}
+    fg = folium.FeatureGroup(name="statuts", control=False)
+    StatusStyle(layer, codes, weight).add_to(fg)
+    return fg
+
+
+def empty_map(zoom_start: int = 12) -> folium.Map:
+    """Carte de base sans aucune donnée (quelques Ko) pour le mode fenêtre."""
+    return folium.Map(location=DEFAULT_CENTER, zoom_start=zoom_start, tiles="OpenStreetMap")
+
+
+class CodedGeoJson(folium.MacroElement):
+    """
+    Calque GeoJSON compact : le style est calculé dans le navigateur à partir du
+    code `c` de chaque entité (pas de style par entité comme avec style_function).
+    `kind` : "lines" (rues, code statut 0..5) ou "clusters" (code 0..2, rayon `r`).
+    Avec `url`, les données ne sont pas incluses : le navigateur les télécharge.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = (function() {
+            var P = {{ this.palette_json }}, W = {{ this.weight }};
+            var style = {{ this.style_js }};
+            var layer = L.geoJson({{ this.data_json }}, {
+                style: function(f) { return style(f.properties); },
+                pointToLayer: function(f, ll) { return L.circleMarker(ll, style(f.properties)); }
+            }).bindTooltip(function(l) { return String(l.feature.properties.{{ this.tooltip_field }}); });
+            {% if this.url %}
+            fetch({{ this.url_json }}).then(function(r) { return r.json(); })
+                .then(function(d) { layer.addData(d); });
+            {% endif %}
+            return layer;
+        })().addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    _STYLES = {
+        "lines": ("function(p) { var u = p.c >= 3, col = P[p.c % 3]; return {color: col, fillColor: col, "
+                  "weight: u ? W - 1 : W, opacity: u ? 0.6 : 0.9, fillOpacity: 0.7, radius: 4, "
+                  "dashArray: u ? '5, 10' : null}; }"),
+        "clusters": ("function(p) { var col = P[p.c]; return {color: col, fillColor: col, weight: 2, "
+                     "fillOpacity: 0.55, radius: p.r}; }"),
+    }
+
+    def __init__(self, data: dict | None, kind: str, tooltip_field: str, weight: int = 4,
+                 url: str | None = None):
+        super().__init__()
+        self._name = "CodedGeoJson"
+        self.data_json = json.dumps(data, ensure_ascii=False, separators=(",", ":")) if data else "null"
+        self.url = url
+        self.url_json = json.dumps(url)
+        self.palette_json = json.dumps(_PALETTE)
+        self.style_js = self._STYLES[kind]
+        self.tooltip_field = tooltip_field
+        self.weight = weight
+
+
+def coded_streets_geojson(lines, decimals: int = COORD_DECIMALS) -> dict:
+    """streets_geojson + code statut `c` par rue (format attendu par CodedGeoJson "lines")."""
+    geojson = streets_geojson(lines, decimals)
+    codes = {rue: status_code(status, team) for rue, status, team, _pts in lines}
+    for feature in geojson["features"]:
+        feature["properties"]["c"] = codes[feature["properties"]["rue"]]
+    return geojson
+
+
+def lines_layer(lines, weight: int = 4) -> folium.FeatureGroup:
+    """FeatureGroup autonome : rues [(rue, status, team, pts)] colorées selon leur statut."""
+    geojson = coded_streets_geojson(lines)
+    fg = folium.FeatureGroup(name="rues", control=False)
+    if geojson["features"]:
+        CodedGeoJson(geojson, "lines", "rue", weight).add_to(fg)
+    return fg
+
+
+def cluster_layer(clusters: list[dict]) -> folium.FeatureGroup:
+    """FeatureGroup de cercles (un par secteur/zone), taille selon le nombre de rues,
+    couleur selon l'avancement (toutes terminées / commencé / rien)."""
+    features = []
+    for c in clusters:
+        done, total = c["terminee"], max(c["streets"], 1)
+        code = 2 if done >= total else (1 if done or c["en_cours"] else 0)
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [round(c["lon"], 5), round(c["lat"], 5)]},
+            "properties": {
+                "label": f"{c['label']} : {done}/{c['streets']} rues terminées",
+                "c": code,
+                "r": round(6 + 14 * min(c["streets"], 60) ** 0.5 / 60 ** 0.5, 1),
+            },
+        })
+    fg = folium.FeatureGroup(name="secteurs", control=False)
+    if features:
+        CodedGeoJson({"type": "FeatureCollection", "features": features}, "clusters", "label").add_to(fg)
+    return fg
+
+
+def public_map(url: str, zoom_start: int = 12, weight: int = 4) -> folium.Map:
+    """Carte dont les rues (GeoJSON codé) sont téléchargées par le navigateur depuis `url`."""
+    m = empty_map(zoom_start)
+    CodedGeoJson(None, "lines", "rue", weight, url=url).add_to(m)
+    return m
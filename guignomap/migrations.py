@@ -0,0 +1,160 @@
+"""
+Migrations de schéma versionnées.
+
+Les structures ajoutées au fil du temps (suivi des rues, clés entières, index
+composites, compteurs, statistiques par rue, géométrie, index spatial, statut
+unifié, journal des checkpoints et transitions reliés par clé) étaient
+créées à chaque appel ou à chaque démarrage par des `CREATE ... IF NOT EXISTS`
+suivis d'un commit. Elles sont maintenant des migrations numérotées, appliquées
+une seule fois par base et inscrites dans la table `schema_version` :
+
+- `migrate(conn)` applique, dans l'ordre, celles qui manquent (une seule lecture
+  de `schema_version` quand la base est à jour) ;
+- chaque migration est idempotente : une base créée avant ce module, ou deux
+  processus qui migrent en même temps, ne posent pas de problème ;
+- une nouvelle structure = une nouvelle entrée à la fin de `MIGRATIONS`, jamais
+  une modification d'une migration déjà publiée ;
+- une table recréée hors migrations (`import_data.py` supprime et recrée
+  streets / addresses) perd colonnes et triggers alors que `schema_version` les
+  dit appliqués : `migrate` vérifie quelques marqueurs (`SCHEMA_MARKERS`) et
+  réapplique toutes les migrations s'il en manque.
+
+Les tables de base (streets, addresses, notes, ...) restent créées par
+`db.init_db` ou par le script d'import ; `migrate` ne fait rien tant que
+`streets` n'existe pas.
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+from typing import Callable
+
+from guignomap import db, geometry, spatial
+
+_LOG = logging.getLogger("guignomap.migrations")
+_LOG.addHandler(logging.NullHandler())
+
+
+def _notes_table(conn: sqlite3.Connection) -> None:
+    # Schéma minimal attendu par add_street_note (init_db crée la version complète)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            street_name TEXT NOT NULL,
+            team_id TEXT NOT NULL,
+            address_number TEXT,
+            comment TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+# (version, nom, fonction) — ordre d'application ; ne jamais renuméroter
+MIGRATIONS: list[tuple[int, str, Callable[[sqlite3.Connection], object]]] = [
+    (1, "street_status", db.init_street_status_schema),
+    (2, "notes_table", _notes_table),
+    (3, "street_keys", db.init_street_keys),
+    (4, "query_indexes", db.init_query_indexes),
+    (5, "progress_counters", db.init_progress_counters),
+    (6, "street_address_stats", db.init_street_address_stats),
+    (7, "street_geometry", geometry.init_street_geometry_schema),
+    (8, "spatial_index", spatial.init_spatial_schema),
+    (9, "unified_status", db.init_unified_status),
+    (10, "checkpoint_street_keys", db.init_checkpoint_street_keys),
+    (11, "status_event_street_keys", db.init_street_keys),
+]
+
+
+# Structures dont l'absence montre qu'une migration inscrite n'est plus en place :
+# "table.colonne" ou nom de trigger. R*Tree (8) est optionnel : pas de marqueur.
+SCHEMA_MARKERS: dict[int, tuple[str, ...]] = {
+    3: ("addresses.street_id", "trg_street_keys_streets_insert", "trg_street_keys_addresses_insert"),
+    5: ("trg_progress_streets_insert",),
+    6: ("streets.address_count", "trg_street_stats_insert"),
+    7: ("trg_addresses_geom_insert", "street_geometry_version.version"),
+    9: ("streets.status_updated_at",),
+}
+
+
+def missing_structures(conn: sqlite3.Connection, versions) -> list[str]:
+    """Marqueurs des versions données absents de la base (une seule requête)."""
+    expected = [m for v in sorted(versions) for m in SCHEMA_MARKERS.get(v, ())]
+    if not expected:
+        return []
+    tables = sorted({m.split(".")[0] for m in expected if "." in m})
+    parts = [f"SELECT '{t}.' || name AS name FROM pragma_table_info('{t}')" for t in tables]
+    parts.append("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    found = {r[0] for r in conn.execute(
+        f"SELECT name FROM ({' UNION ALL '.join(parts)}) WHERE name IN ({','.join('?' * len(expected))})",
+        expected,
+    ).fetchall()}
+    return [m for m in expected if m not in found]
+
+
+def init_schema_version(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Dernière version appliquée (0 si aucune, ou si schema_version n'existe pas)."""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+def applied_versions(conn: sqlite3.Connection) -> set[int]:
+    try:
+        return {r[0] for r in conn.execute("SELECT version FROM schema_version").fetchall()}
+    except sqlite3.OperationalError:
+        return set()
+
+
+def pending(conn: sqlite3.Connection) -> list[tuple[int, str]]:
+    """Migrations pas encore appliquées : [(version, nom)]."""
+    done = applied_versions(conn)
+    return [(v, name) for v, name, _fn in MIGRATIONS if v not in done]
+
+
+def migrate(conn: sqlite3.Connection) -> list[int]:
+    """
+    Applique les migrations manquantes, dans l'ordre. Retourne les versions appliquées.
+    Si des structures de versions inscrites ont disparu (tables recréées), toutes les
+    migrations sont réappliquées. S'arrête à la première migration en échec (les
+    suivantes peuvent en dépendre).
+    """
+    done = applied_versions(conn)
+    missing = missing_structures(conn, done)
+    if not missing and all(v in done for v, _name, _fn in MIGRATIONS):
+        return []
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'streets'").fetchone():
+        _LOG.warning("migrations skipped: no streets table yet")
+        return []
+    if missing:
+        _LOG.warning("schema drift (%s missing): re-applying all migrations", ", ".join(missing))
+        done = set()
+    init_schema_version(conn)
+    conn.commit()
+    applied = []
+    for version, name, fn in MIGRATIONS:
+        if version in done:
+            continue
+        try:
+            fn(conn)
+            conn.execute("INSERT OR IGNORE INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            _LOG.warning("migration %d (%s) failed", version, name, exc_info=True)
+            break
+        applied.append(version)
+    if applied:
+        _LOG.info("schema migrated to version %d (%s)", applied[-1], ", ".join(map(str, applied)))
+    return applied
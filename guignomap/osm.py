@@ -1,8 +1,278 @@
-# osm.py — stub minimal pour robustesse
-# Ce module est optionnel et peut être remplacé par une vraie implémentation.
+"""
+Géocodeur local (hors ligne) de GuignoMap.
 
-def get_osm_data(*args, **kwargs):
-    """Stub: retourne une structure vide ou un message d'indisponibilité."""
-    return {}
+Sources :
+- l'extrait OSM `import/osm_mascouche_adresses.csv` : graphies de rues et codes
+  postaux (et coordonnées si l'export contient des colonnes @lat/@lon) ;
+- le fichier officiel `import/nocivique.csv` : liste de référence des rues ;
+- les adresses déjà géocodées en base : points d'ancrage GPS.
+
+Index :
+- clé de rue normalisée (guignomap.street_names : accents, casse, abréviations,
+  particules) -> nom officiel ;
+- par rue, numéros triés + coordonnées (NumPy) : correspondance exacte, sinon
+  interpolation linéaire entre les deux voisins du même côté de la rue (même
+  parité), sinon point le plus proche s'il est à moins de `max_gap` numéros.
+
+`resolve_pending(conn)` traite en une passe toutes les adresses en attente ;
+seul le reste est laissé aux fournisseurs distants (guignomap.geocoding). Un point
+« le plus proche » peut être la maison d'un voisin à plusieurs dizaines de numéros :
+sous `DEFAULT_MIN_CONFIDENCE`, l'adresse reste en attente pour le fournisseur distant.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from guignomap import bulk_import, geocoding, street_names
+
+_LOG = logging.getLogger("guignomap.osm")
+_LOG.addHandler(logging.NullHandler())
+
+OSM_EXTRACT = Path("import/osm_mascouche_adresses.csv")
+OFFICIAL_FILE = Path("import/nocivique.csv")
+
+OSM_AVAILABLE = OSM_EXTRACT.exists()
+
+# Confiance associée à chaque méthode de résolution
+CONFIDENCE = {"exact": 0.9, "interpolated": 0.7, "nearest": 0.4}
+# Seuil par défaut pour enregistrer un résultat local comme définitif
+DEFAULT_MIN_CONFIDENCE = CONFIDENCE["interpolated"]
+
+
+# --- Normalisation --------------------------------------------------------------------------
+
+normalize_street = street_names.street_key
+
+
+def house_number_value(number) -> int | None:
+    """Partie numérique d'un numéro civique ('2690', '2690A', '2690.0') ou None."""
+    m = re.match(r"\s*(\d+)", str(number)) if number is not None else None
+    return int(m.group(1)) if m else None
+
+
+# --- Chargement des sources -----------------------------------------------------------------
+
+def load_osm_extract(path: str | Path = OSM_EXTRACT) -> pd.DataFrame:
+    """Colonnes : street_name, house_number, postal_code, latitude, longitude (NaN si absentes)."""
+    df = pd.read_csv(path, dtype=str)
+    lat_col = next((c for c in ("@lat", "lat", "latitude") if c in df.columns), None)
+    lon_col = next((c for c in ("@lon", "lon", "longitude") if c in df.columns), None)
+    out = pd.DataFrame({
+        "street_name": df["addr:street"].str.strip(),
+        "house_number": df["addr:housenumber"].str.strip(),
+        "postal_code": df.get("addr:postcode", pd.Series(index=df.index, dtype=str)).str.strip().str.upper(),
+        "latitude": pd.to_numeric(df[lat_col], errors="coerce") if lat_col else np.nan,
+        "longitude": pd.to_numeric(df[lon_col], errors="coerce") if lon_col else np.nan,
+    })
+    return out.dropna(subset=["street_name", "house_number"]).reset_index(drop=True)
+
+
+def load_official_streets(path: str | Path = OFFICIAL_FILE) -> pd.Series:
+    """Noms de rues officiels distincts (colonne nomrue)."""
+    df = bulk_import.normalize_civic_frame(bulk_import.read_civic_file(path))
+    return pd.Series(pd.unique(df["street_name"]), name="street_name")
+
+
+def load_db_anchors(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Adresses déjà géocodées en base (points d'ancrage)."""
+    cp_col = bulk_import.postal_column(conn)
+    return pd.read_sql_query(
+        f"SELECT street_name, house_number, {cp_col or 'NULL'} AS postal_code, latitude, longitude "
+        "FROM addresses WHERE latitude IS NOT NULL AND longitude IS NOT NULL",
+        conn,
+    )
+
+
+# --- Index ----------------------------------------------------------------------------------
+
+class OfflineGeocoder:
+    """
+    Index en mémoire : rues normalisées, numéros triés par rue, codes postaux connus.
+    Construire avec `from_sources` ; interroger avec `lookup` ou `lookup_many`.
+    """
+
+    def __init__(self, points: pd.DataFrame, official_streets=None, max_gap: int = 40):
+        self.max_gap = max_gap
+        pts = points.copy()
+        pts["key"] = street_names.street_keys(pts["street_name"])
+        pts["n"] = pd.to_numeric(pts["house_number"].astype("string").str.extract(r"^\s*(\d+)")[0],
+                                 errors="coerce")
+        pts["postal_code"] = pts["postal_code"].astype("string").str.strip().str.upper().replace("", pd.NA)
+        pts = pts[(pts["key"] != "") & pts["n"].notna()]
 
-OSM_AVAILABLE = False
+        # Nom officiel par clé (sinon la première graphie rencontrée dans les points)
+        self.names = street_names.StreetNameIndex(official_streets if official_streets is not None else ())
+        self.names.add_many(pts["street_name"].astype("string"))
+
+        # Codes postaux exacts (rue, numéro)
+        cps = pts.dropna(subset=["postal_code"])
+        self.postcodes: dict[tuple[str, int], str] = dict(zip(zip(cps["key"], cps["n"].astype(int)), cps["postal_code"]))
+
+        # Coordonnées : moyenne des points d'un même (rue, numéro)
+        geo = pts.dropna(subset=["latitude", "longitude"])
+        geo = geo.groupby(["key", "n"], sort=True)[["latitude", "longitude"]].mean().reset_index()
+        self._streets: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]] = {
+            key: (g["n"].to_numpy(dtype=np.int64), g["latitude"].to_numpy(), g["longitude"].to_numpy())
+            for key, g in geo.groupby("key", sort=False)
+        }
+
+    @classmethod
+    def from_sources(cls, conn: sqlite3.Connection | None = None, osm_path: str | Path | None = OSM_EXTRACT,
+                     official_path: str | Path | None = OFFICIAL_FILE, max_gap: int = 40) -> "OfflineGeocoder":
+        frames = []
+        if osm_path is not None and Path(osm_path).exists():
+            frames.append(load_osm_extract(osm_path))
+        if conn is not None:
+            frames.append(load_db_anchors(conn))
+        points = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+            columns=["street_name", "house_number", "postal_code", "latitude", "longitude"])
+        official = None
+        if official_path is not None and Path(official_path).exists():
+            official = load_official_streets(official_path)
+        return cls(points, official, max_gap=max_gap)
+
+    # --- Requêtes ----------------------------------------------------------------------------
+
+    def canonical_street(self, name) -> str | None:
+        """Nom officiel correspondant à une graphie quelconque, ou None."""
+        return self.names.lookup(name)
+
+    def stats(self) -> dict:
+        return {
+            "streets": len(self.names),
+            "streets_with_points": len(self._streets),
+            "points": int(sum(len(v[0]) for v in self._streets.values())),
+            "postcodes": len(self.postcodes),
+        }
+
+    def _postcode(self, key: str, n: int, lo: int | None = None, hi: int | None = None) -> str | None:
+        cp = self.postcodes.get((key, n))
+        if cp is None and lo is not None and hi is not None:
+            # Entre deux voisins de même code postal : même code
+            a, b = self.postcodes.get((key, lo)), self.postcodes.get((key, hi))
+            if a is not None and a == b:
+                cp = a
+        return cp
+
+    def lookup(self, house_number, street_name) -> tuple | None:
+        """(lat, lon, code postal, confiance, méthode) ou None."""
+        key = normalize_street(street_name)
+        n = house_number_value(house_number)
+        if not key or n is None or key not in self._streets:
+            return None
+        nums, lats, lons = self._streets[key]
+
+        i = int(np.searchsorted(nums, n))
+        if i < len(nums) and nums[i] == n:
+            return float(lats[i]), float(lons[i]), self._postcode(key, n), CONFIDENCE["exact"], "exact"
+
+        # Même côté de rue (parité) si au moins deux points, sinon tous les points
+        same_side = (nums % 2) == (n % 2)
+        if same_side.sum() >= 2:
+            nums, lats, lons = nums[same_side], lats[same_side], lons[same_side]
+            i = int(np.searchsorted(nums, n))
+
+        if 0 < i < len(nums):
+            lo, hi = nums[i - 1], nums[i]
+            t = (n - lo) / (hi - lo)
+            lat = lats[i - 1] + t * (lats[i] - lats[i - 1])
+            lon = lons[i - 1] + t * (lons[i] - lons[i - 1])
+            return float(lat), float(lon), self._postcode(key, n, int(lo), int(hi)), \
+                CONFIDENCE["interpolated"], "interpolated"
+
+        j = 0 if i == 0 else len(nums) - 1
+        if abs(int(nums[j]) - n) <= self.max_gap:
+            return float(lats[j]), float(lons[j]), self._postcode(key, n), CONFIDENCE["nearest"], "nearest"
+        return None
+
+    def lookup_many(self, rows) -> list[tuple | None]:
+        """rows : itérable de (house_number, street_name)."""
+        return [self.lookup(number, street) for number, street in rows]
+
+
+# --- Intégration ----------------------------------------------------------------------------
+
+class OsmProvider(geocoding.GeocodingProvider):
+    """Fournisseur local pour GeocodingEngine : requête « numéro rue, ville »."""
+
+    name = "osm"
+    rate = 10000.0
+    burst = 10000.0
+
+    def __init__(self, index: OfflineGeocoder, min_confidence: float = DEFAULT_MIN_CONFIDENCE):
+        self.index = index
+        self.min_confidence = min_confidence
+
+    def geocode(self, query: str):
+        address = query.split(",", 1)[0].strip()
+        m = re.match(r"(\S+)\s+(.+)", address)
+        if not m:
+            return None
+        hit = self.index.lookup(m.group(1), m.group(2))
+        return hit[:4] if hit and hit[3] >= self.min_confidence else None
+
+
+def resolve_pending(conn: sqlite3.Connection, index: OfflineGeocoder | None = None,
+                    min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> dict:
+    """
+    Résout localement les adresses en attente de géocodage sans coordonnées (une passe,
+    une transaction). Les adresses résolues avec une confiance d'au moins min_confidence
+    sont notées 'ok' dans geocode_progress (fournisseur 'osm') ; les autres, dont les
+    points « le plus proche » par défaut ('deferred'), restent en attente pour un
+    fournisseur distant.
+    """
+    geocoding.init_geocode_progress_schema(conn)
+    if index is None:
+        index = OfflineGeocoder.from_sources(conn)
+    missing = {r[0] for r in conn.execute(
+        "SELECT id FROM addresses WHERE latitude IS NULL OR longitude IS NULL").fetchall()}
+    pending = [row for row in geocoding.pending_addresses(conn) if row[0] in missing]
+    found, methods, touched = [], {"exact": 0, "interpolated": 0, "nearest": 0}, set()
+    deferred = 0
+    for addr_id, number, street, _cp in pending:
+        hit = index.lookup(number, street)
+        if hit is None:
+            continue
+        if hit[3] < min_confidence:
+            deferred += 1
+            continue
+        lat, lon, cp, _confidence, method = hit
+        found.append((lat, lon, cp, addr_id))
+        methods[method] += 1
+        touched.add(street)
+
+    cp_col = bulk_import.postal_column(conn)
+    with conn:
+        if cp_col:
+            conn.executemany(
+                f"UPDATE addresses SET latitude = ?, longitude = ?, "
+                f"{cp_col} = COALESCE(NULLIF({cp_col}, ''), ?) WHERE id = ?",
+                found,
+            )
+        else:
+            conn.executemany("UPDATE addresses SET latitude = ?, longitude = ? WHERE id = ?",
+                             [(lat, lon, addr_id) for lat, lon, _cp, addr_id in found])
+        conn.executemany(
+            """INSERT INTO geocode_progress (address_id, status, attempts, provider, updated_at)
+               VALUES (?, 'ok', 0, 'osm', CURRENT_TIMESTAMP)
+               ON CONFLICT(address_id) DO UPDATE SET status = 'ok', provider = 'osm',
+                   error = NULL, updated_at = CURRENT_TIMESTAMP""",
+            [(addr_id,) for *_x, addr_id in found],
+        )
+    _LOG.info("offline geocoding: %d/%d resolved %s, %d low-confidence hits deferred",
+              len(found), len(pending), methods, deferred)
+    return {"pending": len(pending), "resolved": len(found), "remaining": len(pending) - len(found),
+            "methods": methods, "deferred": deferred, "touched_streets": touched}
+
+
+def get_osm_data(*args, **kwargs):
+    """Extrait OSM chargé ({'addresses': DataFrame}), ou {} s'il est absent."""
+    if not OSM_EXTRACT.exists():
+        return {}
+    return {"addresses": load_osm_extract(OSM_EXTRACT)}
@@ -0,0 +1,147 @@
+"""
+Fusion ensembliste des codes postaux (nocivique_cp_complement.*) dans `addresses`.
+
+Au lieu d'un UPDATE par ligne (TRIM() empêche l'usage d'un index : un balayage
+complet de la table par ligne), la fusion :
+1. met le fichier normalisé en table temporaire `postal_stage`, clé
+   (rue, numéro), les graphies de rue ramenées au nom de la table streets
+   (guignomap.street_names) ;
+2. s'appuie sur l'index d'expression `idx_addresses_merge_key`
+   (TRIM(street_name), TRIM(house_number)) côté `addresses` ;
+3. met à jour toutes les adresses sans code postal en une seule instruction ;
+4. écrit les lignes non appariées, sans troncature, dans un rapport CSV lu
+   directement depuis le curseur.
+"""
+from __future__ import annotations
+
+import csv
+import sqlite3
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from guignomap import bulk_import, street_names
+
+MERGE_INDEX = "idx_addresses_merge_key"
+REPORT_COLUMNS = ("house_number", "street_name", "postal_code")
+
+
+def ensure_merge_index(conn: sqlite3.Connection) -> None:
+    """Index d'expression utilisé par la jointure (mêmes expressions que dans les requêtes)."""
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {MERGE_INDEX} "
+        "ON addresses(TRIM(street_name), TRIM(house_number))"
+    )
+
+
+def stage_postal_codes(conn: sqlite3.Connection, df: pd.DataFrame) -> int:
+    """
+    (Re)crée la table temporaire `postal_stage` à partir d'un DataFrame normalisé
+    (voir bulk_import.normalize_civic_frame). Les lignes sans code postal sont ignorées ;
+    en cas de doublon (rue, numéro), la première ligne l'emporte.
+    """
+    valid = df.dropna(subset=["postal_code"])
+    # « AV ST-DENIS » / « Avenue Saint-Denis » -> nom en base (inconnus gardés tels quels)
+    names = street_names.StreetNameIndex.from_conn(conn).canonicalize(valid["street_name"])
+    conn.execute("DROP TABLE IF EXISTS temp.postal_stage")
+    # Colonnes de clé sans type déclaré : pas de conversion d'affinité sur
+    # TRIM(...) = postal_stage.col, sinon SQLite n'utilise pas l'index d'expression.
+    conn.execute("""
+        CREATE TEMP TABLE postal_stage (
+            street_name NOT NULL,
+            house_number NOT NULL,
+            postal_code TEXT NOT NULL,
+            matched INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (street_name, house_number)
+        ) WITHOUT ROWID
+    """)
+    conn.executemany(
+        "INSERT OR IGNORE INTO postal_stage (street_name, house_number, postal_code) VALUES (?, ?, ?)",
+        zip(names.to_numpy(dtype=object),
+            valid["house_number"].to_numpy(dtype=object),
+            valid["postal_code"].to_numpy(dtype=object)),
+    )
+    return conn.execute("SELECT COUNT(*) FROM postal_stage").fetchone()[0]
+
+
+def write_unmatched_report(conn: sqlite3.Connection, path: str | Path) -> int:
+    """Écrit toutes les lignes non appariées de `postal_stage` en CSV. Retourne leur nombre."""
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_COLUMNS)
+        cur = conn.execute(
+            "SELECT house_number, street_name, postal_code FROM postal_stage "
+            "WHERE matched = 0 ORDER BY street_name, house_number"
+        )
+        for row in cur:
+            writer.writerow(tuple(row))
+            n += 1
+    return n
+
+
+def merge_postal_codes(conn: sqlite3.Connection, df: pd.DataFrame,
+                       report_path: str | Path | None = None, overwrite: bool = False) -> dict:
+    """
+    Fusionne les codes postaux d'un DataFrame normalisé dans `addresses`.
+    overwrite=False : seules les adresses sans code postal sont mises à jour.
+    Retourne {'staged', 'matched', 'unmatched', 'updated', 'seconds'}.
+    """
+    t0 = time.perf_counter()
+    cp_col = bulk_import.postal_column(conn)
+    if cp_col is None:
+        raise ValueError("La table addresses n'a pas de colonne code postal")
+
+    if conn.in_transaction:
+        conn.commit()
+    try:
+        conn.execute("BEGIN")
+        ensure_merge_index(conn)
+        staged = stage_postal_codes(conn, df)
+        conn.execute("""
+            UPDATE postal_stage SET matched = 1
+            WHERE EXISTS (
+                SELECT 1 FROM addresses a
+                WHERE TRIM(a.street_name) = postal_stage.street_name
+                  AND TRIM(a.house_number) = postal_stage.house_number
+            )
+        """)
+        only_empty = "" if overwrite else f"AND ({cp_col} IS NULL OR {cp_col} = '')"
+        cur = conn.execute(f"""
+            UPDATE addresses
+            SET {cp_col} = (
+                SELECT s.postal_code FROM postal_stage s
+                WHERE s.street_name = TRIM(addresses.street_name)
+                  AND s.house_number = TRIM(addresses.house_number)
+            )
+            WHERE EXISTS (
+                SELECT 1 FROM postal_stage s
+                WHERE s.street_name = TRIM(addresses.street_name)
+                  AND s.house_number = TRIM(addresses.house_number)
+            ) {only_empty}
+        """)
+        updated = cur.rowcount
+        matched = conn.execute("SELECT COUNT(*) FROM postal_stage WHERE matched = 1").fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    unmatched = staged - matched
+    if report_path is not None:
+        write_unmatched_report(conn, report_path)
+    return {
+        "staged": staged,
+        "matched": matched,
+        "unmatched": unmatched,
+        "updated": updated,
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def merge_postal_file(conn: sqlite3.Connection, path: str | Path,
+                      report_path: str | Path | None = None, overwrite: bool = False) -> dict:
+    """Lecture + normalisation (bulk_import) + fusion d'un fichier de codes postaux."""
+    df = bulk_import.normalize_civic_frame(bulk_import.read_civic_file(path))
+    return merge_postal_codes(conn, df, report_path=report_path, overwrite=overwrite)
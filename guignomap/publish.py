@@ -0,0 +1,229 @@
+"""
+Publication statique de la carte publique.
+
+L'état des rues (géométrie simplifiée + code statut) est écrit dans
+`static/public/streets.json`, servi tel quel par Streamlit
+(`server.enableStaticServing`, URL `/app/static/public/streets.json`) ; le
+navigateur le télécharge et le colore lui-même (map_layers.public_map). Les
+visiteurs de la page d'accueil ne touchent donc plus la base.
+
+- `summary.json` accompagne le GeoJSON : ETag (empreinte du contenu),
+  statistiques globales et date de génération ; l'URL de la carte porte l'ETag
+  (`?v=...`) et le serveur répond 304 aux requêtes conditionnelles ;
+- écriture atomique (fichier temporaire + os.replace), rien n'est réécrit si
+  l'ETag n'a pas changé ;
+- `PublicMapPublisher` regroupe les changements de statut : au plus une
+  publication toutes les `delay` secondes, par un thread de fond.
+"""
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from guignomap import db, geometry, map_layers, simplify
+from guignomap.db_pool import ConnectionPool
+
+_LOG = logging.getLogger("guignomap.publish")
+_LOG.addHandler(logging.NullHandler())
+
+PUBLIC_DIR = Path(__file__).parent / "static" / "public"
+STREETS_FILE = "streets.json"
+SUMMARY_FILE = "summary.json"
+
+# Carte d'accueil ouverte au zoom 12 : niveau fidèle jusqu'au zoom 13
+PUBLIC_TOLERANCE_M = simplify.tolerance_for_zoom(13)
+DEFAULT_DELAY_S = 10.0
+
+
+# --- Contenu ----------------------------------------------------------------------------
+
+def street_stats(conn: sqlite3.Connection) -> dict:
+    """Compteurs globaux des rues (mêmes clés que le tableau de bord), lus dans progress_counters."""
+    counts = db.progress_global(conn)
+    total, terminee, en_cours = counts["total"], counts["terminee"], counts["en_cours"]
+    unassigned = db.progress_for_team(conn, None)["total"]
+    return {
+        "total": total,
+        "terminee": terminee,
+        "en_cours": en_cours,
+        "a_faire": max(total - terminee - en_cours, 0),
+        "assignees": total - unassigned,
+        "non_assignees": unassigned,
+        "pourcentage": (terminee * 100.0 / total) if total else 0.0,
+    }
+
+
+def render_public_map(conn: sqlite3.Connection, tolerance_m: float = PUBLIC_TOLERANCE_M) -> tuple[bytes, dict]:
+    """(GeoJSON codé des rues en octets, statistiques)."""
+    lines = geometry.fetch_street_lines(conn, tolerance_m=tolerance_m)
+    geojson = map_layers.coded_streets_geojson(lines)
+    data = json.dumps(geojson, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return data, street_stats(conn)
+
+
+def _etag(data: bytes, stats: dict) -> str:
+    h = hashlib.sha1(data)
+    h.update(json.dumps(stats, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+# --- Publication --------------------------------------------------------------------------
+
+def publish_public_map(conn: sqlite3.Connection, out_dir: str | Path = PUBLIC_DIR,
+                       force: bool = False) -> dict:
+    """
+    Écrit streets.json puis summary.json si le contenu a changé.
+    Retourne {'changed', 'etag', 'bytes', 'streets', 'seconds'}.
+    """
+    t0 = time.perf_counter()
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    data, stats = render_public_map(conn)
+    etag = _etag(data, stats)
+    current = read_summary(out)
+    changed = force or current is None or current.get("etag") != etag
+    if changed:
+        summary = {
+            "etag": etag,
+            "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            "bytes": len(data),
+            "streets": stats["total"],
+            "stats": stats,
+        }
+        # GeoJSON d'abord : summary.json ne référence jamais un fichier pas encore écrit
+        _write_atomic(out / STREETS_FILE, data)
+        _write_atomic(out / SUMMARY_FILE, json.dumps(summary, ensure_ascii=False).encode("utf-8"))
+    return {"changed": changed, "etag": etag, "bytes": len(data), "streets": stats["total"],
+            "seconds": time.perf_counter() - t0}
+
+
+_summary_cache: dict[str, tuple[tuple[int, int], dict]] = {}
+_summary_lock = threading.Lock()
+
+
+def read_summary(out_dir: str | Path = PUBLIC_DIR) -> dict | None:
+    """summary.json publié, ou None. Relu seulement si le fichier a changé (mtime/taille)."""
+    path = Path(out_dir) / SUMMARY_FILE
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    key, sig = str(path), (st.st_mtime_ns, st.st_size)
+    with _summary_lock:
+        cached = _summary_cache.get(key)
+        if cached and cached[0] == sig:
+            return cached[1]
+    try:
+        summary = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not (Path(out_dir) / STREETS_FILE).exists():
+        return None
+    with _summary_lock:
+        _summary_cache[key] = (sig, summary)
+    return summary
+
+
+def public_map_url(summary: dict, base_url_path: str = "") -> str:
+    """URL du GeoJSON publié, versionnée par l'ETag (cache navigateur sûr)."""
+    base = f"/{base_url_path.strip('/')}" if base_url_path.strip("/") else ""
+    return f"{base}/app/static/public/{STREETS_FILE}?v={summary['etag']}"
+
+
+# --- Publication différée -----------------------------------------------------------------
+
+class PublicMapPublisher:
+    """
+    Republie la carte publique après des changements de statut, au plus une fois
+    toutes les `delay` secondes : `notify()` est immédiat, la publication se fait
+    dans un thread de fond (connexion de lecture du pool).
+    """
+
+    def __init__(self, pool: ConnectionPool, out_dir: str | Path = PUBLIC_DIR,
+                 delay: float = DEFAULT_DELAY_S):
+        self.pool = pool
+        self.out_dir = Path(out_dir)
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._dirty_since: float | None = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._stats = {"notifications": 0, "publications": 0, "unchanged": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="public-map-publisher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --- API -------------------------------------------------------------------------------
+
+    def notify(self) -> None:
+        """Signale un changement ; la publication suivra dans au plus `delay` secondes."""
+        with self._lock:
+            self._stats["notifications"] += 1
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+        self._wake.set()
+
+    def flush(self) -> dict | None:
+        """Publie immédiatement (dans le thread appelant)."""
+        with self._lock:
+            self._dirty_since = None
+        with self._publish_lock:
+            try:
+                result = publish_public_map(self.pool.reader(), self.out_dir)
+            except Exception:
+                with self._lock:
+                    self._stats["errors"] += 1
+                _LOG.warning("public map publication failed", exc_info=True)
+                return None
+        with self._lock:
+            self._stats["publications" if result["changed"] else "unchanged"] += 1
+        return result
+
+    def close(self) -> None:
+        """Arrête le thread de fond et publie un éventuel changement en attente (idempotent)."""
+        if not self._stop.is_set():
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout=5)
+            if self._dirty_since is not None:
+                self.flush()
+
+    def pending(self) -> bool:
+        return self._dirty_since is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        s["pending"] = self.pending()
+        return s
+
+    # --- Thread de fond ----------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                since = self._dirty_since
+            if since is None:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            remaining = since + self.delay - time.monotonic()
+            if remaining > 0:
+                self._stop.wait(remaining)
+                continue
+            self.flush()
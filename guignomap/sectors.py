@@ -0,0 +1,279 @@
+"""
+Découpage automatique des rues en secteurs équilibrés (NumPy).
+
+Chaque rue est un point (centroïde de ses adresses géocodées) pondéré par son
+nombre d'adresses. `balanced_kmeans` regroupe ces points en k secteurs compacts
+dont la charge (adresses à visiter) reste sous `(1 + tolerance) x` la moyenne :
+
+- initialisation k-means++ pondérée (graine fixe : même découpage à chaque appel) ;
+- affectation sous capacité : les rues qui ont le plus à perdre à ne pas aller
+  dans leur secteur le plus proche (écart entre 1er et 2e choix) sont placées
+  d'abord, chacune dans le secteur le plus proche qui a encore de la place ;
+- pénalité de distance par secteur, ajustée à chaque tour selon sa charge, pour
+  remplir aussi les secteurs trop légers ;
+- centres recalculés (moyenne pondérée), jusqu'à stabilité.
+
+`generate_sectors` écrit le résultat en un lot : secteurs créés (ou repris par
+nom) dans `sectors`, `streets.sector_id` mis à jour par executemany, secteurs
+vidés par un redécoupage supprimés, un commit. Sans redécoupage, les rues sans
+secteur rejoignent le secteur existant le plus proche plutôt que de former de
+nouveaux secteurs qui chevaucheraient les anciens. Les rues sans adresse
+géocodée ne sont pas placées.
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+_LOG = logging.getLogger("guignomap.sectors")
+_LOG.addHandler(logging.NullHandler())
+
+DEFAULT_TOLERANCE = 0.10
+DEFAULT_PREFIX = "Secteur"
+MAX_ITER = 30
+
+
+# --- Partition ------------------------------------------------------------------------------
+
+def _project(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Points (n, 2) à l'échelle métrique locale (longitude corrigée par cos(latitude))."""
+    scale = np.cos(np.radians(np.mean(lats)))
+    return np.column_stack((lats, lons * scale))
+
+
+def _squared_distances(pts: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    return ((pts[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+
+
+def _init_centers(pts: np.ndarray, weights: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ pondéré : chaque nouveau centre tiré avec une probabilité ∝ poids x distance²."""
+    centers = [pts[rng.choice(len(pts), p=weights / weights.sum())]]
+    for _ in range(1, k):
+        d2 = _squared_distances(pts, np.asarray(centers)).min(axis=1) * weights
+        total = d2.sum()
+        idx = rng.choice(len(pts), p=d2 / total) if total > 0 else int(rng.integers(len(pts)))
+        centers.append(pts[idx])
+    return np.asarray(centers)
+
+
+def _assign_with_capacity(d2: np.ndarray, weights: np.ndarray, capacity: float) -> np.ndarray:
+    """Chaque point va au secteur le plus proche qui a encore de la place (sinon au moins chargé)."""
+    n, k = d2.shape
+    prefs = np.argsort(d2, axis=1)
+    if k > 1:
+        nearest = np.take_along_axis(d2, prefs[:, :2], axis=1)
+        order = np.argsort(nearest[:, 0] - nearest[:, 1], kind="stable")
+    else:
+        order = np.arange(n)
+    load = np.zeros(k)
+    labels = np.empty(n, dtype=np.int64)
+    for i in order:
+        w = weights[i]
+        for j in prefs[i]:
+            if load[j] + w <= capacity:
+                break
+        else:
+            j = int(np.argmin(load))
+        labels[i] = j
+        load[j] += w
+    return labels
+
+
+def balanced_kmeans(lats, lons, weights, k: int, tolerance: float = DEFAULT_TOLERANCE,
+                    seed: int = 0, max_iter: int = MAX_ITER) -> np.ndarray:
+    """
+    Étiquette (0..k-1) de chaque point ; la charge de chaque groupe (somme des poids)
+    reste sous (1 + tolerance) x la charge moyenne quand les poids le permettent.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    n = len(lats)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    k = max(1, min(int(k), n))
+    # Une rue sans adresse compte pour une, pour rester dans un secteur
+    w = np.maximum(np.asarray(weights, dtype=float), 1.0)
+    pts = _project(lats, lons)
+    capacity = w.sum() / k * (1.0 + tolerance)
+
+    centers = _init_centers(pts, w, k, np.random.default_rng(seed))
+    penalty = np.zeros(k)
+    labels = np.full(n, -1, dtype=np.int64)
+    for _ in range(max_iter):
+        d2 = _squared_distances(pts, centers)
+        new_labels = _assign_with_capacity(d2 + penalty, w, capacity)
+        loads = np.bincount(new_labels, weights=w, minlength=k)
+        # Secteurs trop légers rapprochés, trop lourds éloignés (la capacité ne borne que le haut)
+        penalty += np.median(d2.min(axis=1)) * (loads / (w.sum() / k) - 1.0)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        filled = loads > 0
+        for axis in range(2):
+            centers[filled, axis] = np.bincount(labels, weights=w * pts[:, axis], minlength=k)[filled] / loads[filled]
+    return labels
+
+
+# --- Base de données ------------------------------------------------------------------------
+
+def _sector_column(conn: sqlite3.Connection) -> str | None:
+    """sector_id (schéma de l'app) ou sector (nom du secteur, schéma d'import_data.py)."""
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(streets)").fetchall()}
+    return next((c for c in ("sector_id", "sector") if c in cols), None)
+
+
+def load_street_points(conn: sqlite3.Connection) -> pd.DataFrame:
+    """
+    Rues avec leur secteur actuel (None si aucun), leur nombre d'adresses et le
+    centroïde de leurs adresses géocodées (lat/lon NaN si aucune). Lus dans les
+    colonnes tenues à jour sur streets (address_count, center_lat, center_lon) ;
+    agrégés depuis addresses pour une base qui ne les a pas encore.
+    """
+    column = _sector_column(conn)
+    sector = f"NULLIF(s.{column}, '')" if column else "NULL"
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(streets)").fetchall()}
+    if {"address_count", "center_lat", "center_lon"} <= cols:
+        return pd.read_sql_query(f"""
+            SELECT s.id, s.name, {sector} AS sector, s.address_count AS addresses,
+                   s.center_lat AS lat, s.center_lon AS lon
+            FROM streets s ORDER BY s.id
+        """, conn)
+    return pd.read_sql_query(f"""
+        SELECT s.id, s.name, {sector} AS sector, COUNT(a.id) AS addresses,
+               AVG(a.latitude) AS lat, AVG(a.longitude) AS lon
+        FROM streets s LEFT JOIN addresses a ON a.street_name = s.name
+        GROUP BY s.id ORDER BY s.id
+    """, conn)
+
+
+def _sector_ids(conn: sqlite3.Connection, names: list[str]) -> dict[str, int]:
+    conn.executemany("INSERT OR IGNORE INTO sectors (name) VALUES (?)", [(n,) for n in names])
+    rows = conn.execute(
+        f"SELECT name, id FROM sectors WHERE name IN ({','.join('?' * len(names))})", names
+    ).fetchall()
+    return {name: sid for name, sid in rows}
+
+
+def _sector_names(conn: sqlite3.Connection, column: str, values) -> dict:
+    """Nom de chaque secteur (valeur de la colonne de secteur -> nom)."""
+    if column != "sector_id":
+        return {v: v for v in values}
+    values = [int(v) for v in values]
+    if not values:
+        return {}
+    rows = conn.execute(
+        f"SELECT id, name FROM sectors WHERE id IN ({','.join('?' * len(values))})", values
+    ).fetchall()
+    return {sid: name for sid, name in rows}
+
+
+def _weighted_centers(df: pd.DataFrame, by: str) -> pd.DataFrame:
+    """Centroïde de chaque groupe, pondéré par le nombre d'adresses (au moins une par rue)."""
+    w = df["addresses"].clip(lower=1)
+    return (df.assign(_w=w, _wlat=df["lat"] * w, _wlon=df["lon"] * w)
+            .groupby(by)
+            .agg(streets=("id", "size"), addresses=("addresses", "sum"),
+                 _w=("_w", "sum"), _wlat=("_wlat", "sum"), _wlon=("_wlon", "sum"))
+            .assign(center_lat=lambda g: g["_wlat"] / g["_w"], center_lon=lambda g: g["_wlon"] / g["_w"])
+            .drop(columns=["_w", "_wlat", "_wlon"]))
+
+
+def _nearest_sector(located: pd.DataFrame, centers: pd.DataFrame) -> pd.Series:
+    """Secteur existant (index de centers) dont le centroïde est le plus proche de chaque rue."""
+    pts = _project(np.concatenate([located["lat"], centers["center_lat"]]),
+                   np.concatenate([located["lon"], centers["center_lon"]]))
+    d2 = _squared_distances(pts[:len(located)], pts[len(located):])
+    return pd.Series(centers.index.to_numpy()[d2.argmin(axis=1)], index=located.index)
+
+
+def generate_sectors(conn: sqlite3.Connection, k: int, overwrite: bool = False,
+                     tolerance: float = DEFAULT_TOLERANCE, prefix: str = DEFAULT_PREFIX,
+                     seed: int = 0, commit: bool = True) -> dict:
+    """
+    Découpe les rues en k secteurs équilibrés et les enregistre.
+
+    - overwrite=True : toutes les rues géocodées sont redécoupées ; les secteurs
+      nommés « <prefix> 1 » à « <prefix> k » du nord au sud (repris par nom s'ils
+      existent) et ceux qui se retrouvent vides sont supprimés.
+    - overwrite=False : seules les rues sans secteur sont placées, chacune dans le
+      secteur existant le plus proche (centroïde) ; k ne sert que s'il n'existe
+      encore aucun secteur géocodé.
+
+    Retourne {'sectors': [{id, name, streets, addresses, center_lat, center_lon}]
+    (rues placées par cet appel), 'assigned': nb de rues placées, 'unplaced': rues
+    sans adresse géocodée, 'removed': secteurs vides supprimés}.
+    """
+    column = _sector_column(conn)
+    if column is None:
+        raise ValueError("streets n'a pas de colonne de secteur (sector_id ou sector)")
+    df = load_street_points(conn)
+    if column == "sector_id":
+        df["sector"] = df["sector"].astype("Int64")
+    has_point = df["lat"].notna() & df["lon"].notna()
+    todo = df if overwrite else df[df["sector"].isna()]
+    located = todo[has_point[todo.index]].reset_index(drop=True)
+    unplaced = todo.loc[~has_point[todo.index], "name"].tolist()
+    if located.empty or k < 1:
+        return {"sectors": [], "assigned": 0, "unplaced": unplaced, "removed": []}
+
+    existing = df[has_point & df["sector"].notna()] if not overwrite else df.iloc[0:0]
+    if not existing.empty:
+        # Compléter le découpage existant sans créer de secteur qui le chevauche
+        centers = _weighted_centers(existing, "sector")
+        located["value"] = _nearest_sector(located, centers)
+        summary = (_weighted_centers(located, "value")[["streets", "addresses"]]
+                   .join(centers[["center_lat", "center_lon"]]))
+        summary["name"] = summary.index.map(_sector_names(conn, column, summary.index))
+        summary["id"] = summary.index if column == "sector_id" else None
+        summary = summary.sort_values(["center_lat", "center_lon"], ascending=[False, True])
+    else:
+        located["label"] = balanced_kmeans(located["lat"], located["lon"], located["addresses"], k,
+                                           tolerance=tolerance, seed=seed)
+        summary = (_weighted_centers(located, "label")
+                   .sort_values(["center_lat", "center_lon"], ascending=[False, True]))
+        summary["name"] = [f"{prefix} {i}" for i in range(1, len(summary) + 1)]
+        summary["id"] = None
+
+    previous = {int(v) for v in todo["sector"].dropna()} if overwrite and column == "sector_id" else set()
+    removed = []
+    try:
+        if "label" in located:
+            if column == "sector_id":
+                ids = _sector_ids(conn, summary["name"].tolist())
+                summary["id"] = summary["name"].map(ids)
+                values = summary["id"]
+            else:
+                # Schéma d'import_data.py : le nom du secteur est stocké sur la rue
+                values = summary["name"]
+            located["value"] = located["label"].map(values)
+        targets = [int(v) if column == "sector_id" else v for v in located["value"]]
+        conn.executemany(
+            f"UPDATE streets SET {column} = ? WHERE id = ?",
+            list(zip(targets, located["id"].tolist())),
+        )
+        # Secteurs vidés par le redécoupage (k plus petit qu'avant, anciens noms)
+        for sid in sorted(previous - {int(v) for v in summary["id"].dropna()}):
+            name = conn.execute("""
+                DELETE FROM sectors WHERE id = ? AND NOT EXISTS (SELECT 1 FROM streets WHERE sector_id = ?)
+                RETURNING name
+            """, (sid, sid)).fetchone()
+            if name:
+                removed.append(name[0])
+        if commit:
+            conn.commit()
+    except sqlite3.Error:
+        if commit:
+            conn.rollback()
+        raise
+
+    _LOG.info("%d streets placed into %d sectors (%d unplaced, %d empty sectors removed)",
+              len(located), len(summary), len(unplaced), len(removed))
+    sectors = [
+        {"id": None if pd.isna(r.id) else int(r.id), "name": r.name, "streets": int(r.streets),
+         "addresses": int(r.addresses), "center_lat": float(r.center_lat), "center_lon": float(r.center_lon)}
+        for r in summary.itertuples()
+    ]
+    return {"sectors": sectors, "assigned": len(located), "unplaced": unplaced, "removed": removed}
@@ -0,0 +1,87 @@
+"""
+Simplification des lignes de rues (Douglas–Peucker, NumPy) à plusieurs niveaux.
+
+Les polylignes de street_geometry ont un sommet par adresse civique ; à
+l'échelle de la ville la plupart sont invisibles. On précalcule, pour chaque
+rue, une version simplifiée par tolérance de `LOD_TOLERANCES_M` (en mètres,
+projection locale : longitude mise à l'échelle par cos(latitude)). Les cartes
+choisissent le niveau selon le zoom (`tolerance_for_zoom`) : environ un pixel
+d'écart au plus.
+"""
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+# Tolérances précalculées (m) ; 0 = géométrie complète
+LOD_TOLERANCES_M = (3.0, 8.0, 20.0, 40.0)
+
+_M_PER_DEG_LAT = 111_320.0
+# Mètres par pixel au zoom 0 à l'équateur (tuiles 256 px, Web Mercator)
+_M_PER_PX_Z0 = 156_543.03
+
+
+def _project(pts: np.ndarray) -> np.ndarray:
+    """[[lat, lon], ...] -> coordonnées planes en mètres autour de la latitude moyenne."""
+    lat0 = math.radians(float(pts[:, 0].mean()))
+    return np.column_stack((pts[:, 0] * _M_PER_DEG_LAT, pts[:, 1] * _M_PER_DEG_LAT * math.cos(lat0)))
+
+
+def douglas_peucker_mask(xy: np.ndarray, tolerance: float) -> np.ndarray:
+    """Masque des sommets gardés (extrémités toujours gardées). Itératif, sans récursion."""
+    n = len(xy)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    if n < 3 or tolerance <= 0:
+        keep[:] = True
+        return keep
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        a, b = xy[i], xy[j]
+        seg = b - a
+        pts = xy[i + 1:j]
+        seg_len2 = float(seg @ seg)
+        if seg_len2 == 0.0:
+            d = np.hypot(*(pts - a).T)
+        else:
+            # Distance au segment [a, b] (projection bornée)
+            t = np.clip(((pts - a) @ seg) / seg_len2, 0.0, 1.0)
+            d = np.hypot(*(pts - (a + t[:, None] * seg)).T)
+        k = int(np.argmax(d))
+        if d[k] > tolerance:
+            m = i + 1 + k
+            keep[m] = True
+            stack.append((i, m))
+            stack.append((m, j))
+    return keep
+
+
+def simplify_line(pts, tolerance_m: float) -> np.ndarray:
+    """Polyligne [[lat, lon], ...] simplifiée à tolerance_m mètres."""
+    pts = np.asarray(pts, dtype=float)
+    if len(pts) < 3 or tolerance_m <= 0:
+        return pts
+    return pts[douglas_peucker_mask(_project(pts), tolerance_m)]
+
+
+def simplify_levels(pts, tolerances=LOD_TOLERANCES_M) -> dict[float, np.ndarray]:
+    """{tolérance: polyligne simplifiée} pour chaque niveau (projection calculée une fois)."""
+    pts = np.asarray(pts, dtype=float)
+    if len(pts) < 3:
+        return {t: pts for t in tolerances}
+    xy = _project(pts)
+    return {t: pts[douglas_peucker_mask(xy, t)] for t in tolerances}
+
+
+def tolerance_for_zoom(zoom: int | float, lat: float = 45.75,
+                       tolerances=LOD_TOLERANCES_M) -> float:
+    """Plus grande tolérance précalculée qui reste sous un pixel au zoom donné (0 = complète)."""
+    m_per_px = _M_PER_PX_Z0 * math.cos(math.radians(lat)) / (2 ** float(zoom))
+    usable = [t for t in tolerances if t <= m_per_px]
+    return max(usable) if usable else 0.0
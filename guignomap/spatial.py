@@ -0,0 +1,215 @@
+"""
+Index spatial des adresses géocodées.
+
+Table virtuelle R*Tree `addresses_rtree` (id = addresses.id, boîte réduite au
+point), tenue à jour par des triggers sur `addresses`. Requêtes :
+- `points_in_bbox` : adresses visibles dans une fenêtre de carte ;
+- `nearest_addresses` : N adresses les plus proches d'une position GPS
+  (fenêtre élargie jusqu'à contenir N candidats, puis distances exactes) ;
+- `streets_within_radius` : rues ayant au moins une adresse dans un rayon
+  (onglet « Près de moi » des bénévoles, à partir de `address_location`).
+
+Si SQLite est compilé sans R*Tree, les mêmes fonctions passent par un index
+B-tree sur (latitude, longitude) : plus lent, mêmes résultats.
+"""
+from __future__ import annotations
+
+import math
+import sqlite3
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_000.0
+_M_PER_DEG_LAT = 111_320.0
+
+
+def rtree_available(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._rtree_probe USING rtree(id, a, b)")
+        conn.execute("DROP TABLE temp._rtree_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _has_rtree(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'addresses_rtree'"
+    ).fetchone() is not None
+
+
+# --- Schéma -----------------------------------------------------------------------------
+
+def init_spatial_schema(conn: sqlite3.Connection) -> bool:
+    """
+    Crée l'index R*Tree et ses triggers (idempotent), et le remplit s'il est vide
+    alors que des adresses sont géocodées, ou s'il n'était plus tenu à jour (addresses
+    recréée sans ses triggers). Retourne False si R*Tree est indisponible
+    (index B-tree de repli créé à la place).
+    """
+    if not rtree_available(conn):
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_addresses_lat_lon ON addresses(latitude, longitude)")
+        conn.commit()
+        return False
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS addresses_rtree
+        USING rtree(id, min_lat, max_lat, min_lon, max_lon)
+    """)
+    untracked = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_addresses_rtree_insert'"
+    ).fetchone() is None
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_addresses_rtree_insert
+        AFTER INSERT ON addresses
+        WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO addresses_rtree VALUES
+                (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_addresses_rtree_update
+        AFTER UPDATE OF latitude, longitude ON addresses
+        BEGIN
+            DELETE FROM addresses_rtree WHERE id = OLD.id;
+            INSERT INTO addresses_rtree
+                SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+                WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_addresses_rtree_delete
+        AFTER DELETE ON addresses
+        BEGIN
+            DELETE FROM addresses_rtree WHERE id = OLD.id;
+        END
+    """)
+    if untracked or conn.execute("SELECT COUNT(*) FROM addresses_rtree").fetchone()[0] == 0:
+        rebuild_spatial_index(conn)
+    conn.commit()
+    return True
+
+
+def rebuild_spatial_index(conn: sqlite3.Connection) -> int:
+    """Reconstruit entièrement l'index R*Tree depuis addresses. Retourne le nombre de points."""
+    with conn:
+        conn.execute("DELETE FROM addresses_rtree")
+        conn.execute("""
+            INSERT INTO addresses_rtree
+            SELECT id, latitude, latitude, longitude, longitude
+            FROM addresses
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        """)
+    return conn.execute("SELECT COUNT(*) FROM addresses_rtree").fetchone()[0]
+
+
+# --- Géométrie --------------------------------------------------------------------------
+
+def haversine_m(lat, lon, lats, lons) -> np.ndarray:
+    """Distance en mètres entre (lat, lon) et des tableaux de points."""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lons, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def bbox_around(lat: float, lon: float, radius_m: float) -> tuple[float, float, float, float]:
+    """(sud, ouest, nord, est) englobant un cercle de radius_m autour du point."""
+    dlat = radius_m / _M_PER_DEG_LAT
+    dlon = radius_m / (_M_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+# --- Requêtes ---------------------------------------------------------------------------
+
+def points_in_bbox(conn: sqlite3.Connection, south: float, west: float, north: float, east: float,
+                   limit: int | None = None) -> list[tuple]:
+    """Adresses dans la boîte : [(id, street_name, house_number, lat, lon)]."""
+    if _has_rtree(conn):
+        sql = """
+            SELECT a.id, a.street_name, a.house_number, a.latitude, a.longitude
+            FROM addresses_rtree r
+            JOIN addresses a ON a.id = r.id
+            WHERE r.min_lat >= ? AND r.max_lat <= ? AND r.min_lon >= ? AND r.max_lon <= ?
+        """
+    else:
+        sql = """
+            SELECT id, street_name, house_number, latitude, longitude
+            FROM addresses
+            WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+        """
+    params: list = [south, north, west, east]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return [tuple(r) for r in conn.execute(sql, params).fetchall()]
+
+
+def count_in_bbox(conn: sqlite3.Connection, south: float, west: float, north: float, east: float) -> int:
+    if _has_rtree(conn):
+        sql = ("SELECT COUNT(*) FROM addresses_rtree "
+               "WHERE min_lat >= ? AND max_lat <= ? AND min_lon >= ? AND max_lon <= ?")
+    else:
+        sql = "SELECT COUNT(*) FROM addresses WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?"
+    return conn.execute(sql, (south, north, west, east)).fetchone()[0]
+
+
+def _candidates_within(conn: sqlite3.Connection, lat: float, lon: float, radius_m: float):
+    rows = points_in_bbox(conn, *bbox_around(lat, lon, radius_m))
+    if not rows:
+        return rows, np.empty(0)
+    d = haversine_m(lat, lon, [r[3] for r in rows], [r[4] for r in rows])
+    return rows, d
+
+
+def nearest_addresses(conn: sqlite3.Connection, lat: float, lon: float, n: int = 10,
+                      start_radius_m: float = 100.0, max_radius_m: float = 5000.0) -> list[tuple]:
+    """
+    Les n adresses les plus proches : [(id, street_name, house_number, lat, lon, distance_m)].
+    La fenêtre double tant que le n-ième candidat n'est pas garanti (distance <= rayon).
+    """
+    radius = start_radius_m
+    while True:
+        rows, d = _candidates_within(conn, lat, lon, radius)
+        inside = np.flatnonzero(d <= radius)
+        if len(inside) >= n or radius >= max_radius_m:
+            best = inside[np.argsort(d[inside], kind="stable")[:n]]
+            return [(*rows[i], float(d[i])) for i in best]
+        radius = min(radius * 2, max_radius_m)
+
+
+def streets_within_radius(conn: sqlite3.Connection, lat: float, lon: float,
+                          radius_m: float) -> list[tuple[str, float, int]]:
+    """Rues ayant des adresses dans le rayon : [(rue, distance min en m, nb d'adresses)], les plus proches d'abord."""
+    rows, d = _candidates_within(conn, lat, lon, radius_m)
+    streets: dict[str, list] = {}
+    for row, dist in zip(rows, d):
+        if dist > radius_m:
+            continue
+        entry = streets.setdefault(row[1], [dist, 0])
+        entry[0] = min(entry[0], dist)
+        entry[1] += 1
+    return sorted(((s, float(v[0]), v[1]) for s, v in streets.items()), key=lambda t: t[1])
+
+
+def address_location(conn: sqlite3.Connection, street_name: str, house_number: str | None = None) -> tuple[float, float] | None:
+    """
+    Position (lat, lon) d'une adresse ; sans numéro (ou numéro inconnu), centre des
+    adresses géocodées de la rue. None si rien n'est géocodé.
+    """
+    number = (house_number or "").strip()
+    if number:
+        row = conn.execute("""
+            SELECT latitude, longitude FROM addresses
+            WHERE street_name = ? AND house_number = ? AND latitude IS NOT NULL AND longitude IS NOT NULL
+            LIMIT 1
+        """, (street_name, number)).fetchone()
+        if row:
+            return float(row[0]), float(row[1])
+    row = conn.execute("""
+        SELECT AVG(latitude), AVG(longitude) FROM addresses
+        WHERE street_name = ? AND latitude IS NOT NULL AND longitude IS NOT NULL
+    """, (street_name,)).fetchone()
+    if row is None or row[0] is None:
+        return None
+    return float(row[0]), float(row[1])
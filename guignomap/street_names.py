@@ -0,0 +1,161 @@
+"""
+Normalisation des noms de rues et index de correspondance canonique.
+
+Les mêmes rues arrivent sous plusieurs graphies : « Avenue de l'Étang » (nomrue /
+Nomrue), « 974 AV DE L ETANG » (join_key des fichiers nocivique_*_cp), extrait OSM,
+accents abîmés par un mauvais décodage (« Ã‰tang »). Une seule clé pour toutes :
+
+- `fold` : réparation du double encodage UTF-8/Latin-1, accents retirés, majuscules,
+  ponctuation -> espace ;
+- `street_key` : `fold` + types génériques abrégés ramenés au mot complet
+  (vocabulaire OdoGener : AV -> AVENUE, CH -> CHEMIN, MTEE -> MONTEE...), ST/STE ->
+  SAINT/SAINTE, ordinaux ramenés au nombre (1re, 1e -> 1), particules de liaison (OdoParti : de, des, de la, du, de l', d')
+  ignorées ;
+- `StreetNameIndex` : dictionnaire clé -> nom officiel, construit une fois (table
+  streets ou fichier officiel) ; chaque recherche est une normalisation plus un
+  accès au dictionnaire, sans balayage approximatif des noms connus.
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+import unicodedata
+from collections.abc import Iterable
+
+import pandas as pd
+
+# Types génériques (valeurs de OdoGener) et leurs abréviations rencontrées
+GENERIC_TYPES = {
+    "RUE": (),
+    "AVENUE": ("AV", "AVE"),
+    "CHEMIN": ("CH",),
+    "PLACE": ("PL",),
+    "CROISSANT": ("CR", "CRS", "CRESCENT"),
+    "MONTEE": ("MTEE", "MT", "MNT"),
+    "BOULEVARD": ("BOUL", "BD"),
+    "TERRASSE": ("TSSE",),
+}
+SAINT_ABBREVIATIONS = {"ST": "SAINT", "STE": "SAINTE"}
+# Particules de liaison (valeurs de OdoParti, découpées en mots) + articles seuls
+PARTICLES = frozenset({"DE", "DES", "DU", "LA", "LE", "LES", "L", "D"})
+
+ABBREVIATIONS = {abbr: full for full, abbrs in GENERIC_TYPES.items() for abbr in abbrs}
+ABBREVIATIONS.update(SAINT_ABBREVIATIONS)
+
+# Séquences typiques d'un texte UTF-8 relu en Latin-1 / cp1252 (« Ã© », « Ã‰ », « Â »)
+_MOJIBAKE = re.compile(r"[ÂÃ][^\x00-\x7f]")
+_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+_ORDINAL = re.compile(r"^(\d+)(?:E|ER|RE|EME)$")
+_JOIN_KEY = re.compile(r"^\s*(\d+[A-Z]?)\s+(.+)$")
+
+
+# --- Normalisation --------------------------------------------------------------------------
+
+def repair_mojibake(text: str) -> str:
+    """'Ã‰tang' -> 'Étang' ; texte inchangé s'il ne ressemble pas à un double encodage."""
+    if not _MOJIBAKE.search(text):
+        return text
+    for encoding in ("cp1252", "latin-1"):
+        try:
+            return text.encode(encoding).decode("utf-8")
+        except UnicodeError:
+            continue
+    return text
+
+
+def fold(text) -> str:
+    """'Rue  de l'Étang ' -> 'RUE DE L ETANG' (accents, casse, ponctuation ignorés)."""
+    text = unicodedata.normalize("NFKD", repair_mojibake(str(text)))
+    text = "".join(c for c in text if not unicodedata.combining(c)).upper()
+    return " ".join(_NON_ALNUM.sub(" ", text).split())
+
+
+def street_key(name) -> str:
+    """'Avenue de l'Étang' / 'AV DE L ETANG' -> 'AVENUE ETANG' ; '' si vide ou manquant."""
+    if name is None or name is pd.NA or (isinstance(name, float) and name != name):
+        return ""
+    # Ordinaux : '1re', '1er', '1e' -> '1'
+    tokens = [_ORDINAL.sub(r"\1", ABBREVIATIONS.get(t, t)) for t in fold(name).split()]
+    return " ".join(t for t in tokens if t not in PARTICLES)
+
+
+def street_keys(names: pd.Series) -> pd.Series:
+    """street_key vectorisé : chaque nom distinct n'est normalisé qu'une fois."""
+    values = names.astype("string").fillna("")
+    mapping = {u: street_key(u) for u in pd.unique(values)}
+    return values.map(mapping)
+
+
+def split_join_key(join_key) -> tuple[str, str] | None:
+    """'974 AV ST-DENIS' -> ('974', 'AVENUE SAINT DENIS') ; None si la forme n'est pas reconnue."""
+    if join_key is None or join_key is pd.NA or (isinstance(join_key, float) and join_key != join_key):
+        return None
+    m = _JOIN_KEY.match(fold(join_key))
+    if not m:
+        return None
+    return m.group(1), street_key(m.group(2))
+
+
+# --- Index ----------------------------------------------------------------------------------
+
+class StreetNameIndex:
+    """
+    Clé normalisée -> nom officiel. Le premier nom ajouté pour une clé l'emporte ;
+    les autres graphies officielles de même clé sont gardées dans `collisions`.
+    """
+
+    def __init__(self, names: Iterable = ()):
+        self.by_key: dict[str, str] = {}
+        self.collisions: dict[str, set[str]] = {}
+        self.add_many(names)
+
+    @classmethod
+    def from_conn(cls, conn: sqlite3.Connection) -> "StreetNameIndex":
+        """Index des noms de la table streets."""
+        try:
+            rows = conn.execute("SELECT name FROM streets ORDER BY id").fetchall()
+        except sqlite3.OperationalError:
+            rows = []
+        return cls(r[0] for r in rows)
+
+    def _insert(self, key: str, name: str) -> None:
+        if key:
+            current = self.by_key.setdefault(key, name)
+            if current != name:
+                self.collisions.setdefault(key, {current}).add(name)
+
+    def add(self, name) -> str:
+        """Ajoute un nom ; retourne sa clé ('' si vide)."""
+        key = street_key(name)
+        self._insert(key, name)
+        return key
+
+    def add_many(self, names: Iterable) -> None:
+        names = pd.Series(list(names), dtype="string")
+        for key, name in zip(street_keys(names), names):
+            self._insert(key, name)
+
+    def lookup(self, name) -> str | None:
+        """Nom officiel correspondant à une graphie quelconque, ou None."""
+        return self.by_key.get(street_key(name))
+
+    def lookup_join_key(self, join_key) -> tuple[str, str] | None:
+        """'974 AV ST-DENIS' -> ('974', 'Avenue Saint-Denis') ou None."""
+        parts = split_join_key(join_key)
+        if parts is None or parts[1] not in self.by_key:
+            return None
+        return parts[0], self.by_key[parts[1]]
+
+    def canonicalize(self, names: pd.Series, keep_unknown: bool = True) -> pd.Series:
+        """Noms officiels d'une série ; noms inconnus gardés tels quels (ou NA)."""
+        keys = street_keys(names)
+        out = keys.map(self.by_key).astype("string")
+        if keep_unknown:
+            out = out.fillna(names.astype("string"))
+        return out
+
+    def __contains__(self, name) -> bool:
+        return street_key(name) in self.by_key
+
+    def __len__(self) -> int:
+        return len(self.by_key)
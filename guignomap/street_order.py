@@ -0,0 +1,103 @@
+"""
+Ordonnancement vectorisé des points d'adresses le long des rues (NumPy).
+
+Deux modes :
+- "angle" : tri par angle autour du centroïde de la rue, toutes les rues en
+  une passe (centroïdes par bincount, angles en tableau, un seul lexsort) ;
+- "chain" : chaîne du plus proche voisin depuis l'extrémité la plus éloignée
+  du centroïde, plus réaliste pour les rues longues ou courbes.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+MODES = ("angle", "chain")
+DEFAULT_MODE = "chain"
+
+
+def _group_codes(streets) -> tuple[np.ndarray, np.ndarray]:
+    """Codes entiers par rue (ordre de première apparition) + libellés."""
+    codes, labels = pd.factorize(pd.Series(streets), sort=False)
+    return codes.astype(np.int64), np.asarray(labels, dtype=object)
+
+
+def _centroids(codes: np.ndarray, lats: np.ndarray, lons: np.ndarray, n_groups: int):
+    counts = np.bincount(codes, minlength=n_groups)
+    cx = np.bincount(codes, weights=lats, minlength=n_groups) / counts
+    cy = np.bincount(codes, weights=lons, minlength=n_groups) / counts
+    return cx, cy
+
+
+def angle_order(codes: np.ndarray, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Indices qui trient tous les points par (rue, angle autour du centroïde)."""
+    n_groups = int(codes.max()) + 1 if len(codes) else 0
+    cx, cy = _centroids(codes, lats, lons, n_groups)
+    ang = np.arctan2(lats - cx[codes], lons - cy[codes])
+    return np.lexsort((ang, codes))
+
+
+def _chain(pts: np.ndarray) -> np.ndarray:
+    """Chaîne du plus proche voisin sur un tableau (n, 2) déjà mis à l'échelle."""
+    n = len(pts)
+    if n < 3:
+        return np.arange(n)
+    centre = pts.mean(axis=0)
+    current = int(np.argmax(((pts - centre) ** 2).sum(axis=1)))
+    visited = np.zeros(n, dtype=bool)
+    order = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        order[i] = current
+        visited[current] = True
+        if i == n - 1:
+            break
+        d = ((pts - pts[current]) ** 2).sum(axis=1)
+        d[visited] = np.inf
+        current = int(np.argmin(d))
+    return order
+
+
+def chain_order(codes: np.ndarray, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Indices qui regroupent les points par rue puis les chaînent au plus proche voisin."""
+    if not len(codes):
+        return np.empty(0, dtype=np.int64)
+    # Longitude ramenée à l'échelle métrique locale pour des distances cohérentes
+    scale = np.cos(np.radians(np.nanmean(lats)))
+    pts = np.column_stack((lats, lons * scale))
+    by_group = np.argsort(codes, kind="stable")
+    bounds = np.flatnonzero(np.diff(codes[by_group])) + 1
+    parts = [idx[_chain(pts[idx])] for idx in np.split(by_group, bounds)]
+    return np.concatenate(parts)
+
+
+def order_points(streets, lats, lons, mode: str = DEFAULT_MODE) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Ordonne tous les points en une fois.
+    Retourne (order, codes, labels) : `order` indexe les entrées dans l'ordre de tracé,
+    `codes[order]` est groupé par rue et `labels[code]` donne le nom de la rue.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Mode d'ordonnancement inconnu: {mode}")
+    codes, labels = _group_codes(streets)
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    fn = angle_order if mode == "angle" else chain_order
+    return fn(codes, lats, lons), codes, labels
+
+
+def ordered_lines(df: pd.DataFrame, mode: str = DEFAULT_MODE,
+                  street_col: str = "rue", lat_col: str = "lat", lon_col: str = "lon") -> dict[str, np.ndarray]:
+    """
+    {rue: tableau (n, 2) [[lat, lon], ...] ordonné} pour toutes les rues du DataFrame.
+    Les lignes sans coordonnées sont ignorées.
+    """
+    df = df.dropna(subset=[lat_col, lon_col])
+    if df.empty:
+        return {}
+    order, codes, labels = order_points(df[street_col].to_numpy(), df[lat_col].to_numpy(),
+                                        df[lon_col].to_numpy(), mode)
+    coords = np.column_stack((df[lat_col].to_numpy(dtype=float), df[lon_col].to_numpy(dtype=float)))[order]
+    sorted_codes = codes[order]
+    bounds = np.flatnonzero(np.diff(sorted_codes)) + 1
+    starts = np.concatenate(([0], bounds))
+    return {labels[sorted_codes[s]]: part for s, part in zip(starts, np.split(coords, bounds))}
@@ -6,6 +6,7 @@ Protection contre injections et validation des formats
 
 import re
 import html
+import unicodedata
 from typing import Optional, Tuple
 
 class InputValidator:
@@ -28,6 +29,8 @@ class InputValidator:
         """Valide et nettoie un nom de rue"""
         if not name:
             return ""
+        # Accents composés (NFC) et apostrophe typographique ramenés à la forme en base
+        name = unicodedata.normalize("NFC", name).replace("\u2019", "'")
         # Garder seulement lettres, chiffres, espaces, tirets, apostrophes, accents
         name = re.sub(r'[^a-zA-ZÀ-ÿ0-9\s\-\'\.]', '', name)
         return name[:100].strip()
@@ -1,19 +1,19 @@
 import sqlite3
+import numpy as np
 import pandas as pd
-from pathlib import Path
 
-# Fichier à importer
-excel_file = Path("import/nocivique_avec_cp.xlsx")
-if not excel_file.exists():
-    print("ERREUR : nocivique_avec_cp34.xlsx non trouvé!")
+from guignomap import bulk_import, migrations
+
+# Fichier à importer (csv de préférence, sinon xlsx)
+civic_file = bulk_import.find_civic_file("nocivique_avec_cp")
+if civic_file is None:
+    print("ERREUR : import/nocivique_avec_cp.csv|xlsx non trouvé!")
     exit(1)
 
-print(f"Lecture de {excel_file}...")
-df = pd.read_excel(excel_file)
+print(f"Lecture de {civic_file}...")
+df = bulk_import.normalize_civic_frame(bulk_import.read_civic_file(civic_file))
 print(f"✓ {len(df)} lignes lues")
 
-# Afficher les colonnes pour debug
-print(f"Colonnes disponibles : {list(df.columns)}")
 print("\nÉchantillon :")
 print(df.head(3))
 
@@ -52,52 +52,25 @@ CREATE TABLE IF NOT EXISTS teams (
 );
 """)
 
-# Extraire les rues uniques
-rues = df.groupby('rue').first().reset_index() if 'rue' in df.columns else df.groupby(df.columns[0]).first().reset_index()
-print(f"\n✓ {len(rues)} rues uniques trouvées")
-
-# Importer les rues
-for _, row in rues.iterrows():
-    rue_name = row.iloc[0]  # Première colonne = nom de rue
-    # Déterminer secteur par code postal si disponible
-    sector = "Centre"  # Par défaut
-    if 'code_postal' in row and pd.notna(row['code_postal']):
-        cp = str(row['code_postal'])
-        if cp.startswith('J7K'):
-            sector = "Centre"
-        elif cp.startswith('J7L'):
-            sector = "Nord"
-        else:
-            sector = "Est"
-    
-    cursor.execute(
-        "INSERT OR IGNORE INTO streets (name, sector, team, status) VALUES (?, ?, '', 'a_faire')",
-        (rue_name, sector)
-    )
-
-# Importer les adresses
-for idx, (row_idx, row) in enumerate(df.iterrows()):
-    street = row.iloc[0] if pd.notna(row.iloc[0]) else ""
-    number = str(row.iloc[1]) if len(row) > 1 and pd.notna(row.iloc[1]) else ""
-    # Chercher lat/lon dans les colonnes
-    lat = None
-    lon = None
-    postal = None
-    for col in df.columns:
-        if 'lat' in col.lower() and pd.notna(row[col]):
-            lat = float(row[col])
-        elif 'lon' in col.lower() and pd.notna(row[col]):
-            lon = float(row[col])
-        elif 'code' in col.lower() or 'postal' in col.lower():
-            postal = str(row[col]) if pd.notna(row[col]) else None
-    cursor.execute(
-        "INSERT INTO addresses (street_name, house_number, latitude, longitude, postal_code) VALUES (?, ?, ?, ?, ?)",
-        (street, number, lat, lon, postal)
+# Importer rues + adresses en une transaction (index recréés après le chargement)
+report = bulk_import.bulk_load(conn, df, replace=False, osm_type=None)
+print(f"\n✓ {report['streets']} rues uniques, {report['addresses']} adresses "
+      f"en {report['seconds']:.2f} s ({report['rows_per_s']:.0f} lignes/s)")
+
+# Déterminer le secteur de chaque rue par son premier code postal connu
+first_cp = df.dropna(subset=["postal_code"]).groupby("street_name", sort=False)["postal_code"].first()
+sectors = pd.Series("Centre", index=pd.unique(df["street_name"]))
+cp = first_cp.reindex(sectors.index)
+sectors[:] = np.select(
+    [cp.str.startswith("J7K").fillna(False), cp.str.startswith("J7L").fillna(False), cp.notna()],
+    ["Centre", "Nord", "Est"],
+    default="Centre",
+)
+with conn:
+    conn.executemany(
+        "UPDATE streets SET sector = ?, team = '' WHERE name = ?",
+        list(zip(sectors.to_numpy(), sectors.index)),
     )
-    if idx % 1000 == 0:
-        print(f"... {idx}/{len(df)} adresses")
-
-conn.commit()
 
 # Vérifier l'import
 streets_count = cursor.execute("SELECT COUNT(*) FROM streets").fetchone()[0]
@@ -114,6 +87,11 @@ cursor.execute(
     "INSERT OR IGNORE INTO teams (id, name, password_hash, active) VALUES ('ADMIN', 'Administrateur', '$2b$12$YourHashHere', 1)"
 )
 conn.commit()
+
+# streets / addresses recréées : colonnes, triggers et données dérivées des migrations
+reapplied = migrations.migrate(conn)
+if reapplied:
+    print(f"✓ Migrations réappliquées : {', '.join(map(str, reapplied))}")
 conn.close()
 
 print("\n✓ Base de données prête!")
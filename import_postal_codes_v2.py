@@ -1,77 +1,50 @@
 import sqlite3
-import pandas as pd
-from pathlib import Path
 
-# Lire le fichier Excel
-print("📖 Lecture du fichier Excel...")
-df = pd.read_excel("import/nocivique_cp_complement.xlsx")
-print(f"✓ {len(df)} lignes lues")
+from guignomap import bulk_import, postal_merge
 
-# Filtrer seulement les codes postaux valides
-df_valid = df[
-    df['code_postal_trouve'].notna() & \
-    (df['code_postal_trouve'] != 'NON TROUVÉ') & \
-    (df['code_postal_trouve'] != 'ERREUR')
-].copy()
+REPORT_FILE = "non_matched_addresses.csv"
 
-print(f"✓ {len(df_valid)} codes postaux valides à importer")
+# Lire le fichier (csv de préférence, sinon xlsx)
+source = bulk_import.find_civic_file("nocivique_cp_complement")
+if source is None:
+    print("ERREUR : import/nocivique_cp_complement.csv|xlsx non trouvé!")
+    exit(1)
+print(f"📖 Lecture de {source}...")
+df = bulk_import.normalize_civic_frame(bulk_import.read_civic_file(source))
+print(f"✓ {len(df)} lignes lues")
+print(f"✓ {int(df['postal_code'].notna().sum())} codes postaux valides à importer")
 
 # Connexion DB
 conn = sqlite3.connect("guignomap/guigno_map.db")
 cursor = conn.cursor()
+cp_col = bulk_import.postal_column(conn)
 
 # Stats avant
-cursor.execute("SELECT COUNT(*) FROM addresses WHERE postal_code IS NOT NULL AND postal_code != ''")
+cursor.execute(f"SELECT COUNT(*) FROM addresses WHERE {cp_col} IS NOT NULL AND {cp_col} != ''")
 before = cursor.fetchone()[0]
 print(f"\n📊 Avant import: {before} adresses avec code postal dans la DB")
 
-# Import par batch pour performance
-updated = 0
-not_matched = []
-
+# Fusion ensembliste : table temporaire + jointure indexée, une seule mise à jour
 print("\n🔄 Import en cours...")
-for idx, row in enumerate(df_valid.itertuples(index=False), 1):
-    street_name = str(row.nomrue).strip()
-    house_number = str(row.NoCiv).strip()
-    postal_code = str(row.code_postal_trouve).strip().upper()
-    
-    # Update avec correspondance exacte
-    cursor.execute("""
-        UPDATE addresses 
-        SET postal_code = ?
-        WHERE TRIM(street_name) = ? 
-        AND TRIM(house_number) = ?
-        AND (postal_code IS NULL OR postal_code = '')
-    """, (postal_code, street_name, house_number))
-    
-    if cursor.rowcount > 0:
-        updated += 1
-    else:
-        not_matched.append(f"{house_number} {street_name}")
-    
-    # Progress et commit périodique
-    if idx % 500 == 0:
-        conn.commit()
-        print(f"  Progress: {updated}/{idx} importés...")
-
-# Commit final
-conn.commit()
+report = postal_merge.merge_postal_codes(conn, df, report_path=REPORT_FILE)
+updated = report["updated"]
+print(f"  {report['matched']}/{report['staged']} lignes appariées en {report['seconds']:.2f} s")
 
 # Stats après
-cursor.execute("SELECT COUNT(*) FROM addresses WHERE postal_code IS NOT NULL AND postal_code != ''")
+cursor.execute(f"SELECT COUNT(*) FROM addresses WHERE {cp_col} IS NOT NULL AND {cp_col} != ''")
 after = cursor.fetchone()[0]
 
 print(f"\n✅ IMPORT TERMINÉ!")
 print(f"  - Codes postaux importés: {updated}")
-print(f"  - Non matchés: {len(not_matched)}")
+print(f"  - Non matchés: {report['unmatched']}")
 print(f"  - Total avec CP dans DB: {after} (avant: {before})")
 print(f"  - Nouveaux codes postaux ajoutés: {after - before}")
 
 # Afficher quelques exemples de succès
-cursor.execute("""
-    SELECT street_name, house_number, postal_code
+cursor.execute(f"""
+    SELECT street_name, house_number, {cp_col}
     FROM addresses
-    WHERE postal_code IS NOT NULL
+    WHERE {cp_col} IS NOT NULL
     ORDER BY RANDOM()
     LIMIT 5
 """)
@@ -80,12 +53,8 @@ print("\n📍 Exemples d'adresses avec CP importé:")
 for street, num, cp in cursor.fetchall():
     print(f"  ✓ {num} {street}: {cp}")
 
-# Sauvegarder les non-matchés pour debug
-if not_matched:
-    with open("non_matched_addresses.txt", "w", encoding="utf-8") as f:
-        f.write(f"Adresses non matchées ({len(not_matched)}):\n")
-        for addr in not_matched[:50]:  # Premiers 50 seulement
-            f.write(f"{addr}\n")
-    print(f"\n⚠️ {len(not_matched)} adresses non matchées sauvées dans non_matched_addresses.txt")
+# Rapport complet des non-matchés (écrit par postal_merge)
+if report["unmatched"]:
+    print(f"\n⚠️ {report['unmatched']} adresses non matchées sauvées dans {REPORT_FILE}")
 
 conn.close()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark du poids de la carte globale selon le niveau de simplification.
+
+Construit street_geometry (et ses niveaux Douglas–Peucker, voir
+guignomap.simplify) dans une base en mémoire, puis mesure le HTML de la carte
+globale (base_map + status_layer, comme show_status_map) à géométrie complète et à
+chaque tolérance, ainsi que le zoom auquel chaque niveau est choisi.
+
+Données : mêmes sources que bench_street_ordering.py (points de la base si
+disponibles, sinon coordonnées synthétiques depuis import/nocivique.csv).
+
+Usage : python scripts/bench_map_payload.py
+"""
+
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_street_ordering import load_points  # noqa: E402
+from guignomap import geometry, map_layers, simplify  # noqa: E402
+from guignomap.db import init_db  # noqa: E402
+
+
+def build_db(df) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    geometry.init_street_geometry_schema(conn)
+    conn.executemany("INSERT OR IGNORE INTO streets (name, status) VALUES (?, 'a_faire')",
+                     [(r,) for r in df["rue"].unique()])
+    conn.executemany(
+        "INSERT INTO addresses (street_name, house_number, latitude, longitude) VALUES (?, ?, ?, ?)",
+        [(r, str(i), float(lat), float(lon)) for i, (r, lat, lon) in enumerate(df[["rue", "lat", "lon"]].itertuples(index=False))],
+    )
+    conn.commit()
+    return conn
+
+
+def map_html(lines) -> str:
+    m, layer = map_layers.base_map(map_layers.streets_geojson(lines), zoom_start=12, weight=4)
+    map_layers.status_layer(layer, {rue: (status, team) for rue, status, team, _ in lines}, weight=4).add_to(m)
+    return m.get_root().render()
+
+
+def main() -> None:
+    df, source = load_points()
+    print(f"Source : {source} — {len(df)} points, {df['rue'].nunique()} rues")
+    conn = build_db(df)
+
+    t0 = time.perf_counter()
+    geometry.rebuild_street_geometry(conn)
+    print(f"  street_geometry + niveaux : {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    zooms = {}
+    for z in range(10, 19):
+        zooms.setdefault(simplify.tolerance_for_zoom(z), []).append(z)
+
+    base = None
+    for tol in (0.0, *simplify.LOD_TOLERANCES_M):
+        lines = geometry.fetch_street_lines(conn, tolerance_m=tol)
+        n_points = sum(len(p) for *_, p in lines)
+        size = len(map_html(lines).encode("utf-8"))
+        base = base or size
+        z = zooms.get(tol, [])
+        zs = f"zoom {z[0]}-{z[-1]}" if z else "-"
+        print(f"  tolérance {tol:4.0f} m : {n_points:7d} sommets, {size / 1024:8.1f} Ko "
+              f"({size / base:5.1%})  {zs}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark des jointures rues -> adresses / notes : nom (TEXT) contre clé entière.
+
+Construit deux bases en mémoire identiques (adresses de bench_street_ordering,
+notes synthétiques), l'une indexée sur street_name, l'autre sur street_id
+(voir guignomap.db.init_street_keys), puis mesure les requêtes typiques et la
+taille des index (pages).
+
+Usage : python scripts/bench_street_keys.py [nb_notes]
+"""
+
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_street_ordering import load_points  # noqa: E402
+
+QUERIES = {
+    "adresses d'une rue": (
+        "SELECT house_number FROM addresses WHERE street_name = ?",
+        "SELECT house_number FROM addresses WHERE street_id = ?",
+    ),
+    "visitées (rue, équipe)": (
+        "SELECT address_number FROM notes WHERE street_name = ? AND team_id = 'T1' AND comment = 'Visitée'",
+        "SELECT address_number FROM notes WHERE street_id = ? AND team_id = 'T1' AND comment = 'Visitée'",
+    ),
+    "adresses par rue (toutes)": (
+        "SELECT s.name, COUNT(a.id) FROM streets s JOIN addresses a ON a.street_name = s.name GROUP BY s.id",
+        "SELECT s.name, COUNT(a.id) FROM streets s JOIN addresses a ON a.street_id = s.id GROUP BY s.id",
+    ),
+    "export notes + rues": (
+        "SELECT s.name, n.address_number FROM notes n JOIN streets s ON s.name = n.street_name",
+        "SELECT s.name, n.address_number FROM notes n JOIN streets s ON s.id = n.street_id",
+    ),
+}
+
+
+def build(df, n_notes: int, by_id: bool) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE streets (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    conn.execute("CREATE TABLE addresses (id INTEGER PRIMARY KEY, street_name TEXT, street_id INTEGER, "
+                 "house_number TEXT)")
+    conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, street_name TEXT, street_id INTEGER, team_id TEXT, "
+                 "address_number TEXT, comment TEXT)")
+    names = list(dict.fromkeys(df["rue"]))
+    conn.executemany("INSERT INTO streets (id, name) VALUES (?, ?)", enumerate(names, 1))
+    ids = {n: i for i, n in enumerate(names, 1)}
+    conn.executemany("INSERT INTO addresses (street_name, street_id, house_number) VALUES (?, ?, ?)",
+                     [(r, ids[r], str(i)) for i, r in enumerate(df["rue"])])
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, len(df), n_notes)
+    rues = df["rue"].to_numpy()
+    conn.executemany(
+        "INSERT INTO notes (street_name, street_id, team_id, address_number, comment) VALUES (?, ?, ?, ?, 'Visitée')",
+        [(rues[p], ids[rues[p]], f"T{p % 8 + 1}", str(p)) for p in picks],
+    )
+    key = "street_id" if by_id else "street_name"
+    conn.execute(f"CREATE INDEX ix_addresses ON addresses({key})")
+    conn.execute(f"CREATE INDEX ix_notes ON notes({key}, team_id, comment, address_number)")
+    conn.commit()
+    conn.execute("ANALYZE")
+    return conn
+
+
+def index_pages(conn, name: str) -> int:
+    try:
+        return conn.execute("SELECT COUNT(*) FROM dbstat WHERE name = ?", (name,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        return -1  # SQLite compilé sans dbstat
+
+
+def timed(conn, sql: str, params_list, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for p in params_list:
+            conn.execute(sql, p).fetchall()
+        best = min(best, time.perf_counter() - t0)
+    return best / len(params_list) * 1000
+
+
+def main() -> None:
+    n_notes = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    df, source = load_points()
+    print(f"Source : {source} — {len(df)} adresses, {df['rue'].nunique()} rues, {n_notes} notes")
+    text, integer = build(df, n_notes, False), build(df, n_notes, True)
+
+    for name in ("ix_addresses", "ix_notes"):
+        print(f"  pages {name:13s} : nom {index_pages(text, name):5d}   entier {index_pages(integer, name):5d}")
+
+    sample = list(dict.fromkeys(df["rue"]))[:200]
+    ids = dict(integer.execute("SELECT name, id FROM streets").fetchall())
+    for label, (sql_text, sql_int) in QUERIES.items():
+        if "?" in sql_text:
+            t_text = timed(text, sql_text, [(r,) for r in sample])
+            t_int = timed(integer, sql_int, [(ids[r],) for r in sample])
+        else:
+            t_text, t_int = timed(text, sql_text, [()]), timed(integer, sql_int, [()])
+        print(f"  {label:26s} : nom {t_text:8.3f} ms   entier {t_int:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
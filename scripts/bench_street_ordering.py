@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'ordonnancement des points de rues.
+
+Compare l'ancien code de map_global (groupby + g.apply(atan2) ligne par ligne)
+aux modes vectorisés de guignomap.street_order ("angle" et "chain").
+
+Données : points géocodés de guignomap/guigno_map.db si disponibles, sinon
+les ~18k adresses de import/nocivique.csv avec des coordonnées synthétiques
+réparties le long de segments autour de Mascouche.
+
+Usage : python scripts/bench_street_ordering.py [--repeat 3]
+"""
+
+import argparse
+import math
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from guignomap import street_order  # noqa: E402
+
+DB_PATH = ROOT / "guignomap" / "guigno_map.db"
+CSV_PATH = ROOT / "import" / "nocivique.csv"
+
+
+def load_points() -> tuple[pd.DataFrame, str]:
+    if DB_PATH.exists():
+        try:
+            with sqlite3.connect(DB_PATH) as conn:
+                df = pd.read_sql_query(
+                    "SELECT street_name AS rue, latitude AS lat, longitude AS lon FROM addresses "
+                    "WHERE latitude IS NOT NULL AND longitude IS NOT NULL",
+                    conn,
+                )
+            if len(df) > 1000:
+                return df, f"DB ({DB_PATH.name})"
+        except Exception:
+            pass
+    df = pd.read_csv(CSV_PATH, usecols=["nomrue", "NoCiv"]).rename(columns={"nomrue": "rue"})
+    df = df.dropna(subset=["rue"])
+    rng = np.random.default_rng(42)
+    codes, _ = pd.factorize(df["rue"])
+    n = codes.max() + 1
+    # Un segment aléatoire par rue, les adresses réparties dessus avec un peu de bruit
+    start = np.column_stack((45.70 + rng.random(n) * 0.10, -73.66 + rng.random(n) * 0.12))
+    heading = rng.random(n) * 2 * np.pi
+    t = rng.random(len(df)) * 0.01
+    df["lat"] = start[codes, 0] + np.sin(heading[codes]) * t + rng.normal(0, 2e-5, len(df))
+    df["lon"] = start[codes, 1] + np.cos(heading[codes]) * t + rng.normal(0, 2e-5, len(df))
+    return df, f"CSV synthétique ({CSV_PATH.name})"
+
+
+def legacy(df: pd.DataFrame) -> int:
+    """Reproduction fidèle de la boucle d'origine de map_global."""
+    n = 0
+    for _rue, g in df.groupby(["rue"], sort=False):
+        g = g.dropna(subset=["lat", "lon"]).copy()
+        cx, cy = g["lat"].mean(), g["lon"].mean()
+        g["_ang"] = g.apply(lambda r: math.atan2(r["lat"] - cx, r["lon"] - cy), axis=1)
+        g = g.sort_values("_ang")
+        n += len(g[["lat", "lon"]].values.tolist())
+    return n
+
+
+def bench(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    df, source = load_points()
+    print(f"Source : {source} — {len(df)} points, {df['rue'].nunique()} rues")
+
+    t_legacy = bench(lambda: legacy(df), args.repeat)
+    print(f"  legacy g.apply(atan2)   : {t_legacy * 1000:9.1f} ms")
+    for mode in street_order.MODES:
+        t = bench(lambda: street_order.ordered_lines(df, mode), args.repeat)
+        print(f"  street_order[{mode:<5}]     : {t * 1000:9.1f} ms  (x{t_legacy / t:.1f})")
+
+
+if __name__ == "__main__":
+    main()
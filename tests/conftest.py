@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture
+def traced():
+    """traced(conn) : liste des requêtes SQL exécutées ensuite sur conn (trace callback)."""
+    def start(conn):
+        statements = []
+        conn.set_trace_callback(statements.append)
+        return statements
+    return start
@@ -12,6 +12,8 @@ from guignomap.db import (
 )
 conn = sqlite3.connect("guignomap/guigno_map.db")
 init_street_status_schema(conn)
+conn.execute("INSERT OR IGNORE INTO streets (name) VALUES ('Rue Test')")
+conn.commit()
 mark_street_in_progress(conn, "Rue Test", "A1", "Départ")
 save_checkpoint(conn, "Rue Test", "A1", "Porte 125: pas de réponse")
 mark_street_complete(conn, "Rue Test", "A1")
@@ -0,0 +1,103 @@
+import tempfile
+from pathlib import Path
+
+from guignomap.activity_log import ActivityLogWriter
+from guignomap.db_pool import ConnectionPool
+
+
+def make_pool(tmp):
+    pool = ConnectionPool(Path(tmp) / "log.db")
+    with pool.writer() as w:
+        w.execute("""
+            CREATE TABLE activity_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, team_id TEXT, action TEXT NOT NULL, details TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    return pool
+
+
+def count(pool):
+    return pool.reader().execute("SELECT COUNT(*) FROM activity_log").fetchone()[0]
+
+
+def test_rows_are_batched_and_flushed_on_close():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp)
+        log = ActivityLogWriter(pool, flush_interval=60, batch_size=1000)
+        for i in range(50):
+            log.log("EQ1", "STATUS_UPDATE", f"Rue {i} -> terminee")
+        log.log(None, "NOTE_ADD", "x")
+        assert count(pool) == 0
+        log.close()
+        assert count(pool) == 51
+        row = pool.reader().execute("SELECT team_id, created_at FROM activity_log WHERE action = 'NOTE_ADD'").fetchone()
+        assert row[0] == "SYSTEM" and row[1]
+        assert log.stats()["batches"] == 1
+        pool.close()
+
+
+def test_stats_are_exact_with_concurrent_callers():
+    import threading
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp)
+        log = ActivityLogWriter(pool, flush_interval=0.01, batch_size=7)
+        threads = [threading.Thread(target=lambda: [log.log("EQ1", "X", str(i)) for i in range(500)])
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        log.close()
+        stats = log.stats()
+        assert stats["queued"] == stats["written"] == count(pool) == 4000
+        pool.close()
+
+
+def test_bounded_queue_applies_backpressure_without_loss():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp)
+        log = ActivityLogWriter(pool, flush_interval=60, batch_size=1000, max_queue=5, put_timeout=0.01)
+        log.log_many(("EQ1", "A", str(i)) for i in range(12))
+        assert log.stats()["backpressure"] >= 1
+        log.close()
+        assert count(pool) == 12
+        pool.close()
+
+
+def test_locked_database_keeps_batch_for_retry():
+    import sqlite3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp)
+        pool.close()
+        pool = ConnectionPool(Path(tmp) / "log.db", busy_timeout_ms=20)
+        log = ActivityLogWriter(pool, flush_interval=60, batch_size=10)
+        log.log_many(("EQ1", "A", str(i)) for i in range(5))
+        # Un autre processus tient le verrou d'écriture
+        other = sqlite3.connect(Path(tmp) / "log.db")
+        other.execute("BEGIN IMMEDIATE")
+        assert log.flush() == 0
+        assert log.stats()["pending"] == 5 and log.stats()["dropped"] == 0
+        other.rollback()
+        log.log("EQ1", "A", "5")
+        log.close()
+        rows = pool.reader().execute("SELECT details FROM activity_log ORDER BY id").fetchall()
+        assert [r[0] for r in rows] == [str(i) for i in range(6)]
+        assert log.stats()["retries"] >= 1 and log.stats()["pending"] == 0
+        other.close()
+        pool.close()
+
+
+def test_permanent_error_drops_and_counts():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp)
+        with pool.writer() as w:
+            w.execute("DROP TABLE activity_log")
+        log = ActivityLogWriter(pool, flush_interval=60)
+        log.log("EQ1", "A", "x")
+        assert log.flush() == 0
+        assert log.stats()["dropped"] == 1 and log.stats()["pending"] == 0
+        log.close()
+        pool.close()
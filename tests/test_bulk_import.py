@@ -0,0 +1,55 @@
+import sqlite3
+
+import pandas as pd
+
+from guignomap import bulk_import
+from guignomap.db import init_db
+
+
+def raw_frame():
+    return pd.DataFrame({
+        "NoCiv": ["2690.0", "12", "", "7"],
+        "Nomrue": ["Rue Cantin", " Rue Cantin ", "Avenue Saint-Denis", None],
+        "code_postal": ["j7k 2l5", "NON TROUVÉ", "J7L 1V7", "J7K 3B4"],
+    })
+
+
+def test_normalize_civic_frame():
+    df = bulk_import.normalize_civic_frame(raw_frame())
+    assert df["street_name"].tolist() == ["Rue Cantin", "Rue Cantin"]
+    assert df["house_number"].tolist() == ["2690", "12"]
+    assert df["postal_code"].iloc[0] == "J7K 2L5"
+    assert pd.isna(df["postal_code"].iloc[1])
+    assert df["latitude"].isna().all()
+
+
+def test_bulk_load_official_schema_recreates_indexes():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    indexes = {r[0] for r in bulk_import._secondary_indexes(conn, "addresses")}
+    conn.execute("INSERT INTO streets (name, status) VALUES ('Ancienne rue', 'terminee')")
+    conn.commit()
+
+    df = bulk_import.normalize_civic_frame(raw_frame())
+    report = bulk_import.bulk_load(conn, df, replace=True)
+
+    assert (report["streets"], report["addresses"]) == (1, 2)
+    assert conn.execute("SELECT name FROM streets").fetchall() == [("Rue Cantin",)]
+    assert conn.execute(
+        "SELECT house_number, code_postal FROM addresses ORDER BY house_number"
+    ).fetchall() == [("12", None), ("2690", "J7K 2L5")]
+    assert {r[0] for r in bulk_import._secondary_indexes(conn, "addresses")} == indexes
+
+
+def test_bulk_load_postal_code_schema_appends():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+        CREATE TABLE streets (id INTEGER PRIMARY KEY, name TEXT UNIQUE, sector TEXT, team TEXT, status TEXT);
+        CREATE TABLE addresses (id INTEGER PRIMARY KEY, street_name TEXT, house_number TEXT,
+                                latitude REAL, longitude REAL, postal_code TEXT);
+        INSERT INTO streets (name, status) VALUES ('Rue Cantin', 'a_faire');
+    """)
+    df = bulk_import.normalize_civic_frame(raw_frame())
+    bulk_import.bulk_load(conn, df, replace=False, osm_type=None)
+    assert conn.execute("SELECT COUNT(*) FROM streets").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(postal_code) FROM addresses").fetchone()[0] == 1
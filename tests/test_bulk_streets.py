@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+from guignomap import db
+from guignomap.db import init_db
+
+
+def make_conn():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.execute("INSERT INTO sectors (id, name) VALUES (1, 'Nord'), (2, 'Sud')")
+    conn.executemany(
+        "INSERT INTO streets (name, sector_id, team) VALUES (?, ?, ?)",
+        [("Rue A", 1, None), ("Rue B", 1, "T2"), ("Rue C", 1, None), ("Rue D", 2, None)],
+    )
+    conn.commit()
+    return conn
+
+
+def teams(conn):
+    return dict(conn.execute("SELECT name, team FROM streets").fetchall())
+
+
+def test_assign_streets_single_commit(traced):
+    conn = make_conn()
+    statements = traced(conn)
+    assert db.assign_streets(conn, ["Rue A", "Rue B", "Rue A", "Rue Z"], "T1", only_unassigned=True) == ["Rue A"]
+    assert sum(s == "COMMIT" for s in statements) == 1
+    assert teams(conn) == {"Rue A": "T1", "Rue B": "T2", "Rue C": None, "Rue D": None}
+    # Seules les rues dont l'équipe change sont retournées
+    assert db.assign_streets(conn, ["Rue A", "Rue B"], "T1") == ["Rue B"]
+    assert db.assign_streets(conn, ["Rue C", "Rue A", "Rue B"], "") == ["Rue A", "Rue B"]
+    assert db.progress_for_team(conn, "T1")["total"] == 0
+    assert db.assign_streets(conn, [], "T1") == []
+
+
+def test_set_streets_status_one_event_per_change(traced):
+    conn = make_conn()
+    db.set_street_status(conn, "Rue A", "terminee", "T1")
+    statements = traced(conn)
+    assert db.set_streets_status(conn, ["Rue A", "Rue B", "Rue C", "Rue Z"], "terminee", "T1") == ["Rue B", "Rue C"]
+    assert sum(s == "COMMIT" for s in statements) == 1
+    assert [len(db.street_status_history(conn, n)) for n in ("Rue A", "Rue B", "Rue C")] == [1, 1, 1]
+    assert db.get_street_state(conn, "Rue B")["completed_at"] is not None
+    assert db.progress_global(conn)["terminee"] == 3
+    assert db.set_streets_status(conn, ["Rue A"], "fini") == []
+
+
+def test_bulk_failure_rolls_back_whole_batch():
+    conn = make_conn()
+    conn.execute("""
+        CREATE TRIGGER fail_c BEFORE UPDATE OF status ON streets WHEN OLD.name = 'Rue C'
+        BEGIN SELECT RAISE(ABORT, 'boom'); END
+    """)
+    assert db.set_streets_status(conn, ["Rue A", "Rue C"], "en_cours", "T1") == []
+    assert db.get_street_state(conn, "Rue A")["status"] == "a_faire"
+    assert db.street_status_history(conn, "Rue A") == []
+    with pytest.raises(sqlite3.IntegrityError):
+        db.set_streets_status(conn, ["Rue A", "Rue C"], "en_cours", "T1", commit=False)
+    conn.rollback()
+
+
+def test_reassign_sector():
+    conn = make_conn()
+    assert db.reassign_sector(conn, 1, "T1", only_unassigned=True) == ["Rue A", "Rue C"]
+    assert teams(conn)["Rue B"] == "T2"
+    assert db.reassign_sector(conn, 1, "T3") == ["Rue A", "Rue B", "Rue C"]
+    assert teams(conn) == {"Rue A": "T3", "Rue B": "T3", "Rue C": "T3", "Rue D": None}
+    assert db.reassign_sector(conn, 3, "T3") == []
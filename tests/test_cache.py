@@ -0,0 +1,58 @@
+import sqlite3
+
+import pandas as pd
+
+from guignomap import cache
+
+
+def setup_function():
+    cache.clear_cache()
+
+
+def make_conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE streets (name TEXT, status TEXT)")
+    conn.execute("INSERT INTO streets VALUES ('Rue A', 'a_faire')")
+    conn.commit()
+    return conn
+
+
+calls = []
+
+
+@cache.versioned_cache
+def count_done(conn, status="terminee"):
+    calls.append(status)
+    return conn.execute("SELECT COUNT(*) FROM streets WHERE status = ?", (status,)).fetchone()[0]
+
+
+def test_served_until_version_bump():
+    conn = make_conn()
+    calls.clear()
+    assert count_done(conn) == 0
+    conn.execute("UPDATE streets SET status = 'terminee'")
+    # Pas encore de bump : valeur en cache
+    assert count_done(conn) == 0
+    cache.bump_data_version()
+    assert count_done(conn) == 1
+    assert calls == ["terminee", "terminee"]
+    stats = cache.cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["functions"]["count_done"] == {"hits": 1, "misses": 2}
+
+
+def test_arguments_are_part_of_the_key():
+    conn = make_conn()
+    assert count_done(conn, "a_faire") == 1
+    assert count_done(conn, status="terminee") == 0
+    assert cache.cache_stats()["misses"] == 2
+
+
+def test_dataframes_are_copied():
+    @cache.versioned_cache
+    def frame(conn):
+        return pd.DataFrame({"x": [1]})
+
+    df = frame(None)
+    df["x"] = 99
+    assert frame(None)["x"].tolist() == [1]
@@ -0,0 +1,61 @@
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from guignomap.db_pool import ConnectionPool
+
+
+def make_pool(tmp):
+    pool = ConnectionPool(Path(tmp) / "pool.db")
+    with pool.writer() as w:
+        w.execute("CREATE TABLE streets (name TEXT PRIMARY KEY, status TEXT)")
+    return pool
+
+
+def test_wal_and_read_only_readers():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp)
+        assert pool.stats()["journal_mode"] == "wal"
+        with pytest.raises(sqlite3.OperationalError):
+            pool.reader().execute("INSERT INTO streets VALUES ('Rue A', 'a_faire')")
+        pool.close()
+
+
+def test_concurrent_writes_are_serialized():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp)
+
+        def work(i):
+            for j in range(20):
+                with pool.writer() as w:
+                    w.execute("INSERT INTO streets VALUES (?, 'a_faire')", (f"Rue {i}-{j}",))
+            pool.reader().execute("SELECT COUNT(*) FROM streets").fetchone()
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert pool.reader().execute("SELECT COUNT(*) FROM streets").fetchone()[0] == 160
+        stats = pool.stats()
+        assert stats["writes"] == 161 and stats["write_errors"] == 0
+        # Les connexions des threads terminés sont revenues au pool
+        assert stats["readers_opened"] <= 9
+        pool.close()
+
+
+def test_writer_rolls_back_and_nests():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp)
+        with pytest.raises(RuntimeError):
+            with pool.writer() as w:
+                w.execute("INSERT INTO streets VALUES ('Rue A', 'a_faire')")
+                with pool.writer() as inner:
+                    inner.execute("INSERT INTO streets VALUES ('Rue B', 'a_faire')")
+                raise RuntimeError("boom")
+        assert pool.reader().execute("SELECT COUNT(*) FROM streets").fetchone()[0] == 0
+        assert pool.stats()["write_errors"] == 1
+        pool.close()
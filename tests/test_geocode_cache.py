@@ -0,0 +1,99 @@
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from guignomap import geocode_cache, geocoding
+from guignomap.db import init_db
+
+
+def make_conn():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    geocode_cache.init_geocode_cache_schema(conn)
+    return conn
+
+
+def test_keys_are_normalized():
+    assert geocode_cache.cache_key(" 472 ", "Avenue de l'Étang") == "472|AVENUE ETANG"
+    assert geocode_cache.cache_key("472", "AVENUE DE L’ETANG ") == "472|AVENUE ETANG"
+    # Même clé canonique que guignomap.street_names (abréviations, particules)
+    assert geocode_cache.cache_key("974", "AV ST-DENIS") == geocode_cache.cache_key("974", "Avenue Saint-Denis")
+    assert geocode_cache.postal_key("j7k 2l5") == "J7K2L5"
+
+
+def test_lookup_prefers_same_postal_code_and_falls_back():
+    conn = make_conn()
+    geocode_cache.store_many(conn, [
+        ("10", "Rue Cantin", None, "ok", 45.1, -73.1, "J7K 2L8", "nominatim", 0.5),
+        ("10", "Rue Cantin", "J7K 2L8", "ok", 45.2, -73.2, "J7K 2L8", "google", 1.0),
+    ])
+    assert geocode_cache.lookup(conn, "10", "rue cantin", "J7K2L8")[1] == 45.2
+    assert geocode_cache.lookup(conn, "10", "Rue Cantin", "J7L 1A1")[1] == 45.1
+    assert geocode_cache.lookup(conn, "11", "Rue Cantin") is None
+    assert geocode_cache.cache_summary(conn)["hits"] == 2
+
+
+def test_ttl_purge_and_eviction():
+    conn = make_conn()
+    geocode_cache.store_many(conn, [
+        ("1", "Rue A", None, "ok", 45.0, -73.0, None, "offline", None),
+        ("2", "Rue A", None, "not_found", None, None, None, "offline", None),
+        ("3", "Rue A", None, "ok", 45.0, -73.0, None, "offline", None),
+    ])
+    conn.execute("UPDATE geocode_cache SET created_at = datetime('now', '-60 days'), last_used_at = datetime('now', '-60 days')")
+    assert geocode_cache.lookup(conn, "2", "Rue A") is None
+    assert geocode_cache.purge_expired(conn) == 1
+    geocode_cache.lookup(conn, "3", "Rue A")
+    assert geocode_cache.evict(conn, max_entries=1) == 1
+    assert geocode_cache.lookup(conn, "3", "Rue A", touch=False) is not None
+
+
+def test_export_import_round_trip():
+    conn = make_conn()
+    geocode_cache.store_many(conn, [("10", "Rue Cantin", "J7K 2L8", "ok", 45.2, -73.2, "J7K 2L8", "google", 1.0)])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cache.csv"
+        assert geocode_cache.export_csv(conn, path) == 1
+        other = make_conn()
+        assert geocode_cache.import_csv(other, path) == 1
+    assert geocode_cache.lookup(other, "10", "Rue Cantin", "J7K 2L8")[:3] == ("ok", 45.2, -73.2)
+
+
+def test_engine_uses_cache_before_provider():
+    conn = make_conn()
+    conn.executemany("INSERT INTO addresses (street_name, house_number) VALUES (?, ?)",
+                     [("Rue Cantin", "1"), ("Rue Cantin", "2")])
+    conn.commit()
+    provider = geocoding.OfflineProvider(lambda q: (45.7, -73.6, "J7K 2L8", 0.9))
+    geocoding.GeocodingEngine(conn, provider).run()
+    assert provider.calls == 2
+
+    # Reconstruction de la base : les mêmes adresses ne coûtent plus aucun appel
+    conn.execute("DELETE FROM addresses")
+    conn.execute("DELETE FROM geocode_progress")
+    conn.executemany("INSERT INTO addresses (street_name, house_number) VALUES (?, ?)",
+                     [("Rue Cantin", "1"), ("Rue Cantin", "2")])
+    conn.commit()
+    stats = geocoding.GeocodingEngine(conn, provider).run()
+    assert provider.calls == 2 and stats["cache_hits"] == 2 and stats["found"] == 2
+    assert conn.execute("SELECT COUNT(*) FROM addresses WHERE latitude IS NOT NULL").fetchone()[0] == 2
+
+
+def test_seed_from_addresses():
+    conn = make_conn()
+    conn.execute("INSERT INTO addresses (street_name, house_number, latitude, longitude, code_postal) "
+                 "VALUES ('Rue Cantin', '1', 45.7, -73.6, 'J7K 2L8')")
+    assert geocode_cache.seed_from_addresses(conn) == 1
+    assert geocode_cache.lookup(conn, "1", "Rue Cantin")[4] == "db"
+
+
+def test_old_folded_keys_are_rekeyed():
+    conn = make_conn()
+    conn.executemany(
+        "INSERT INTO geocode_cache (street_key, status, latitude, longitude) VALUES (?, 'ok', ?, -73.6)",
+        [("974|AV ST DENIS", 45.70), ("974|AVENUE SAINT DENIS", 45.71), ("10|RUE CANTIN", 45.72)],
+    )
+    assert geocode_cache.rekey(conn) == 1
+    assert geocode_cache.rekey(conn) == 0
+    assert geocode_cache.cache_summary(conn)["entries"] == 2
+    assert geocode_cache.lookup(conn, "974", "Av. St-Denis")[0] == "ok"
@@ -0,0 +1,93 @@
+import sqlite3
+import time
+
+import pytest
+
+from guignomap import geocoding
+from guignomap.db import init_db
+
+
+def make_conn(n=6):
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.executemany(
+        "INSERT INTO addresses (street_name, house_number) VALUES (?, ?)",
+        [("Rue Cantin", str(i)) for i in range(1, n + 1)],
+    )
+    conn.commit()
+    return conn
+
+
+def lookup(query):
+    number = int(query.split()[0])
+    if number % 3 == 0:
+        return None
+    return 45.7 + number / 1000, -73.6, "J7K 2L8"
+
+
+def test_token_bucket_schedules_reservations():
+    now = [0.0]
+    bucket = geocoding.TokenBucket(rate=2.0, capacity=1.0, clock=lambda: now[0])
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.5, 1.0]
+    now[0] = 10.0
+    assert bucket.reserve() == 0.0
+
+
+def test_engine_geocodes_in_batches_and_records_progress():
+    conn = make_conn()
+    provider = geocoding.OfflineProvider(lookup, failures=1)
+    engine = geocoding.GeocodingEngine(conn, provider, workers=3, batch_size=4, backoff=0)
+    stats = engine.run()
+
+    assert (stats["processed"], stats["found"], stats["not_found"], stats["errors"]) == (6, 4, 2, 0)
+    assert stats["retries"] == 6 and stats["batches"] == 2
+    assert conn.execute("SELECT COUNT(*) FROM addresses WHERE latitude IS NOT NULL").fetchone()[0] == 4
+    assert conn.execute("SELECT DISTINCT code_postal FROM addresses WHERE latitude IS NOT NULL").fetchall() == [("J7K 2L8",)]
+    assert geocoding.progress_summary(conn) == {"ok": 4, "not_found": 2}
+    assert engine.touched_streets == {"Rue Cantin"}
+
+
+def test_resume_skips_finished_addresses():
+    conn = make_conn()
+    provider = geocoding.OfflineProvider(lookup)
+    geocoding.GeocodingEngine(conn, provider, batch_size=2).run(limit=2)
+    assert provider.calls == 2
+
+    stats = geocoding.GeocodingEngine(conn, provider, batch_size=2).run()
+    assert stats["processed"] == 4 and provider.calls == 6
+    assert geocoding.pending_addresses(conn) == []
+
+
+def test_errors_are_retried_on_next_run_until_max_attempts():
+    conn = make_conn(1)
+    failing = geocoding.OfflineProvider(lookup, failures=10)
+    stats = geocoding.GeocodingEngine(conn, failing, max_attempts=2, backoff=0).run()
+    assert stats["errors"] == 1
+    assert conn.execute("SELECT status, attempts FROM geocode_progress").fetchone() == ("error", 2)
+    # Limite atteinte : plus rien à faire tant que la progression n'est pas réinitialisée
+    assert geocoding.pending_addresses(conn, max_attempts=2) == []
+    assert geocoding.reset_progress(conn) == 1
+    assert len(geocoding.pending_addresses(conn, max_attempts=2)) == 1
+
+
+def test_workers_fill_the_rate_despite_latency():
+    conn = make_conn(8)
+    provider = geocoding.OfflineProvider(lookup, rate=1000.0, latency=0.05)
+    t0 = time.perf_counter()
+    geocoding.GeocodingEngine(conn, provider, workers=8).run()
+    # Séquentiel : >= 0.4 s ; en parallèle, environ une latence
+    assert time.perf_counter() - t0 < 0.3
+
+
+def test_provider_from_name():
+    assert isinstance(geocoding.provider_from_name("offline", lookup={}), geocoding.OfflineProvider)
+    with pytest.raises(ValueError):
+        geocoding.provider_from_name("bing")
+
+
+def test_provider_without_geocode_fails_at_creation():
+    class Incomplete(geocoding.GeocodingProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,60 @@
+from guignomap import map_layers
+
+LINES = [
+    ("Rue A", "a_faire", None, [[45.70, -73.60], [45.71, -73.61]]),
+    ("Rue B", "terminee", "EQ1", [[45.72, -73.60]]),
+]
+
+
+def test_streets_geojson_swaps_to_lon_lat():
+    gj = map_layers.streets_geojson(LINES)
+    line, point = gj["features"]
+    assert line["geometry"] == {"type": "LineString", "coordinates": [[-73.60, 45.70], [-73.61, 45.71]]}
+    assert point["geometry"] == {"type": "Point", "coordinates": [-73.60, 45.72]}
+    assert line["properties"] == {"rue": "Rue A"}
+
+
+def test_status_code_encodes_assignment():
+    assert map_layers.status_code("terminee", "EQ1") == 2
+    assert map_layers.status_code("en_cours", "") == 4
+    assert map_layers.status_code(None, None) == 3
+
+
+def test_status_layer_only_carries_codes():
+    m, layer = map_layers.base_map(map_layers.streets_geojson(LINES))
+    fg = map_layers.status_layer(layer, {"Rue A": ("a_faire", None), "Rue B": ("terminee", "EQ1")})
+    fg.add_to(m)
+    m.get_root().render()
+    script = next(iter(fg._children.values()))._template.module.script(next(iter(fg._children.values())))
+    assert '{"Rue A":3,"Rue B":2}' in script
+    assert layer.get_name() in script
+    # Aucune coordonnée dans le script de statut
+    assert "45.7" not in script
+
+
+def _script(fg):
+    element = next(iter(fg._children.values()))
+    return element._template.module.script(element)
+
+
+def test_viewport_layers_are_self_contained_and_compact():
+    fg = map_layers.lines_layer(LINES)
+    m = map_layers.empty_map()
+    fg.add_to(m)
+    m.get_root().render()
+    script = _script(fg)
+    assert '"c":3' in script and '"c":2' in script and "L.geoJson" in script
+    # Style calculé côté navigateur : pas de table de styles par entité
+    assert "switch" not in script
+
+    clusters = [{"label": "Nord", "lat": 45.75, "lon": -73.6, "streets": 4,
+                 "a_faire": 1, "en_cours": 0, "terminee": 3}]
+    script = _script(map_layers.cluster_layer(clusters))
+    assert "Nord : 3/4 rues termin" in script and '"c":1' in script
+    assert not map_layers.cluster_layer([])._children
+
+
+def test_public_map_fetches_published_geojson():
+    html = map_layers.public_map("/app/static/public/streets.json?v=abc").get_root().render()
+    assert 'fetch("/app/static/public/streets.json?v=abc")' in html
+    assert "L.geoJson(null" in html
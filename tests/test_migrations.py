@@ -0,0 +1,130 @@
+import sqlite3
+
+from guignomap import db, migrations, spatial
+from guignomap.db import init_db
+
+
+def test_init_db_applies_every_migration_once(traced):
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    assert migrations.current_version(conn) == migrations.MIGRATIONS[-1][0]
+    assert migrations.pending(conn) == []
+    statements = traced(conn)
+    assert migrations.migrate(conn) == []
+    # Versions inscrites + contrôle des marqueurs, sans DDL
+    queries = [s for s in statements if not s.startswith("--")]
+    assert queries[0] == "SELECT version FROM schema_version"
+    assert len(queries) == 2 and "pragma_table_info" in queries[1]
+
+
+def test_street_status_hot_path_runs_no_ddl(traced):
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.execute("INSERT INTO streets (name) VALUES ('Rue A')")
+    conn.commit()
+    statements = traced(conn)
+    db.mark_street_in_progress(conn, "Rue A", "T1", "Départ")
+    db.save_checkpoint(conn, "Rue A", "T1", "porte 12")
+    db.mark_street_complete(conn, "Rue A", "T1")
+    db.get_team_streets_status(conn, "T1")
+    assert not [s for s in statements if s.lstrip().upper().startswith("CREATE")]
+    assert sum(s == "COMMIT" for s in statements) == 3
+
+
+def test_existing_database_without_version_table():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE streets (id INTEGER PRIMARY KEY, name TEXT UNIQUE, team TEXT, status TEXT)")
+    conn.execute("CREATE TABLE addresses (id INTEGER PRIMARY KEY, street_name TEXT, house_number TEXT, "
+                 "latitude REAL, longitude REAL)")
+    conn.execute("INSERT INTO streets (name, status) VALUES ('Rue A', 'a_faire')")
+    conn.execute("INSERT INTO addresses (street_name, house_number) VALUES ('Rue A', '1')")
+    conn.commit()
+    assert migrations.migrate(conn) == [v for v, _n, _f in migrations.MIGRATIONS]
+    assert conn.execute("SELECT street_id FROM addresses").fetchone()[0] == 1
+    assert db.progress_global(conn)["total"] == 1
+
+
+def test_no_streets_table_is_left_alone():
+    conn = sqlite3.connect(":memory:")
+    assert migrations.migrate(conn) == []
+    assert migrations.current_version(conn) == 0
+    assert not conn.execute("SELECT name FROM sqlite_master").fetchall()
+
+
+def test_failed_migration_stops_and_is_retried(monkeypatch):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE streets (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    calls = []
+
+    def broken(c):
+        calls.append("broken")
+        raise sqlite3.OperationalError("boom")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [
+        (1, "one", lambda c: c.execute("CREATE TABLE t1 (x)")),
+        (2, "two", broken),
+        (3, "three", lambda c: calls.append("three")),
+    ])
+    assert migrations.migrate(conn) == [1]
+    assert calls == ["broken"]
+    assert migrations.pending(conn) == [(2, "two"), (3, "three")]
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [
+        migrations.MIGRATIONS[0], (2, "two", lambda c: None), migrations.MIGRATIONS[2],
+    ])
+    assert migrations.migrate(conn) == [2, 3]
+
+
+def test_tables_recreated_by_import_are_migrated_again():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.executemany("INSERT INTO streets (name) VALUES (?)", [("Rue A",), ("Rue B",)])
+    conn.execute("INSERT INTO addresses (street_name, house_number, latitude, longitude) "
+                 "VALUES ('Rue B', '1', 45.7, -73.6)")
+    db.add_street_note(conn, "Rue B", "T1", "chien")
+    conn.commit()
+    # Comme import_data.py : tables de base supprimées puis recréées, rues dans un autre ordre
+    conn.executescript("""
+        DROP TABLE streets;
+        DROP TABLE addresses;
+        CREATE TABLE streets (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE,
+                              sector TEXT, team TEXT, status TEXT DEFAULT 'a_faire', notes TEXT);
+        CREATE TABLE addresses (id INTEGER PRIMARY KEY AUTOINCREMENT, street_name TEXT, house_number TEXT,
+                                latitude REAL, longitude REAL, postal_code TEXT);
+        INSERT INTO streets (name) VALUES ('Rue B'), ('Rue C');
+        INSERT INTO addresses (street_name, house_number, latitude, longitude) VALUES ('Rue C', '2', 45.8, -73.5);
+    """)
+    assert "trg_progress_streets_insert" in migrations.missing_structures(conn, migrations.applied_versions(conn))
+
+    assert migrations.migrate(conn) == [v for v, _n, _f in migrations.MIGRATIONS]
+    assert migrations.missing_structures(conn, migrations.applied_versions(conn)) == []
+    assert migrations.migrate(conn) == []
+    # Note reliée à la nouvelle Rue B, compteurs et statistiques recalculés
+    assert conn.execute("SELECT s.name FROM notes n JOIN streets s ON s.id = n.street_id").fetchall() == [("Rue B",)]
+    assert db.progress_global(conn)["total"] == 2
+    assert db.street_address_stats(conn, "Rue C")["address_count"] == 1
+    if spatial.rtree_available(conn):
+        assert conn.execute("SELECT id, ROUND(min_lat, 4) FROM addresses_rtree").fetchall() == [(1, 45.8)]
+    conn.execute("INSERT INTO streets (name) VALUES ('Rue D')")
+    assert db.progress_global(conn)["total"] == 3
+
+
+def test_status_events_rekeyed_after_streets_recreated():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.executemany("INSERT INTO streets (name) VALUES (?)", [("Rue A",), ("Rue B",)])
+    conn.commit()
+    assert db.set_street_status(conn, "Rue B", "terminee", "T1")
+    conn.executescript("""
+        DROP TABLE streets;
+        CREATE TABLE streets (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE,
+                              sector TEXT, team TEXT, status TEXT DEFAULT 'a_faire', notes TEXT);
+        INSERT INTO streets (name) VALUES ('Rue C'), ('Rue D');
+    """)
+    migrations.migrate(conn)
+    # Même id que l'ancienne Rue B, mais pas son historique
+    assert db.street_status_history(conn, "Rue D") == []
+    conn.execute("INSERT INTO streets (name) VALUES ('Rue B')")
+    assert [h["new_status"] for h in db.street_status_history(conn, "Rue B")] == ["terminee"]
+    assert db.rename_street(conn, "Rue B", "Rue Bêta")
+    assert [h["new_status"] for h in db.street_status_history(conn, "Rue Bêta")] == ["terminee"]
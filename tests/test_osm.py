@@ -0,0 +1,73 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from guignomap import geocoding, osm
+from guignomap.db import init_db
+
+
+def points():
+    return pd.DataFrame({
+        "street_name": ["Rue Cantin", "Rue Cantin", "Rue Cantin", "Avenue de l'Étang", "Avenue de l'Étang"],
+        "house_number": ["10", "20", "30", "100", "100"],
+        "postal_code": ["J7K 2L8", "J7K 2L8", None, None, "J7K 2L5"],
+        "latitude": [45.0, 45.2, 45.6, 46.0, 46.0],
+        "longitude": [-73.0, -73.2, -73.6, -74.0, -74.0],
+    })
+
+
+def test_normalize_street_handles_abbreviations_and_particles():
+    assert osm.normalize_street("AV DE L ETANG") == osm.normalize_street("Avenue de l'Étang") == "AVENUE ETANG"
+    assert osm.normalize_street("CH ST-HENRI") == "CHEMIN SAINT HENRI"
+    assert osm.house_number_value("2690A") == 2690
+
+
+def test_lookup_exact_interpolated_and_nearest():
+    index = osm.OfflineGeocoder(points(), official_streets=["Avenue de l'Étang", "Rue Cantin"], max_gap=10)
+    assert index.lookup("10", "RUE CANTIN") == (45.0, -73.0, "J7K 2L8", osm.CONFIDENCE["exact"], "exact")
+
+    lat, lon, cp, _conf, method = index.lookup("14", "Rue Cantin")
+    assert method == "interpolated" and cp == "J7K 2L8"
+    assert lat == pytest.approx(45.08) and lon == pytest.approx(-73.08)
+
+    assert index.lookup("36", "Rue Cantin")[4] == "nearest"
+    assert index.lookup("90", "Rue Cantin") is None
+    assert index.lookup("1", "Rue Inconnue") is None
+    assert index.lookup("100", "AV DE L ETANG")[2] == "J7K 2L5"
+    assert index.canonical_street("av de l'etang") == "Avenue de l'Étang"
+
+
+def test_resolve_pending_leaves_residue_for_remote_providers():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.executemany(
+        "INSERT INTO addresses (street_name, house_number, latitude, longitude) VALUES (?, ?, ?, ?)",
+        [("Rue Cantin", "10", 45.0, -73.0), ("Rue Cantin", "30", 45.6, -73.6),
+         ("Rue Cantin", "20", None, None), ("Rue Cantin", "36", None, None), ("Rue Perdue", "5", None, None)],
+    )
+    conn.commit()
+    index = osm.OfflineGeocoder.from_sources(conn, osm_path=None, official_path=None)
+    result = osm.resolve_pending(conn, index)
+
+    assert (result["resolved"], result["remaining"], result["deferred"]) == (1, 2, 1)
+    assert conn.execute("SELECT latitude FROM addresses WHERE house_number = '20'").fetchone()[0] == pytest.approx(45.3)
+    # Point « le plus proche » : laissé au fournisseur distant, pas noté 'ok'
+    remaining = {(row[1], row[2]) for row in geocoding.pending_addresses(conn)}
+    assert {("36", "Rue Cantin"), ("5", "Rue Perdue")} <= remaining
+    assert result["touched_streets"] == {"Rue Cantin"}
+    assert osm.resolve_pending(conn, index, min_confidence=0.0)["methods"]["nearest"] == 1
+
+
+def test_osm_provider_parses_engine_queries():
+    provider = osm.OsmProvider(osm.OfflineGeocoder(points()))
+    assert provider.geocode(geocoding.address_query("20", "Rue Cantin"))[:2] == (45.2, -73.2)
+    assert provider.geocode("garbage") is None
+    assert provider.geocode(geocoding.address_query("36", "Rue Cantin")) is None
+
+
+def test_bundled_extract_loads():
+    if not osm.OSM_AVAILABLE:
+        pytest.skip("extrait OSM absent")
+    df = osm.load_osm_extract()
+    assert len(df) > 4000 and {"street_name", "house_number", "postal_code"} <= set(df.columns)
@@ -0,0 +1,73 @@
+import csv
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from guignomap import bulk_import, postal_merge
+from guignomap.db import init_db
+
+
+def make_conn():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.executemany(
+        "INSERT INTO addresses (street_name, house_number, code_postal) VALUES (?, ?, ?)",
+        [("Rue Cantin ", "2690", None), ("Rue Cantin", " 12", ""), ("Rue Cantin", "14", "J7K 9Z9")],
+    )
+    conn.commit()
+    return conn
+
+
+def complement():
+    return bulk_import.normalize_civic_frame(pd.DataFrame({
+        "NoCiv": ["2690", "12", "14", "99", "5"],
+        "nomrue": ["Rue Cantin", "Rue Cantin", "Rue Cantin", "Rue Inconnue", "Rue Cantin"],
+        "code_postal_trouve": ["J7K 2L8", "j7k 2l9", "J7K 0A0", "J7L 1A1", "NON TROUVÉ"],
+    }))
+
+
+def test_merge_updates_only_empty_codes_and_reports_unmatched():
+    conn = make_conn()
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = Path(tmp) / "non_matched.csv"
+        report = postal_merge.merge_postal_codes(conn, complement(), report_path=report_path)
+        with open(report_path, encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+
+    assert (report["staged"], report["matched"], report["unmatched"], report["updated"]) == (4, 3, 1, 2)
+    assert dict(conn.execute("SELECT house_number, code_postal FROM addresses").fetchall()) == {
+        "2690": "J7K 2L8", " 12": "J7K 2L9", "14": "J7K 9Z9",
+    }
+    assert rows == [list(postal_merge.REPORT_COLUMNS), ["99", "Rue Inconnue", "J7L 1A1"]]
+
+
+def test_merge_overwrite_and_index_used():
+    conn = make_conn()
+    report = postal_merge.merge_postal_codes(conn, complement(), overwrite=True)
+    assert report["updated"] == 3
+    assert conn.execute("SELECT code_postal FROM addresses WHERE house_number = '14'").fetchone()[0] == "J7K 0A0"
+
+    plan = conn.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT 1 FROM postal_stage WHERE EXISTS (
+            SELECT 1 FROM addresses a
+            WHERE TRIM(a.street_name) = postal_stage.street_name
+              AND TRIM(a.house_number) = postal_stage.house_number)
+    """).fetchall()
+    assert any(postal_merge.MERGE_INDEX in row[-1] for row in plan)
+
+
+def test_variant_street_spellings_matched_through_streets_table():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.execute("INSERT INTO streets (name) VALUES ('Avenue de l''Étang')")
+    conn.execute("INSERT INTO addresses (street_name, house_number) VALUES ('Avenue de l''Étang', '974')")
+    conn.commit()
+    df = bulk_import.normalize_civic_frame(pd.DataFrame({
+        "NoCiv": ["974"], "nomrue": ["AV DE L ETANG"], "code_postal": ["J7K 1A1"],
+    }))
+    report = postal_merge.merge_postal_codes(conn, df)
+    assert (report["matched"], report["updated"]) == (1, 1)
+    assert conn.execute("SELECT code_postal FROM addresses").fetchone()[0] == "J7K 1A1"
@@ -0,0 +1,60 @@
+import sqlite3
+
+from guignomap import db
+from guignomap.db import init_db
+
+
+def setup_db():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    sector_id = conn.execute("INSERT INTO sectors (name) VALUES ('Nord')").lastrowid
+    conn.executemany("INSERT INTO streets (name, team, status, sector_id) VALUES (?, ?, ?, ?)", [
+        ("Rue A", "EQ1", "terminee", sector_id),
+        ("Rue B", "EQ1", "en_cours", sector_id),
+        ("Rue C", "EQ2", "a_faire", None),
+        ("Rue D", None, "a_faire", None),
+    ])
+    conn.commit()
+    return conn, sector_id
+
+
+def test_triggers_follow_inserts_updates_and_deletes():
+    conn, sector_id = setup_db()
+    assert db.progress_global(conn) == {"a_faire": 2, "en_cours": 1, "terminee": 1, "total": 4}
+    assert db.progress_for_team(conn, "EQ1")["total"] == 2
+    assert db.progress_for_team(conn, None)["total"] == 1
+
+    conn.execute("UPDATE streets SET status = 'terminee' WHERE name = 'Rue B'")
+    conn.execute("UPDATE streets SET team = 'EQ2', sector_id = ? WHERE name = 'Rue D'", (sector_id,))
+    conn.execute("DELETE FROM streets WHERE name = 'Rue C'")
+    conn.commit()
+
+    assert db.progress_global(conn) == {"a_faire": 1, "en_cours": 0, "terminee": 2, "total": 3}
+    assert db.progress_by_team(conn) == {
+        "EQ1": {"a_faire": 0, "en_cours": 0, "terminee": 2, "total": 2},
+        "EQ2": {"a_faire": 1, "en_cours": 0, "terminee": 0, "total": 1},
+    }
+    assert db.progress_by_sector(conn)[str(sector_id)]["total"] == 3
+    assert db.progress_for_team(conn, "")["total"] == 0
+    assert db.check_progress_counters(conn, repair=False) == []
+
+
+def test_check_detects_drift_and_rebuilds():
+    conn, _ = setup_db()
+    conn.execute("UPDATE progress_counters SET n = 10 WHERE scope = 'global' AND status = 'a_faire'")
+    conn.commit()
+    diffs = db.check_progress_counters(conn)
+    assert diffs == [("global", "", "a_faire", 10, 2)]
+    assert db.check_progress_counters(conn) == []
+    assert db.progress_global(conn)["total"] == 4
+
+
+def test_text_sector_schema_from_import_script():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE streets (id INTEGER PRIMARY KEY, name TEXT UNIQUE, sector TEXT, team TEXT, status TEXT DEFAULT 'a_faire')")
+    conn.executemany("INSERT INTO streets (name, sector) VALUES (?, ?)", [("Rue A", "J7K"), ("Rue B", "J7L")])
+    db.init_progress_counters(conn)
+    assert db.progress_by_sector(conn)["J7K"]["a_faire"] == 1
+    conn.execute("UPDATE streets SET sector = 'J7K' WHERE name = 'Rue B'")
+    assert db.progress_by_sector(conn)["J7K"]["total"] == 2
+    assert db.check_progress_counters(conn, repair=False) == []
@@ -0,0 +1,72 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from guignomap import geometry, publish
+from guignomap.db import init_db
+from guignomap.db_pool import ConnectionPool
+
+
+def make_pool(tmp):
+    pool = ConnectionPool(Path(tmp) / "pub.db")
+    with pool.writer() as w:
+        init_db(w)
+        geometry.init_street_geometry_schema(w)
+        w.executemany("INSERT INTO streets (name, team, status) VALUES (?, ?, ?)", [
+            ("Rue Cantin", "EQ1", "terminee"),
+            ("Avenue Dupuis", None, "a_faire"),
+        ])
+        w.executemany(
+            "INSERT INTO addresses (street_name, house_number, latitude, longitude) VALUES (?, ?, ?, ?)",
+            [("Rue Cantin", "1", 45.750, -73.610), ("Rue Cantin", "3", 45.752, -73.612),
+             ("Avenue Dupuis", "10", 45.760, -73.590)],
+        )
+        geometry.refresh_street_geometry(w)
+    return pool
+
+
+def test_publish_writes_geojson_and_skips_unchanged_content():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp)
+        out = Path(tmp) / "public"
+        first = publish.publish_public_map(pool.reader(), out)
+        assert first["changed"] and first["streets"] == 2
+
+        data = json.loads((out / publish.STREETS_FILE).read_text(encoding="utf-8"))
+        codes = {f["properties"]["rue"]: f["properties"]["c"] for f in data["features"]}
+        assert codes == {"Rue Cantin": 2, "Avenue Dupuis": 3}
+        summary = publish.read_summary(out)
+        assert summary["etag"] == first["etag"] and summary["stats"]["terminee"] == 1
+        assert publish.public_map_url(summary, "guigno/").endswith(f"/guigno/app/static/public/streets.json?v={first['etag']}")
+
+        assert not publish.publish_public_map(pool.reader(), out)["changed"]
+        with pool.writer() as w:
+            w.execute("UPDATE streets SET status = 'en_cours' WHERE name = 'Avenue Dupuis'")
+        second = publish.publish_public_map(pool.reader(), out)
+        assert second["changed"] and second["etag"] != first["etag"]
+        assert publish.read_summary(out)["stats"]["en_cours"] == 1
+        pool.close()
+
+
+def test_publisher_coalesces_notifications():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp)
+        out = Path(tmp) / "public"
+        publisher = publish.PublicMapPublisher(pool, out, delay=0.2)
+        publisher.flush()
+        etag = publish.read_summary(out)["etag"]
+        for status in ("en_cours", "terminee"):
+            with pool.writer() as w:
+                w.execute("UPDATE streets SET status = ? WHERE name = 'Avenue Dupuis'", (status,))
+            publisher.notify()
+        assert publisher.pending()
+        deadline = time.monotonic() + 5
+        while publisher.pending() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        publisher.close()
+        stats = publisher.stats()
+        assert stats["notifications"] == 2 and stats["publications"] == 2  # flush initial + 1 regroupée
+        assert publish.read_summary(out)["etag"] != etag
+        assert publish.read_summary(out)["stats"]["terminee"] == 2
+        pool.close()
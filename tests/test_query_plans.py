@@ -0,0 +1,200 @@
+"""
+Non-régression des plans de requêtes (EXPLAIN QUERY PLAN).
+
+Toutes les requêtes SQL littérales d'app.py et db.py (hors f-strings, construites
+à l'exécution) sont extraites (ast) et préparées sur un schéma complet : aucune
+ne doit lire une table entière
+(« SCAN t » sans index) sauf celles de FULL_SCAN_ALLOWED, qui lisent
+volontairement toute la table (exports, listes complètes, reconstruction).
+Les requêtes fréquentes ont en plus un plan attendu précis (HOT_QUERY_PLANS),
+y compris les écritures en lot construites par f-string (formes rendues).
+"""
+import ast
+import re
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from guignomap import db, geometry
+from guignomap.db import init_db
+
+ROOT = Path(__file__).resolve().parent.parent / "guignomap"
+SOURCES = ("app.py", "db.py")
+SQL_START = re.compile(r"^\s*(SELECT|UPDATE|DELETE|INSERT|WITH)\b", re.IGNORECASE)
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+# (fichier, fonction) -> raison : lectures complètes voulues
+FULL_SCAN_ALLOWED = {
+    ("app.py", "db_stats_by_team"): "liste des équipes (quelques dizaines de lignes)",
+    ("app.py", "page_gestionnaire"): "export complet rues / adresses",
+    ("db.py", "list_streets"): "liste complète des rues",
+    ("db.py", "get_all_teams"): "liste des équipes",
+    ("db.py", "get_teams_list"): "liste des équipes",
+    ("db.py", "get_assignations_export_data"): "export complet des assignations",
+    ("db.py", "export_notes_csv"): "export complet des notes",
+    ("db.py", "init_progress_counters"): "test de table vide (LIMIT 1)",
+    ("db.py", "check_progress_counters"): "lecture complète des compteurs (contrôle)",
+    ("db.py", "init_query_indexes"): "sqlite_master",
+    ("db.py", "init_unified_status"): "reprise unique de l'ancienne table street_status",
+    ("db.py", "_is_view"): "sqlite_master",
+    ("db.py", "_has_trigger"): "sqlite_master",
+}
+
+# Requêtes de migration écrites pour l'ancien schéma (street_status table), devenu une vue
+LEGACY_SCHEMA_ONLY = {
+    ("db.py", "_migrate_checkpoint_notes"),
+}
+
+
+def discover_queries():
+    """[(fichier, fonction, ligne, sql)] pour chaque littéral SQL complet."""
+    found = []
+    for name in SOURCES:
+        tree = ast.parse((ROOT / name).read_text(encoding="utf-8"))
+
+        def visit(node, func):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    visit(child, child.name)
+                elif isinstance(child, ast.JoinedStr):
+                    continue  # f-strings : SQL construit à l'exécution
+
+                elif isinstance(child, ast.Constant) and isinstance(child.value, str):
+                    if SQL_START.match(child.value):
+                        found.append((name, func, child.lineno, child.value.strip()))
+                else:
+                    visit(child, func)
+
+        visit(tree, "<module>")
+    return found
+
+
+@pytest.fixture(scope="module")
+def conn():
+    c = sqlite3.connect(":memory:")
+    init_db(c)
+    geometry.init_street_geometry_schema(c)
+    yield c
+    c.close()
+
+
+def plan(conn, sql):
+    named = re.findall(r":(\w+)", sql)
+    params = dict.fromkeys(named) if named else [None] * sql.count("?")
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+def test_queries_are_discovered():
+    queries = discover_queries()
+    assert len(queries) > 40
+    funcs = {(f, fn) for f, fn, _, _ in queries}
+    stale = set(FULL_SCAN_ALLOWED) - funcs
+    assert not stale, f"Entrées FULL_SCAN_ALLOWED sans requête : {stale}"
+
+
+def test_no_unexpected_full_scans(conn):
+    failures = []
+    for name, func, line, sql in discover_queries():
+        if (name, func) in LEGACY_SCHEMA_ONLY:
+            continue
+        try:
+            details = plan(conn, sql)
+        except sqlite3.OperationalError as e:
+            # Fragments de requête assemblés à l'exécution (ex. base_query + " WHERE ...")
+            if "incomplete input" in str(e):
+                continue
+            failures.append(f"{name}:{line} {func}: {e}")
+            continue
+        scans = [d for d in details if FULL_SCAN.match(d)]
+        if scans and (name, func) not in FULL_SCAN_ALLOWED:
+            failures.append(f"{name}:{line} {func}: {scans}")
+    assert not failures, "\n".join(failures)
+
+
+HOT_QUERY_PLANS = [
+    # db_assigned_streets : rues de l'équipe et leur nombre d'adresses précalculé
+    ("""SELECT name as rue, status, address_count as nb_adresses FROM streets WHERE team = ?
+        ORDER BY CASE status WHEN 'en_cours' THEN 0 WHEN 'a_faire' THEN 1 ELSE 2 END, name""",
+     ["SEARCH streets USING INDEX idx_streets_team_status (team=?)"]),
+    # jointure streets -> addresses (adresses d'une rue, clé entière)
+    ("SELECT s.name, a.house_number FROM streets s JOIN addresses a ON a.street_id = s.id WHERE s.team = ?",
+     ["SEARCH a USING INDEX idx_addresses_street_id (street_id=?)"]),
+    # get_addresses_for_street
+    ("SELECT house_number FROM addresses WHERE street_id = (SELECT id FROM streets WHERE name = ?)",
+     ["SEARCH addresses USING INDEX idx_addresses_street_id (street_id=?)"]),
+    # db_last_checkpoint : dernière note d'une équipe, sans tri
+    ("SELECT street_name FROM notes WHERE team_id = ? ORDER BY created_at DESC LIMIT 1",
+     ["SEARCH notes USING COVERING INDEX idx_notes_team_created (team_id=?)"]),
+    # get_visited_addresses_for_street
+    ("SELECT address_number FROM notes WHERE street_id = (SELECT id FROM streets WHERE name = ?) "
+     "AND team_id = ? AND comment = 'Visitée'",
+     ["SEARCH notes USING COVERING INDEX idx_notes_street_id_team (street_id=? AND team_id=? AND comment=?)"]),
+    # mark_address_visited
+    ("SELECT id FROM notes WHERE street_id = (SELECT id FROM streets WHERE name = ?) "
+     "AND address_number = ? AND team_id = ? AND comment = 'Visitée'",
+     ["SEARCH notes USING COVERING INDEX idx_notes_street_id_team "
+      "(street_id=? AND team_id=? AND comment=? AND address_number=?)"]),
+    # assignation par secteur
+    ("SELECT name FROM streets WHERE (team IS NULL OR team='') AND sector_id = ? ORDER BY name",
+     ["SEARCH streets USING INDEX idx_streets_sector_team (sector_id=?)"]),
+    # get_street_checkpoints : page suivante du journal, dans l'ordre de l'index
+    ("""SELECT id, street_name, team_id, note, created_at FROM street_checkpoints
+            WHERE street_id = (SELECT id FROM streets WHERE name = ?) AND (created_at, id) < (?, ?)
+            ORDER BY created_at DESC, id DESC LIMIT ?""",
+     ["SEARCH street_checkpoints USING INDEX idx_street_checkpoints_street_id (street_id=? AND created_at<?)"]),
+    # street_status_history : transitions d'une rue, plus récentes d'abord
+    ("""SELECT e.id, e.old_status, e.new_status, e.team_id, e.note, e.created_at
+        FROM street_status_events e
+        WHERE e.street_id = (SELECT id FROM streets WHERE name = ?)
+        ORDER BY e.id DESC LIMIT ?""",
+     ["SEARCH e USING INDEX idx_status_events_street (street_id=?)"]),
+    # compteurs d'avancement
+    ("SELECT status, n FROM progress_counters WHERE scope = 'team' AND key = ?",
+     ["SEARCH progress_counters USING PRIMARY KEY (scope=? AND key=?)"]),
+    # Écritures en lot (f-strings : formes rendues). set_street_status / set_streets_status
+    *[(sql, ["SEARCH streets USING INDEX sqlite_autoindex_streets_1 (name=?)"])
+      for only_from in (None, "a_faire") for sql in db._status_statements(only_from)],
+    # _changing_names : rues qui changent, lues par paquets avant le lot
+    ("SELECT name FROM streets WHERE name IN (?,?,?) AND status IS NOT ?",
+     ["SEARCH streets USING INDEX sqlite_autoindex_streets_1 (name=?)"]),
+    ("SELECT name FROM streets WHERE name IN (?,?,?) AND team IS NOT NULLIF(?, '')",
+     ["SEARCH streets USING INDEX sqlite_autoindex_streets_1 (name=?)"]),
+    ("SELECT name FROM streets WHERE name IN (?,?,?) AND team IS NOT NULLIF(?, '') AND (team IS NULL OR team = '')",
+     ["SEARCH streets USING INDEX sqlite_autoindex_streets_1 (name=?)"]),
+    # assign_streets
+    ("UPDATE streets SET team = NULLIF(?, '') WHERE name = ? AND team IS NOT NULLIF(?, '')",
+     ["SEARCH streets USING INDEX sqlite_autoindex_streets_1 (name=?)"]),
+    ("UPDATE streets SET team = NULLIF(?, '') WHERE name = ? AND team IS NOT NULLIF(?, '') "
+     "AND (team IS NULL OR team = '')",
+     ["SEARCH streets USING INDEX sqlite_autoindex_streets_1 (name=?)"]),
+    # reassign_sector
+    ("SELECT name FROM streets WHERE sector_id = ? ORDER BY name",
+     ["SEARCH streets USING INDEX idx_streets_sector_team (sector_id=?)"]),
+    ("SELECT name FROM streets WHERE sector_id = ? AND (team IS NULL OR team = '') ORDER BY name",
+     ["SEARCH streets USING INDEX idx_streets_sector_team (sector_id=?)"]),
+]
+
+
+@pytest.mark.parametrize("sql,expected", HOT_QUERY_PLANS)
+def test_hot_query_plans(conn, sql, expected):
+    details = plan(conn, sql)
+    for step in expected:
+        assert any(d.startswith(step) for d in details), details
+    if "LIMIT" in sql:
+        # Top-N servi dans l'ordre de l'index, sans tri
+        assert "USE TEMP B-TREE FOR ORDER BY" not in details, details
+
+
+def test_query_indexes_replace_single_column_ones():
+    c = sqlite3.connect(":memory:")
+    c.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, street_name TEXT, team_id TEXT, address_number TEXT, "
+              "comment TEXT, created_at TIMESTAMP)")
+    c.execute("CREATE INDEX idx_notes_street ON notes(street_name)")
+    # sans street_id (init_street_keys pas encore passé) : index sur la clé entière ignoré
+    assert db.init_query_indexes(c) == ["idx_notes_team_created"]
+    c.execute("ALTER TABLE notes ADD COLUMN street_id INTEGER")
+    assert db.init_query_indexes(c) == ["idx_notes_street_id_team"]
+    names = {r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_notes_street" not in names
+    assert db.init_query_indexes(c) == []
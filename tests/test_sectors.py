@@ -0,0 +1,128 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from guignomap import sectors
+from guignomap.db import init_db
+
+
+def blobs():
+    # Trois quartiers bien séparés, de même charge
+    rng = np.random.default_rng(1)
+    centres = [(45.70, -73.60), (45.75, -73.65), (45.80, -73.55)]
+    lats = np.concatenate([c[0] + rng.normal(0, 0.002, 30) for c in centres])
+    lons = np.concatenate([c[1] + rng.normal(0, 0.002, 30) for c in centres])
+    return lats, lons, np.full(90, 10)
+
+
+def test_separated_neighbourhoods_are_recovered():
+    lats, lons, w = blobs()
+    labels = sectors.balanced_kmeans(lats, lons, w, 3)
+    assert [len(set(labels[i:i + 30])) for i in (0, 30, 60)] == [1, 1, 1]
+    assert len(set(labels)) == 3
+    assert np.array_equal(labels, sectors.balanced_kmeans(lats, lons, w, 3))
+
+
+def test_loads_stay_balanced():
+    rng = np.random.default_rng(3)
+    lats, lons = 45.74 + rng.random(1000) * 0.08, -73.66 + rng.random(1000) * 0.12
+    w = rng.integers(1, 60, 1000)
+    for k in (4, 10):
+        loads = np.bincount(sectors.balanced_kmeans(lats, lons, w, k, tolerance=0.1), weights=w)
+        assert len(loads) == k
+        assert loads.max() <= 1.1 * loads.mean()
+        assert loads.min() >= 0.85 * loads.mean()
+
+
+def test_edge_cases():
+    assert sectors.balanced_kmeans([], [], [], 3).size == 0
+    assert sectors.balanced_kmeans([45.7, 45.8], [-73.6, -73.6], [5, 5], 5).tolist() in ([0, 1], [1, 0])
+
+
+def make_conn():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    lats, lons, _w = blobs()
+    conn.executemany("INSERT INTO streets (name) VALUES (?)", [(f"Rue {i}",) for i in range(91)])
+    conn.executemany(
+        "INSERT INTO addresses (street_name, house_number, latitude, longitude) VALUES (?, ?, ?, ?)",
+        [(f"Rue {i}", str(n), lat, lon) for i, (lat, lon) in enumerate(zip(lats, lons)) for n in (1, 2)],
+    )
+    conn.execute("INSERT INTO addresses (street_name, house_number) VALUES ('Rue 90', '1')")
+    conn.commit()
+    return conn
+
+
+def test_generate_writes_sectors_in_one_commit(traced):
+    conn = make_conn()
+    statements = traced(conn)
+    result = sectors.generate_sectors(conn, 3)
+    assert sum(s == "COMMIT" for s in statements) == 1
+    # Nombre d'adresses et centroïdes lus sur streets, sans agrégat sur addresses
+    assert not [s for s in statements if "FROM addresses" in s]
+    assert result["assigned"] == 90 and result["unplaced"] == ["Rue 90"] and result["removed"] == []
+    # Nommés du nord au sud
+    assert [s["name"] for s in result["sectors"]] == ["Secteur 1", "Secteur 2", "Secteur 3"]
+    assert [s["streets"] for s in result["sectors"]] == [30, 30, 30]
+    assert result["sectors"][0]["center_lat"] > result["sectors"][-1]["center_lat"]
+    rows = conn.execute("""
+        SELECT c.name, COUNT(*) FROM streets s JOIN sectors c ON c.id = s.sector_id GROUP BY c.name
+    """).fetchall()
+    assert sorted(rows) == [("Secteur 1", 30), ("Secteur 2", 30), ("Secteur 3", 30)]
+    assert conn.execute("SELECT sector_id FROM streets WHERE name = 'Rue 90'").fetchone() == (None,)
+
+
+def sector_sizes(conn):
+    return dict(conn.execute("""
+        SELECT c.name, COUNT(s.id) FROM sectors c LEFT JOIN streets s ON s.sector_id = c.id GROUP BY c.id
+    """).fetchall())
+
+
+def test_new_streets_join_nearest_existing_sector():
+    conn = make_conn()
+    sectors.generate_sectors(conn, 3)
+    before = dict(conn.execute("SELECT name, sector_id FROM streets").fetchall())
+    # Rues du 2e quartier redevenues sans secteur : elles rejoignent leur ancien secteur
+    conn.execute("UPDATE streets SET sector_id = NULL WHERE id BETWEEN 31 AND 40")
+    result = sectors.generate_sectors(conn, 3)
+    assert result["assigned"] == 10 and len(result["sectors"]) == 1
+    assert result["sectors"][0]["streets"] == 10 and result["sectors"][0]["name"] == "Secteur 2"
+    assert dict(conn.execute("SELECT name, sector_id FROM streets").fetchall()) == before
+    assert sorted(sector_sizes(conn).values()) == [30, 30, 30]
+
+
+def test_existing_sectors_kept_unless_overwrite():
+    conn = make_conn()
+    conn.execute("INSERT INTO sectors (id, name) VALUES (99, 'Manuel')")
+    conn.execute("UPDATE streets SET sector_id = 99 WHERE id <= 30")
+    conn.execute("INSERT INTO sectors (name) VALUES ('Vide')")
+    conn.commit()
+    # Un seul secteur existant : toutes les rues sans secteur le rejoignent
+    assert sectors.generate_sectors(conn, 5)["assigned"] == 60
+    assert sector_sizes(conn) == {"Manuel": 90, "Vide": 0}
+
+    result = sectors.generate_sectors(conn, 3, overwrite=True)
+    assert result["assigned"] == 90 and result["removed"] == ["Manuel"]
+    # k plus petit : les secteurs vidés par le redécoupage sont supprimés, pas les autres
+    result = sectors.generate_sectors(conn, 2, overwrite=True)
+    assert result["removed"] == ["Secteur 3"]
+    sizes = sector_sizes(conn)
+    assert sorted(sizes) == ["Secteur 1", "Secteur 2", "Vide"]
+    assert sizes["Secteur 1"] + sizes["Secteur 2"] == 90 and sizes["Vide"] == 0
+
+
+def test_import_schema_stores_sector_name():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE streets (id INTEGER PRIMARY KEY, name TEXT UNIQUE, sector TEXT)")
+    conn.execute("CREATE TABLE addresses (id INTEGER PRIMARY KEY, street_name TEXT, latitude REAL, longitude REAL)")
+    conn.executemany("INSERT INTO streets (name) VALUES (?)", [("Rue A",), ("Rue B",)])
+    conn.executemany("INSERT INTO addresses (street_name, latitude, longitude) VALUES (?, ?, ?)",
+                     [("Rue A", 45.80, -73.6), ("Rue B", 45.70, -73.6)])
+    result = sectors.generate_sectors(conn, 2, prefix="Zone")
+    assert [s["id"] for s in result["sectors"]] == [None, None]
+    assert conn.execute("SELECT name, sector FROM streets ORDER BY name").fetchall() == [
+        ("Rue A", "Zone 1"), ("Rue B", "Zone 2"),
+    ]
+    with pytest.raises(ValueError):
+        sectors.generate_sectors(sqlite3.connect(":memory:"), 2)
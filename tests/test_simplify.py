@@ -0,0 +1,40 @@
+import numpy as np
+
+from guignomap import simplify
+
+
+def test_collinear_points_collapse_to_endpoints():
+    pts = [[45.75, -73.60 + i * 1e-4] for i in range(20)]
+    out = simplify.simplify_line(pts, 1.0)
+    assert out.tolist() == [pts[0], pts[-1]]
+
+
+def test_corner_is_kept_and_small_noise_dropped():
+    # L : 10 points vers l'est puis 10 vers le nord, bruit ~0,5 m
+    rng = np.random.default_rng(0)
+    east = [[45.75, -73.60 + i * 1e-4] for i in range(10)]
+    north = [[45.75 + i * 1e-4, -73.60 + 9e-4] for i in range(1, 10)]
+    pts = np.array(east + north) + rng.normal(0, 5e-6, (19, 2))
+    out = simplify.simplify_line(pts, 3.0)
+    assert len(out) == 3
+    assert (out[0] == pts[0]).all() and (out[-1] == pts[-1]).all()
+    assert (out[1] == pts[9]).all()
+    # Tolérance nulle : géométrie inchangée
+    assert len(simplify.simplify_line(pts, 0)) == 19
+
+
+def test_levels_are_monotonic():
+    rng = np.random.default_rng(1)
+    pts = np.column_stack((45.75 + np.cumsum(rng.normal(0, 1e-4, 200)),
+                           -73.60 + np.arange(200) * 1e-4))
+    levels = simplify.simplify_levels(pts)
+    sizes = [len(levels[t]) for t in simplify.LOD_TOLERANCES_M]
+    assert sizes == sorted(sizes, reverse=True)
+    assert sizes[0] < 200
+
+
+def test_tolerance_for_zoom():
+    assert simplify.tolerance_for_zoom(18) == 0.0
+    assert simplify.tolerance_for_zoom(15) == 3.0
+    assert simplify.tolerance_for_zoom(13) == 8.0
+    assert simplify.tolerance_for_zoom(10) == max(simplify.LOD_TOLERANCES_M)
@@ -0,0 +1,82 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from guignomap import spatial
+from guignomap.db import init_db
+
+
+def make_conn(with_rtree=True):
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    rng = np.random.default_rng(1)
+    lats = 45.70 + rng.random(400) * 0.08
+    lons = -73.66 + rng.random(400) * 0.08
+    conn.executemany(
+        "INSERT INTO addresses (street_name, house_number, latitude, longitude) VALUES (?, ?, ?, ?)",
+        [(f"Rue {i % 20}", str(i), float(la), float(lo)) for i, (la, lo) in enumerate(zip(lats, lons))],
+    )
+    conn.execute("INSERT INTO addresses (street_name, house_number) VALUES ('Rue Sans GPS', '1')")
+    conn.commit()
+    if with_rtree:
+        assert spatial.init_spatial_schema(conn)
+    return conn
+
+
+def brute_force(conn, lat, lon):
+    rows = conn.execute("SELECT id, latitude, longitude FROM addresses WHERE latitude IS NOT NULL").fetchall()
+    d = spatial.haversine_m(lat, lon, [r[1] for r in rows], [r[2] for r in rows])
+    return [rows[i][0] for i in np.argsort(d, kind="stable")]
+
+
+def test_index_is_populated_and_kept_in_sync():
+    conn = make_conn()
+    assert conn.execute("SELECT COUNT(*) FROM addresses_rtree").fetchone()[0] == 400
+    conn.execute("UPDATE addresses SET latitude = 45.0, longitude = -73.0 WHERE street_name = 'Rue Sans GPS'")
+    conn.execute("DELETE FROM addresses WHERE id = 1")
+    conn.execute("UPDATE addresses SET latitude = NULL WHERE id = 2")
+    assert conn.execute("SELECT COUNT(*) FROM addresses_rtree").fetchone()[0] == 399
+    assert [r[1] for r in spatial.points_in_bbox(conn, 44.99, -73.01, 45.01, -72.99)] == ["Rue Sans GPS"]
+
+
+def test_bbox_matches_plain_filter():
+    conn = make_conn()
+    box = (45.72, -73.64, 45.75, -73.61)
+    got = {r[0] for r in spatial.points_in_bbox(conn, *box)}
+    expected = {r[0] for r in conn.execute(
+        "SELECT id FROM addresses WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?",
+        (box[0], box[2], box[1], box[3]))}
+    assert got == expected and spatial.count_in_bbox(conn, *box) == len(expected)
+
+
+@pytest.mark.parametrize("with_rtree", [True, False])
+def test_nearest_matches_brute_force(with_rtree):
+    conn = make_conn(with_rtree)
+    got = spatial.nearest_addresses(conn, 45.74, -73.62, n=7, start_radius_m=50)
+    assert [r[0] for r in got] == brute_force(conn, 45.74, -73.62)[:7]
+    assert all(a[-1] <= b[-1] for a, b in zip(got, got[1:]))
+
+
+def test_streets_within_radius():
+    conn = make_conn()
+    streets = spatial.streets_within_radius(conn, 45.74, -73.62, 500)
+    rows = conn.execute("SELECT street_name, latitude, longitude FROM addresses WHERE latitude IS NOT NULL").fetchall()
+    d = spatial.haversine_m(45.74, -73.62, [r[1] for r in rows], [r[2] for r in rows])
+    assert {s for s, _d, _n in streets} == {rows[i][0] for i in np.flatnonzero(d <= 500)}
+    assert [s[1] for s in streets] == sorted(s[1] for s in streets)
+
+
+def test_address_location_then_nearby_streets_use_the_index(traced):
+    conn = make_conn()
+    lat, lon = conn.execute("SELECT latitude, longitude FROM addresses WHERE house_number = '5'").fetchone()
+    assert spatial.address_location(conn, "Rue 5", "5") == (lat, lon)
+    centre = spatial.address_location(conn, "Rue 5", "inconnu")
+    assert centre == pytest.approx(conn.execute(
+        "SELECT AVG(latitude), AVG(longitude) FROM addresses WHERE street_name = 'Rue 5'").fetchone())
+    assert spatial.address_location(conn, "Rue Sans GPS") is None
+
+    statements = traced(conn)
+    near = spatial.streets_within_radius(conn, lat, lon, 300)
+    assert near[0][:2] == ("Rue 5", 0.0)
+    assert any("addresses_rtree" in s for s in statements)
@@ -0,0 +1,58 @@
+import sqlite3
+
+import pandas as pd
+
+from guignomap import bulk_import, db
+from guignomap.db import init_db
+
+
+def setup_db():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.executemany("INSERT INTO streets (name) VALUES (?)", [("Rue A",), ("Rue B",)])
+    conn.executemany(
+        "INSERT INTO addresses (street_name, house_number, latitude, longitude) VALUES (?, ?, ?, ?)",
+        [("Rue A", "1", 45.70, -73.60), ("Rue A", "3", 45.72, -73.62), ("Rue A", "5", None, None),
+         ("Rue B", "10", 45.80, -73.50)],
+    )
+    conn.commit()
+    return conn
+
+
+def test_triggers_keep_counts_and_bbox_exact():
+    conn = setup_db()
+    a = db.street_address_stats(conn, "Rue A")
+    assert a["address_count"] == 3
+    assert (a["min_lat"], a["max_lat"], a["min_lon"], a["max_lon"]) == (45.70, 45.72, -73.62, -73.60)
+    assert abs(a["center_lat"] - 45.71) < 1e-9
+
+    # Suppression de l'extrême : la boîte se resserre (recalcul, pas seulement un élargissement)
+    conn.execute("DELETE FROM addresses WHERE street_name = 'Rue A' AND house_number = '3'")
+    conn.execute("UPDATE addresses SET latitude = 45.75, longitude = -73.55 WHERE house_number = '5'")
+    conn.execute("UPDATE addresses SET street_name = 'Rue A' WHERE house_number = '10'")
+    a, b = db.street_address_stats(conn, "Rue A"), db.street_address_stats(conn, "Rue B")
+    assert a["address_count"] == 3 and a["max_lat"] == 45.80 and a["min_lon"] == -73.60
+    assert b["address_count"] == 0 and b["min_lat"] is None
+    assert db.street_address_stats(conn, "Rue X") is None
+
+
+def test_columns_added_to_existing_table_and_bulk_load_refreshes():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE streets (id INTEGER PRIMARY KEY, name TEXT UNIQUE, team TEXT, status TEXT)")
+    conn.execute("CREATE TABLE addresses (id INTEGER PRIMARY KEY, street_name TEXT, house_number TEXT, "
+                 "latitude REAL, longitude REAL)")
+    conn.execute("INSERT INTO streets (name) VALUES ('Rue A')")
+    conn.execute("INSERT INTO addresses (street_name, house_number) VALUES ('Rue A', '1')")
+    db.init_street_address_stats(conn)
+    assert db.street_address_stats(conn, "Rue A")["address_count"] == 1
+
+    df = pd.DataFrame({
+        "street_name": ["Rue A", "Rue A", "Rue C"], "house_number": ["1", "2", "9"],
+        "postal_code": [pd.NA] * 3, "latitude": [45.7, 45.8, None], "longitude": [-73.6, -73.7, None],
+    })
+    bulk_import.bulk_load(conn, df, replace=True, osm_type=None)
+    assert db.street_address_stats(conn, "Rue A")["address_count"] == 2
+    assert db.street_address_stats(conn, "Rue C")["address_count"] == 1
+    # Triggers rétablis après le chargement
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert {f"{db.STREET_STATS_TRIGGER_PREFIX}{s}" for s in ("insert", "delete", "update")} <= names
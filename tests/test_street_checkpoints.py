@@ -0,0 +1,127 @@
+import sqlite3
+
+from guignomap import db, migrations
+from guignomap.db import init_db
+
+
+def make_conn():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.executemany("INSERT INTO streets (name) VALUES (?)", [("Rue A",), ("Rue B",)])
+    conn.commit()
+    return conn
+
+
+def test_save_appends_rows_and_keeps_pointer():
+    conn = make_conn()
+    for i in range(5):
+        db.save_checkpoint(conn, "Rue A", "T1", f"porte {i}")
+    row = conn.execute("SELECT status, last_checkpoint FROM streets WHERE name = 'Rue A'").fetchone()
+    assert row == ("en_cours", "porte 4")
+    assert db.count_street_checkpoints(conn, "Rue A") == 5
+
+    # Statut courant conservé
+    db.mark_street_complete(conn, "Rue A", "T1")
+    db.save_checkpoint(conn, "Rue A", "T1", "retour")
+    assert db.get_street_state(conn, "Rue A")["status"] == "terminee"
+
+
+def test_unknown_street_is_not_created():
+    conn = make_conn()
+    assert not db.save_checkpoint(conn, "Typo Street", "T1", "porte 1")
+    assert not db.mark_street_in_progress(conn, "Typo Street", "T1", "Départ")
+    assert not db.mark_street_complete(conn, "Typo Street", "T1")
+    assert db.get_street_state(conn, "Typo Street") is None
+    assert conn.execute("SELECT COUNT(*) FROM street_checkpoints").fetchone() == (0,)
+    assert db.progress_global(conn)["total"] == 2
+
+
+def test_pagination_newest_first():
+    conn = make_conn()
+    conn.executemany(
+        "INSERT INTO street_checkpoints (street_name, team_id, note, created_at) VALUES (?, 'T1', ?, ?)",
+        [("Rue A", f"n{i}", f"2025-09-01T10:00:{i // 2:02d}") for i in range(7)] + [("Rue B", "x", "2025-09-02")],
+    )
+    seen, before = [], None
+    while True:
+        page = db.get_street_checkpoints(conn, "Rue A", limit=3, before=before)
+        if not page:
+            break
+        seen += [r["note"] for r in page]
+        before = (page[-1]["created_at"], page[-1]["id"])
+    assert seen == [f"n{i}" for i in reversed(range(7))]
+
+
+def test_legacy_notes_blob_migrated():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE streets (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    conn.execute("INSERT INTO streets (name) VALUES ('Rue A')")
+    conn.execute("""
+        CREATE TABLE street_status (id INTEGER PRIMARY KEY, street_name TEXT UNIQUE, team_id TEXT,
+            status TEXT DEFAULT 'a_faire', last_checkpoint TEXT, notes TEXT, completed_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)
+    """)
+    conn.execute(
+        "INSERT INTO street_status (street_name, team_id, status, last_checkpoint, notes) VALUES (?, ?, ?, ?, ?)",
+        ("Rue A", "T1", "en_cours", "fin\nsuite",
+         "[2025-09-01T10:00:00] T1: début\n[2025-09-01T11:00:00] T2: fin\nsuite"),
+    )
+    db.init_street_status_schema(conn)
+    entries = db.get_street_checkpoints(conn, "Rue A")
+    assert [(e["team_id"], e["note"], e["created_at"]) for e in entries] == [
+        ("T2", "fin\nsuite", "2025-09-01T11:00:00"), ("T1", "début", "2025-09-01T10:00:00"),
+    ]
+    assert conn.execute("SELECT notes FROM street_status").fetchone()[0] is None
+    db.init_street_status_schema(conn)
+    assert db.count_street_checkpoints(conn, "Rue A") == 2
+
+
+def test_team_view_keeps_shape_with_recent_notes_only():
+    conn = make_conn()
+    conn.execute("UPDATE streets SET team = 'T1'")
+    db.mark_street_in_progress(conn, "Rue A", "T1", "Départ")
+    for i in range(4):
+        db.save_checkpoint(conn, "Rue A", "T1", f"porte {i}")
+    db.mark_street_complete(conn, "Rue B", "T1")
+    rows = db.get_team_streets_status(conn, "T1", notes_limit=2)
+    assert [set(r) for r in rows] == [
+        {"street_name", "team_id", "status", "last_checkpoint", "notes", "completed_at", "updated_at"}
+    ] * 2
+    a, b = rows
+    assert a["last_checkpoint"] == "porte 3"
+    assert [line.split(": ", 1)[1] for line in a["notes"].split("\n")] == ["porte 2", "porte 3"]
+    assert b["status"] == "terminee" and b["notes"] is None
+
+
+def test_checkpoints_follow_street_rename():
+    conn = make_conn()
+    db.save_checkpoint(conn, "Rue A", "T1", "porte 4")
+    conn.execute("UPDATE streets SET team = 'T1' WHERE name = 'Rue A'")
+    conn.commit()
+    assert db.rename_street(conn, "Rue A", "Rue Alpha")
+    assert db.count_street_checkpoints(conn, "Rue Alpha") == 1
+    assert db.count_street_checkpoints(conn, "Rue A") == 0
+    assert db.get_street_checkpoints(conn, "Rue Alpha")[0]["street_name"] == "Rue Alpha"
+    assert db.get_team_streets_status(conn, "T1")[0]["notes"].endswith("T1: porte 4")
+
+
+def test_journal_without_street_id_is_upgraded(monkeypatch):
+    conn = make_conn()
+    # Journal tel qu'avant la migration 10 : relié par nom seulement, hors des triggers de clés
+    with monkeypatch.context() as m:
+        m.setattr(db, "STREET_KEY_TABLES", ("addresses", "notes"))
+        db.init_street_keys(conn)
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                "AND name LIKE 'trg_street_keys_street_checkpoints%'").fetchall():
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.execute("DROP TABLE street_checkpoints")
+    conn.execute("CREATE TABLE street_checkpoints (id INTEGER PRIMARY KEY, street_name TEXT NOT NULL, "
+                 "team_id TEXT, note TEXT NOT NULL, created_at TEXT NOT NULL)")
+    conn.execute("INSERT INTO street_checkpoints (street_name, team_id, note, created_at) "
+                 "VALUES ('Rue A', 'T1', 'avant', '2025-09-01')")
+    conn.execute("DELETE FROM schema_version WHERE version = 10")
+    conn.commit()
+    assert migrations.migrate(conn) == [10]
+    assert db.count_street_checkpoints(conn, "Rue A") == 1
+    assert db.rename_street(conn, "Rue A", "Rue Alpha")
+    assert [e["note"] for e in db.get_street_checkpoints(conn, "Rue Alpha")] == ["avant"]
@@ -0,0 +1,138 @@
+import sqlite3
+
+from guignomap.db import init_db
+from guignomap import geometry
+
+
+def setup_db():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    geometry.init_street_geometry_schema(conn)
+    conn.executemany("INSERT INTO streets (name, team, status) VALUES (?, ?, ?)", [
+        ("Rue Cantin", "EQ1", "en_cours"),
+        ("Avenue Dupuis", None, "a_faire"),
+    ])
+    conn.executemany(
+        "INSERT INTO addresses (street_name, house_number, latitude, longitude) VALUES (?, ?, ?, ?)",
+        [
+            ("Rue Cantin", "1", 45.750, -73.610),
+            ("Rue Cantin", "3", 45.752, -73.612),
+            ("Rue Cantin", "5", 45.754, -73.614),
+            ("Avenue Dupuis", "10", 45.760, -73.590),
+        ],
+    )
+    conn.commit()
+    return conn
+
+
+def test_refresh_builds_all_streets_once():
+    conn = setup_db()
+    assert geometry.refresh_street_geometry(conn) == 2
+    # Plus rien à faire au second appel
+    assert geometry.refresh_street_geometry(conn) == 0
+    row = conn.execute(
+        "SELECT n_points, min_lat, max_lat FROM street_geometry WHERE street_name = 'Rue Cantin'"
+    ).fetchone()
+    assert row == (3, 45.750, 45.754)
+
+
+def test_address_change_rebuilds_only_dirty_street():
+    conn = setup_db()
+    geometry.refresh_street_geometry(conn)
+    conn.execute("UPDATE addresses SET latitude = 45.770 WHERE street_name = 'Avenue Dupuis'")
+    conn.commit()
+    assert geometry.refresh_street_geometry(conn) == 1
+    row = conn.execute("SELECT max_lat FROM street_geometry WHERE street_name = 'Avenue Dupuis'").fetchone()
+    assert row[0] == 45.770
+
+
+def test_geometry_version_changes_on_every_rebuild():
+    conn = setup_db()
+    geometry.refresh_street_geometry(conn)
+    version = geometry.geometry_version(conn)
+    # Deux déplacements dans la même seconde : même nombre de points, même updated_at
+    for lat in (45.7541, 45.7542):
+        conn.execute("UPDATE addresses SET latitude = ? WHERE street_name = 'Rue Cantin' AND house_number = '5'",
+                     (lat,))
+        conn.commit()
+        assert geometry.refresh_street_geometry(conn) == 1
+        assert geometry.geometry_version(conn) > version
+        version = geometry.geometry_version(conn)
+    assert geometry.refresh_street_geometry(conn) == 0
+    assert geometry.geometry_version(conn) == version
+
+
+def test_fetch_street_lines_filters_by_team():
+    conn = setup_db()
+    geometry.refresh_street_geometry(conn)
+    lines = geometry.fetch_street_lines(conn, "EQ1")
+    assert [(r, s, t, len(p)) for r, s, t, p in lines] == [("Rue Cantin", "en_cours", "EQ1", 3)]
+    assert len(geometry.fetch_street_lines(conn)) == 2
+
+
+def test_lines_in_bbox_and_clusters():
+    conn = setup_db()
+    geometry.refresh_street_geometry(conn)
+    inside = geometry.fetch_street_lines_in_bbox(conn, 45.749, -73.613, 45.751, -73.609)
+    assert [r[0] for r in inside] == ["Rue Cantin"]
+    assert geometry.fetch_street_lines_in_bbox(conn, 45.0, -74.0, 45.1, -73.9) == []
+
+    sector_id = conn.execute("INSERT INTO sectors (name) VALUES ('Nord')").lastrowid
+    conn.execute("UPDATE streets SET sector_id = ? WHERE name = 'Rue Cantin'", (sector_id,))
+    clusters = {c["label"]: c for c in geometry.street_clusters(conn)}
+    assert clusters["Nord"]["en_cours"] == 1 and clusters["Nord"]["streets"] == 1
+    zone = next(c for label, c in clusters.items() if label.startswith("Zone "))
+    assert zone["a_faire"] == 1 and abs(zone["lat"] - 45.760) < 1e-9
+
+
+def test_simplified_levels_fall_back_to_full_geometry():
+    conn = setup_db()
+    # Rue Cantin est rectiligne : le point du milieu disparaît dès 3 m
+    geometry.refresh_street_geometry(conn)
+    lod = conn.execute("SELECT tolerance_m, n_points FROM street_geometry_lod WHERE street_name = 'Rue Cantin'").fetchall()
+    assert lod and all(n == 2 for _, n in lod)
+    lines = {r: p for r, _, _, p in geometry.fetch_street_lines(conn, tolerance_m=8.0)}
+    assert len(lines["Rue Cantin"]) == 2 and len(lines["Avenue Dupuis"]) == 1
+    inside = geometry.fetch_street_lines_in_bbox(conn, 45.749, -73.613, 45.751, -73.609, tolerance_m=3.0)
+    assert len(inside[0][3]) == 2
+
+    # Table construite avant les niveaux : reconstruite au prochain refresh
+    conn.execute("DELETE FROM street_geometry_lod")
+    conn.commit()
+    assert geometry.needs_refresh(conn)
+    assert geometry.refresh_street_geometry(conn) == 2
+    assert not geometry.needs_refresh(conn)
+
+
+def test_app_refresh_invalidates_cached_lines(monkeypatch):
+    import importlib
+    import tempfile
+    from pathlib import Path
+
+    from guignomap import cache
+    from guignomap.db_pool import ConnectionPool
+
+    app = importlib.import_module("guignomap.app")
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(Path(tmp) / "geo.db")
+        with pool.writer() as w:
+            init_db(w)
+            w.execute("INSERT INTO streets (name) VALUES ('Rue Cantin')")
+            w.executemany("INSERT INTO addresses (street_name, house_number, latitude, longitude) VALUES (?, ?, ?, ?)",
+                          [("Rue Cantin", "1", 45.750, -73.610), ("Rue Cantin", "3", 45.752, -73.612)])
+        monkeypatch.setattr(app, "get_pool", lambda: pool)
+        conn = pool.reader()
+        assert app._refresh_geometry(conn) == 1
+        assert len(app._street_lines(conn)[0][3]) == 2
+
+        with pool.writer() as w:
+            w.execute("INSERT INTO addresses (street_name, house_number, latitude, longitude) "
+                      "VALUES ('Rue Cantin', '5', 45.754, -73.614)")
+        version = cache.data_version()
+        assert app._refresh_geometry(conn) == 1
+        assert cache.data_version() > version
+        assert len(app._street_lines(conn)[0][3]) == 3
+        # Rien à recalculer : la version ne bouge pas
+        version = cache.data_version()
+        assert app._refresh_geometry(conn) == 0 and cache.data_version() == version
+        pool.close()
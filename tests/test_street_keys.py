@@ -0,0 +1,84 @@
+import sqlite3
+
+import pandas as pd
+
+from guignomap import bulk_import, db
+from guignomap.db import init_db
+
+
+def setup_db():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.executemany("INSERT INTO streets (name) VALUES (?)", [("Rue A",), ("Rue B",)])
+    conn.executemany("INSERT INTO addresses (street_name, house_number) VALUES (?, ?)",
+                     [("Rue A", "1"), ("Rue A", "3"), ("Rue B", "10")])
+    conn.execute("INSERT INTO notes (street_name, team_id, address_number, comment) "
+                 "VALUES ('Rue A', 'T1', '1', 'Visitée')")
+    conn.commit()
+    return conn
+
+
+def ids(conn, table):
+    return conn.execute(f"SELECT street_name, street_id FROM {table} ORDER BY id").fetchall()
+
+
+def test_existing_rows_backfilled_on_legacy_schema():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE streets (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    conn.execute("CREATE TABLE addresses (id INTEGER PRIMARY KEY, street_name TEXT, house_number TEXT)")
+    conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, street_name TEXT, team_id TEXT, "
+                 "address_number TEXT, comment TEXT)")
+    conn.executemany("INSERT INTO streets (id, name) VALUES (?, ?)", [(7, "Rue A"), (9, "Rue B")])
+    conn.executemany("INSERT INTO addresses (street_name, house_number) VALUES (?, ?)",
+                     [("Rue A", "1"), ("Rue B ", "2"), ("Rue Z", "3")])
+    conn.execute("INSERT INTO notes (street_name, team_id) VALUES ('Rue B', 'T1')")
+    assert db.init_street_keys(conn) == 3
+    # Rue Z inconnue : reste orpheline
+    assert [r[1] for r in ids(conn, "addresses")] == [7, 9, None]
+    assert ids(conn, "notes") == [("Rue B", 9)]
+    assert db.init_street_keys(conn) == 0
+
+
+def test_inserts_resolve_key_and_orphans_linked_by_new_street():
+    conn = setup_db()
+    a, b = db.street_id_for(conn, "Rue A"), db.street_id_for(conn, "Rue B")
+    assert [r[1] for r in ids(conn, "addresses")] == [a, a, b]
+    assert ids(conn, "notes") == [("Rue A", a)]
+
+    conn.execute("INSERT INTO addresses (street_name, house_number) VALUES ('Rue C', '5')")
+    conn.execute("INSERT INTO notes (street_name, team_id) VALUES ('Rue C', 'T1')")
+    assert ids(conn, "addresses")[-1] == ("Rue C", None)
+    conn.execute("INSERT INTO streets (name) VALUES ('Rue C')")
+    c = db.street_id_for(conn, "Rue C")
+    assert ids(conn, "addresses")[-1] == ("Rue C", c)
+    assert ids(conn, "notes")[-1] == ("Rue C", c)
+
+    # Adresse déplacée vers une autre rue par son nom
+    conn.execute("UPDATE addresses SET street_name = 'Rue B' WHERE house_number = '3'")
+    assert ids(conn, "addresses")[1] == ("Rue B", b)
+
+
+def test_rename_keeps_addresses_and_notes_attached():
+    conn = setup_db()
+    a = db.street_id_for(conn, "Rue A")
+    assert db.rename_street(conn, "Rue A", "Avenue A")
+    assert db.street_id_for(conn, "Avenue A") == a
+    assert db.get_addresses_for_street(conn, "Avenue A")["house_number"].tolist() == ["1", "3"]
+    assert db.get_visited_addresses_for_street(conn, "Avenue A", "T1") == ["1"]
+    assert db.street_address_stats(conn, "Avenue A")["address_count"] == 2
+    assert not db.rename_street(conn, "Avenue A", "Rue B")
+    assert not db.rename_street(conn, "Rue X", "Rue Y")
+
+    conn.execute("DELETE FROM streets WHERE name = 'Rue B'")
+    assert ids(conn, "addresses")[-1] == ("Rue B", None)
+
+
+def test_bulk_load_sets_keys_directly():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    df = pd.DataFrame({"street_name": ["Rue A", "Rue A", "Rue B"], "house_number": ["1", "2", "3"],
+                       "postal_code": [None] * 3, "latitude": [45.7, 45.71, 45.8],
+                       "longitude": [-73.6, -73.61, -73.5]})
+    bulk_import.bulk_load(conn, df)
+    rows = conn.execute("SELECT a.street_name, s.name FROM addresses a JOIN streets s ON s.id = a.street_id").fetchall()
+    assert len(rows) == 3 and all(x == y for x, y in rows)
@@ -0,0 +1,55 @@
+import sqlite3
+
+import pandas as pd
+
+from guignomap import street_names
+from guignomap.db import init_db
+
+
+def test_street_key_folds_abbreviations_particles_and_ordinals():
+    key = street_names.street_key
+    assert key("Avenue de l'Étang") == key("AV DE L ETANG") == key("avenue  de  l’étang ") == "AVENUE ETANG"
+    assert key("Rue Saint-Laurent") == key("RUE ST-LAURENT") == "RUE SAINT LAURENT"
+    assert key("Montée Masson") == key("Mnt. Masson") == key("MTEE MASSON")
+    assert key("1re Avenue") == key("1e Avenue") == key("1RE AV") == "1 AVENUE"
+    assert key(None) == key(float("nan")) == key(pd.NA) == key("") == ""
+
+
+def test_mojibake_repaired_before_folding():
+    broken = "Montée de l'Étang".encode("utf-8").decode("cp1252")
+    assert street_names.repair_mojibake(broken) == "Montée de l'Étang"
+    assert street_names.fold(broken) == "MONTEE DE L ETANG"
+    # Texte sain laissé tel quel
+    assert street_names.repair_mojibake("Rue Ãlbert") == "Rue Ãlbert"
+
+
+def test_join_key_split():
+    assert street_names.split_join_key("974 AV ST-DENIS") == ("974", "AVENUE SAINT DENIS")
+    assert street_names.split_join_key("12A RUE DU CURE-LALANDE") == ("12A", "RUE CURE LALANDE")
+    assert street_names.split_join_key("RUE SANS NUMERO") is None
+    assert street_names.split_join_key(None) is None
+
+
+def test_index_lookup_and_collisions():
+    index = street_names.StreetNameIndex(["Avenue de l'Étang", "Rue Saint-Denis", "Rue St-Denis", None, ""])
+    assert len(index) == 2
+    assert index.lookup("av de l etang") == "Avenue de l'Étang"
+    assert index.lookup("Rue Inconnue") is None
+    assert "RUE ST DENIS" in index
+    assert index.collisions == {"RUE SAINT DENIS": {"Rue Saint-Denis", "Rue St-Denis"}}
+    assert index.lookup_join_key("974 AV DE L ETANG") == ("974", "Avenue de l'Étang")
+    assert index.lookup_join_key("5 RUE INCONNUE") is None
+
+    out = index.canonicalize(pd.Series(["AV DE L'ETANG", "Rue Inconnue", None]))
+    assert out.tolist()[:2] == ["Avenue de l'Étang", "Rue Inconnue"]
+    assert index.canonicalize(pd.Series(["Rue Inconnue"]), keep_unknown=False).isna().all()
+
+
+def test_index_from_streets_table():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.executemany("INSERT INTO streets (name) VALUES (?)", [("Chemin Gascon",), ("Place de Cheverny",)])
+    index = street_names.StreetNameIndex.from_conn(conn)
+    assert index.lookup("CH GASCON") == "Chemin Gascon"
+    assert index.lookup("PLACE DE CHEVERNY") == "Place de Cheverny"
+    assert len(street_names.StreetNameIndex.from_conn(sqlite3.connect(":memory:"))) == 0
@@ -0,0 +1,42 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from guignomap import street_order
+
+
+def sample_df():
+    rng = np.random.default_rng(0)
+    rows = []
+    for rue, (la0, lo0) in {"Rue A": (45.75, -73.60), "Rue B": (45.76, -73.62)}.items():
+        for t in rng.permutation(10):
+            rows.append((rue, la0 + t * 1e-4, lo0 + t * 2e-4))
+    return pd.DataFrame(rows, columns=["rue", "lat", "lon"])
+
+
+def test_angle_mode_matches_legacy_sort():
+    df = sample_df()
+    lines = street_order.ordered_lines(df, mode="angle")
+    for rue, g in df.groupby("rue"):
+        cx, cy = g["lat"].mean(), g["lon"].mean()
+        expected = sorted(zip(g["lat"], g["lon"]), key=lambda p: math.atan2(p[0] - cx, p[1] - cy))
+        assert lines[rue].tolist() == [list(p) for p in expected]
+
+
+def test_chain_mode_follows_the_street():
+    df = sample_df()
+    lines = street_order.ordered_lines(df, mode="chain")
+    assert set(lines) == {"Rue A", "Rue B"}
+    for pts in lines.values():
+        lat_steps = np.diff(pts[:, 0])
+        # Points alignés : la chaîne va d'une extrémité à l'autre, dans un seul sens
+        assert (lat_steps > 0).all() or (lat_steps < 0).all()
+
+
+def test_missing_coordinates_and_unknown_mode():
+    df = pd.DataFrame({"rue": ["Rue A", "Rue A"], "lat": [45.7, None], "lon": [-73.6, -73.6]})
+    assert street_order.ordered_lines(df)["Rue A"].shape == (1, 2)
+    with pytest.raises(ValueError):
+        street_order.order_points(["Rue A"], [45.7], [-73.6], mode="zigzag")
@@ -0,0 +1,94 @@
+import sqlite3
+
+from guignomap import db, migrations
+from guignomap.db import init_db
+
+
+def make_conn():
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.executemany("INSERT INTO streets (name, team) VALUES (?, ?)", [("Rue A", "T1"), ("Rue B", "T1")])
+    conn.commit()
+    return conn
+
+
+def test_transition_updates_state_and_appends_event():
+    conn = make_conn()
+    assert db.set_street_status(conn, "Rue A", "en_cours", "T1")
+    assert db.set_street_status(conn, "Rue A", "en_cours", "T1", checkpoint="porte 10")
+    assert db.set_street_status(conn, "Rue A", "terminee", "T2")
+    state = db.get_street_state(conn, "Rue A")
+    assert (state["status"], state["team_id"], state["last_checkpoint"]) == ("terminee", "T1", "porte 10")
+    assert state["completed_at"] is not None and state["updated_at"] is not None
+    # Statut inchangé : pas d'événement
+    history = db.street_status_history(conn, "Rue A")
+    assert [(h["old_status"], h["new_status"], h["team_id"]) for h in history] == [
+        ("en_cours", "terminee", "T2"), ("a_faire", "en_cours", "T1"),
+    ]
+    assert db.progress_for_team(conn, "T1")["terminee"] == 1
+
+    assert db.set_street_status(conn, "Rue A", "a_faire")
+    assert db.get_street_state(conn, "Rue A")["completed_at"] is None
+
+
+def test_invalid_status_or_unknown_street_rejected():
+    conn = make_conn()
+    assert not db.set_street_status(conn, "Rue A", "fini")
+    assert not db.set_street_status(conn, "Rue Z", "terminee")
+    assert not db.mark_street_complete(conn, "Rue Z", "T3")
+    assert db.get_street_state(conn, "Rue Z") is None
+    assert db.progress_global(conn)["total"] == 2
+
+
+def test_failed_write_leaves_no_partial_state():
+    conn = make_conn()
+    conn.execute("""
+        CREATE TRIGGER fail_status BEFORE UPDATE OF status ON streets
+        BEGIN SELECT RAISE(ABORT, 'boom'); END
+    """)
+    assert not db.set_street_status(conn, "Rue A", "terminee", "T1")
+    assert db.get_street_state(conn, "Rue A")["status"] == "a_faire"
+    assert db.street_status_history(conn, "Rue A") == []
+
+
+def test_volunteer_api_and_compat_view_read_streets():
+    conn = make_conn()
+    db.mark_street_in_progress(conn, "Rue A", "T1", "Départ")
+    db.mark_street_complete(conn, "Rue B", "T1")
+    assert db.update_street_status(conn, "Rue B", "en_cours", "T1")
+    rows = {r["street_name"]: r for r in db.get_team_streets_status(conn, "T1")}
+    assert (rows["Rue A"]["status"], rows["Rue A"]["last_checkpoint"]) == ("en_cours", "Départ")
+    assert rows["Rue B"]["status"] == "en_cours" and rows["Rue B"]["completed_at"] is None
+    view = conn.execute("SELECT status FROM street_status WHERE street_name = 'Rue B'").fetchone()
+    assert view == ("en_cours",)
+
+
+def test_legacy_street_status_table_merged():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE streets (id INTEGER PRIMARY KEY, name TEXT UNIQUE, team TEXT, "
+                 "status TEXT DEFAULT 'a_faire')")
+    conn.execute("CREATE TABLE addresses (id INTEGER PRIMARY KEY, street_name TEXT, house_number TEXT, "
+                 "latitude REAL, longitude REAL)")
+    conn.executemany("INSERT INTO streets (name, status) VALUES (?, ?)",
+                     [("Rue A", "a_faire"), ("Rue B", "en_cours")])
+    db.init_street_status_schema(conn)
+    conn.executemany(
+        "INSERT INTO street_status (street_name, team_id, status, last_checkpoint, completed_at) VALUES (?, ?, ?, ?, ?)",
+        [("Rue A", "T1", "terminee", "fin", "2025-09-20 10:00:00"),
+         ("Rue B", "T2", "a_faire", "porte 3", None),
+         ("Rue C", "T2", "en_cours", None, None)],
+    )
+    conn.commit()
+    assert migrations.migrate(conn)
+
+    a, b, c = (db.get_street_state(conn, n) for n in ("Rue A", "Rue B", "Rue C"))
+    assert (a["status"], a["last_checkpoint"], a["completed_at"]) == ("terminee", "fin", "2025-09-20 10:00:00")
+    # streets fait foi quand la rue y a déjà avancé
+    assert (b["status"], b["last_checkpoint"]) == ("en_cours", "porte 3")
+    # Rue absente de streets : pas reprise
+    assert c is None and db.progress_global(conn)["total"] == 2
+    assert [h["new_status"] for h in db.street_status_history(conn, "Rue A")] == ["terminee"]
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'street_status'").fetchone() == ("view",)
+    # Rappel sans effet
+    db.init_street_status_schema(conn)
+    assert db.init_unified_status(conn) == 0